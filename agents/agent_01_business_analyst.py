@@ -4,15 +4,9 @@
 # Purpose: Defines AI agents for business research and report generation
 ###############################################
 
-# Import SQLite compatibility fix for GitHub environment
-__import__('pysqlite3')  # Ensure SQLite works in certain environments
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')  # Replace sqlite3 with pysqlite3
-
 # Import required libraries
-import streamlit as st  # Streamlit for UI and secrets management
-from crewai import Agent, LLM  # CrewAI for agent and LLM handling
-from crewai_tools import SerperDevTool  # Tools for web search integration
+from crewai import Agent  # CrewAI for agent handling
+from utils.registry import get_llm, get_search_tool  # Pooled LLM clients and tools
 
 # Class: Business Analyst Agents
 class BusinessAnalystAgents:
@@ -24,24 +18,13 @@ class BusinessAnalystAgents:
 
     def __init__(self):
         """
-        Initialize API keys and LLM configurations.
+        Fetch the shared LLM and search tool (built once per process, API keys from Streamlit secrets).
         """
-        # Load API keys securely from Streamlit secrets
-        self.serper_api_key = st.secrets['SERPER_API_KEY']  # Serper API key for search
-        self.gemini_api_key = st.secrets['GEMINI_API_KEY']  # Gemini API key for LLM
-
-        # Initialize Language Model (LLM) using Google Gemini 1.5 Flash
-        self.llm = LLM(
-            model="gemini/gemini-1.5-flash",  # Model version
-            api_key=self.gemini_api_key,  # API key for authentication
-            temperature=0.1  # Control randomness (0.1 = more deterministic)
-        )
+        # Language Model (LLM) using Google Gemini 1.5 Flash, cached on disk
+        self.llm = get_llm()
 
-        # Initialize SerperDevTool for web search functionality
-        self.search_tool = SerperDevTool(
-            api_key=self.serper_api_key,  # API key for SerperDevTool
-            n_results=4  # Number of results to fetch
-        )
+        # Cached SerperDevTool for web search functionality
+        self.search_tool = get_search_tool(n_results=4)  # Number of results to fetch
 
     def create_agents(self):
         """
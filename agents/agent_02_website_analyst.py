@@ -6,8 +6,8 @@
 
 # Import required libraries
 from crewai import Agent  # Core CrewAI framework for agents
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool  # Tools for web search and scraping
-import streamlit as st  # Streamlit for UI and interactive features
+from utils.agent_memory import get_agent_memory  # Bounded memory shared by the client's agents
+from utils.registry import get_crawl_tool, get_llm, get_search_tool  # Pooled LLM clients and tools
 
 # Class: Website Analyst Agents
 class WebsiteAnalystAgents:
@@ -15,13 +15,13 @@ class WebsiteAnalystAgents:
     def web_analyst_agent():
         """
         Defines the Website Data Analyst agent responsible for:
-        - Searching and scraping website metadata
+        - Searching and crawling website metadata
         - Extracting keywords and analyzing SEO performance
         - Providing insights for competitive benchmarking
         """
-        # Initialize tools
-        search_tool = SerperDevTool(api_key=st.secrets['SERPER_API_KEY'], n_results=5)  # Search tool for web content
-        scrape_tool = ScrapeWebsiteTool()  # Scraping tool for extracting website data
+        # Shared tools
+        search_tool = get_search_tool(n_results=5)  # Cached search tool for web content
+        crawl_tool = get_crawl_tool()  # Crawls both websites concurrently in one call
 
         # Create and return the agent
         return Agent(
@@ -34,9 +34,10 @@ class WebsiteAnalystAgents:
                 "An expert Website Data Analyst with advanced search and scraping tools for SEO optimization "
                 "and competitive analysis."
             ),
-            tools=[search_tool, scrape_tool],  # Add tools for web search and scraping
+            tools=[search_tool, crawl_tool],  # Add tools for web search and crawling
+            llm=get_llm(role="Website Data Analyst"),  # Shared cached Gemini LLM
             allow_delegation=True,  # Allows delegation of tasks to other agents
-            memory=True,  # Enables memory for storing context between steps
+            memory=get_agent_memory(),  # Client's shared memory (local embeddings, bounded store)
             verbose=True,  # Provides detailed logs for debugging
             guardrails={
                 'output_format': 'markdown',  # Ensure output format is Markdown
@@ -6,8 +6,8 @@
 
 # Import required libraries
 from crewai import Agent  # Core CrewAI framework for agents
-from crewai_tools import QueryBigQueryTool  # Tool for connecting and querying BigQuery
-import streamlit as st  # Streamlit for UI and interactive features
+from utils.agent_memory import get_agent_memory  # Bounded memory shared by the client's agents
+from utils.registry import get_bigquery_tool, get_llm  # Pooled LLM clients and tools
 
 # Class: Keyword Planner Agents
 class KeywordPlannerAgents:
@@ -19,11 +19,8 @@ class KeywordPlannerAgents:
         - Analyzing keyword performance and trends
         - Providing optimization strategies including bidding and grouping
         """
-        # Initialize BigQuery tool for database queries
-        bigquery_tool = QueryBigQueryTool(
-            project_id=st.secrets['BIGQUERY_PROJECT_ID'],  # Project ID from secrets
-            credentials_path=st.secrets['BIGQUERY_CREDENTIALS_PATH']  # Credentials file path
-        )
+        # Shared BigQuery tool for database queries
+        bigquery_tool = get_bigquery_tool()
 
         # Create and return the Keyword Planner agent
         return Agent(
@@ -39,8 +36,9 @@ class KeywordPlannerAgents:
                 "to maximize ROI. Combines analytical precision with creative strategy to develop data-driven keyword plans."
             ),
             tools=[bigquery_tool],  # Assign BigQuery tool for data queries
+            llm=get_llm(role="Keyword Planner"),  # Shared cached Gemini LLM
             verbose=True,  # Enable detailed logs for debugging
-            memory=True,  # Enable memory to retain context between steps
+            memory=get_agent_memory(),  # Client's shared memory (local embeddings, bounded store)
             guardrails={
                 'output_format': 'markdown',  # Ensure output format is Markdown
                 'max_retries': 3,  # Maximum retry attempts
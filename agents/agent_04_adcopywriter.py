@@ -6,7 +6,8 @@
 
 # Import required libraries
 from crewai import Agent  # Core CrewAI framework for agents
-import streamlit as st  # Streamlit for UI and interactive features
+from utils.agent_memory import get_agent_memory  # Bounded memory shared by the client's agents
+from utils.registry import get_llm  # Pooled LLM clients
 
 # Class: Ad Copywriter Agents
 class AdcopyWriterAgents:
@@ -29,8 +30,9 @@ class AdcopyWriterAgents:
                 "A creative and strategic ad copywriter with expertise in crafting high-performing Google Ads campaigns. "
                 "Proficient in keyword-focused writing and A/B testing for optimization."
             ),
+            llm=get_llm(role="Lead Ad Copy Writer"),  # Shared cached Gemini LLM
             verbose=True,  # Enable detailed logs for debugging
-            memory=True,  # Enable memory to retain context between steps
+            memory=get_agent_memory(),  # Client's shared memory (local embeddings, bounded store)
             guardrails={
                 'output_format': 'markdown',  # Ensure output format is Markdown
                 'max_retries': 3,  # Maximum retry attempts
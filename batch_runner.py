@@ -0,0 +1,217 @@
+###############################################
+# SEM Planner - Batch Runner
+# File: batch_runner.py
+# Purpose: Headless entry point that runs the full SEM pipeline over a CSV/JSONL of clients,
+#          with per-stage checkpoints and JSONL results
+###############################################
+
+# Usage:
+#   python batch_runner.py clients.csv --output results.jsonl --workers 4
+#
+# Input columns (CSV header or JSONL keys):
+#   id (optional), business_name, product_service, target_audience,
+#   our_url, competitor_url (several separated by spaces or ";"), keywords (comma-separated)
+# In JSONL, competitor_url and keywords may also be lists.
+# Rows missing business or website fields skip those stages; keywords are required.
+# API keys are read from .streamlit/secrets.toml, as in the app.
+
+# Apply process-wide setup (SQLite compatibility fix) once, before anything imports sqlite3
+from utils.bootstrap import apply_sqlite_fix
+apply_sqlite_fix()
+
+# Import required libraries
+import argparse  # Command-line options
+import csv  # CSV input
+import json  # JSONL input/output and checkpoints
+import os  # Paths
+import re  # Competitor URL splitting
+import sys  # Exit code
+import threading  # Serialize output and checkpoint writes
+import time  # Row timings
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Rows run concurrently
+
+from utils.job_runner import Job, JobCancelled  # Progress/cancellation handle for each row
+from utils.paths import cache_path  # Default checkpoint location
+from utils.rate_limiter import lane  # Batch rows queue behind interactive runs
+from utils.sem_pipeline import sem_plan_job, split_keywords  # The SEM pipeline shared with the app
+from utils.sqlite_cache import make_key  # Row IDs and checkpoint folders
+
+# Input fields passed to the pipeline
+INPUT_FIELDS = ("business_name", "product_service", "target_audience", "our_url", "competitor_url", "keywords")
+
+# Separators that join list values (natural in JSONL) into the delimited text a CSV cell holds
+LIST_SEPARATORS = {"competitor_url": " ", "keywords": ", "}
+
+# Function: Read Rows
+def read_rows(path):
+    """
+    Reads client rows from a .csv or .jsonl file and assigns each a stable ID.
+    List values of JSONL rows are joined into the same delimited text as in a CSV.
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    for row in rows:
+        row = {key.strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+        for field, separator in LIST_SEPARATORS.items():
+            if isinstance(row.get(field), list):
+                row[field] = separator.join(str(item).strip() for item in row[field] if str(item).strip())
+        row_id = str(row.get("id") or make_key(*(row.get(field) or "" for field in INPUT_FIELDS))[:12])
+        yield row_id, row
+
+# Function: Pipeline Inputs
+def pipeline_inputs(row):
+    """
+    Maps one input row to the inputs expected by the SEM pipeline.
+    """
+    competitor_urls = [url for url in re.split(r"[\s;]+", row.get("competitor_url") or "") if url]
+    return {
+        "business_name": row.get("business_name"),
+        "product_service": row.get("product_service"),
+        "target_audience": row.get("target_audience"),
+        "our_url": row.get("our_url"),
+        "competitor_urls": competitor_urls,
+        "keywords": row.get("keywords") or "",
+    }
+
+# Function: Row Error
+def row_error(row):
+    """
+    Returns why a row can't run (checked before any stage starts), or None.
+    """
+    if not split_keywords(row.get("keywords") or ""):
+        return "missing keywords (comma-separated seed keywords are required)"
+    return None
+
+# Class: Checkpoint
+class Checkpoint:
+    """
+    Completed stage results of one row, saved after every stage so an interrupted batch
+    resumes where it stopped. Stored as one JSON file per row, replaced atomically.
+    """
+
+    def __init__(self, directory, row_id, inputs):
+        """
+        Load the row's checkpoint; results computed for different inputs are discarded.
+        """
+        self.path = os.path.join(directory, f"{row_id}.json")
+        self.inputs_key = make_key(inputs)
+        self.results = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("inputs_key") == self.inputs_key:
+                self.results = saved["results"]
+
+    def save(self, stage, result):
+        """
+        Records a finished stage and writes the checkpoint file.
+        """
+        with self._lock:
+            self.results[stage] = result
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"inputs_key": self.inputs_key, "results": self.results}, f, ensure_ascii=False)
+            os.replace(self.path + ".tmp", self.path)
+
+# Function: Finished Rows
+def finished_rows(output_path):
+    """
+    IDs of rows already written successfully to the output (skipped on resume).
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return {record["id"] for record in records if record.get("status") == "succeeded"}
+
+# Function: Run Row
+def run_row(job, row_id, row, checkpoint_dir, only=None):
+    """
+    Runs the pipeline for one row, reusing and extending its checkpoint and the stored stage artifacts.
+    Provider calls go in the batch lane, so app users sharing the quota are served first.
+    """
+    inputs = pipeline_inputs(row)
+    checkpoint = Checkpoint(checkpoint_dir, row_id, inputs)
+    started = time.perf_counter()
+    with lane("batch"):
+        results = sem_plan_job(job, inputs, only=only, completed=checkpoint.results, on_stage_done=checkpoint.save)
+    timings = results.pop("timings")
+    reused = results.pop("reused")
+    return {
+        "id": row_id,
+        "status": "succeeded",
+        "inputs": inputs,
+        "results": results,
+        "reused_stages": reused,
+        "timings": {stage: round(duration, 3) for stage, (_, duration) in timings.items()},
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+# Function: Main
+def main(argv=None):
+    """
+    Runs every pending row with bounded concurrency and appends one JSON line per row to the output.
+    """
+    parser = argparse.ArgumentParser(description="Run the SEM planner pipeline over a batch of clients.")
+    parser.add_argument("input", help="CSV or JSONL file with one client per row")
+    parser.add_argument("--output", default="sem_plans.jsonl", help="JSONL results file (appended; finished rows are skipped)")
+    parser.add_argument("--checkpoint-dir", help="Per-row stage checkpoints (default: cache directory, per input file)")
+    parser.add_argument("--workers", type=int, default=2, help="Rows processed at the same time")
+    parser.add_argument("--only", nargs="+", help="Run only these stages (and what they depend on), e.g. ad_copy")
+    args = parser.parse_args(argv)
+
+    checkpoint_dir = args.checkpoint_dir or cache_path("batch", make_key(os.path.abspath(args.input))[:16])
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    done = finished_rows(args.output)
+    rows = [(row_id, row) for row_id, row in read_rows(args.input) if row_id not in done]
+    print(f"{len(rows)} rows to run ({len(done)} already finished), checkpoints in {checkpoint_dir}")
+
+    # Invalid rows fail up front with a clear reason instead of deep inside a stage
+    errors = {row_id: row_error(row) for row_id, row in rows}
+    invalid = {row_id: error for row_id, error in errors.items() if error}
+    with open(args.output, "a", encoding="utf-8") as f:
+        for row_id, error in invalid.items():
+            f.write(json.dumps({"id": row_id, "status": "failed", "error": error}, ensure_ascii=False) + "\n")
+            print(f"[{row_id}] failed: {error}")
+    rows = [(row_id, row) for row_id, row in rows if row_id not in invalid]
+
+    write_lock = threading.Lock()
+    jobs = {row_id: Job(f"SEM plan {row_id}") for row_id, _ in rows}
+    failures = len(invalid)
+
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="sem-batch") as executor:
+        futures = {
+            executor.submit(run_row, jobs[row_id], row_id, row, checkpoint_dir, args.only): row_id
+            for row_id, row in rows
+        }
+        try:
+            for future in as_completed(futures):
+                row_id = futures[future]
+                try:
+                    record = future.result()
+                except JobCancelled:
+                    continue
+                except Exception as e:
+                    failures += 1
+                    record = {"id": row_id, "status": "failed", "error": str(e)}
+                with write_lock, open(args.output, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                print(f"[{row_id}] {record['status']}" + (f": {record['error']}" if "error" in record else ""))
+        except KeyboardInterrupt:
+            print("Interrupted: stopping running rows at their next step; finished stages are checkpointed.")
+            for future in futures:
+                future.cancel()
+            for job in jobs.values():
+                job.cancel()
+            return 130
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# End of file: batch_runner.py
@@ -0,0 +1,141 @@
+###############################################
+# Import-Time Budget Benchmark
+# File: benchmarks/import_budget.py
+# Purpose: Measures cold-start import cost of the router and each page and fails when a budget is exceeded
+###############################################
+
+# Usage:
+#   python benchmarks/import_budget.py                  # all targets, default budgets
+#   python benchmarks/import_budget.py --scale 1.5      # looser budgets on slow CI machines
+#   python benchmarks/import_budget.py --report out.json
+
+# Import required libraries
+import argparse  # Command-line options
+import json  # Report output
+import os  # Paths
+import subprocess  # Fresh interpreter per measurement (true cold start)
+import sys  # Interpreter path and exit code
+import time  # Wall-clock timing
+
+# Repository root (parent of this folder)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Targets: name -> modules imported after the bootstrap, as the router would on first selection
+TARGETS = {
+    "router": ["streamlit", "streamlit_option_menu"],
+    "business_analyst": ["streamlit", "pages.page_01_business_analyst"],
+    "web_analyst": ["streamlit", "pages.page_02_web_analyst"],
+    "keyword_planner": ["streamlit", "pages.page_03_keyword_planner"],
+    "ad_copywriter": ["streamlit", "pages.page_04_ad_copywriter"],
+    "metrics": ["streamlit", "pages.page_05_metrics"],
+}
+
+# Cold-start wall-time budgets in milliseconds (interpreter start + imports)
+BUDGETS_MS = {
+    "router": 1500,
+    "business_analyst": 2000,
+    "web_analyst": 2000,
+    "keyword_planner": 2000,
+    "ad_copywriter": 2000,
+    "metrics": 2000,
+}
+
+# Heavy packages no page may load just to render; they belong to the background run
+FORBIDDEN = ("crewai", "crewai_tools", "litellm", "torch", "sentence_transformers", "sklearn", "pythainlp", "epitran")
+
+# Function: Parse Import Time
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into {module: (self_us, cumulative_us, depth)}.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        # "import time:  self |  cumulative | <indent>module", two spaces of indent per nesting level
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+# Function: Measure Target
+def measure(modules, repeat=3, python=sys.executable):
+    """
+    Imports `modules` in fresh interpreters and returns the best wall time with the import breakdown.
+    """
+    code = "from utils.bootstrap import apply_sqlite_fix; apply_sqlite_fix()\n"
+    code += "".join(f"import {module}\n" for module in modules)
+    best_wall, best_imports = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        process = subprocess.run(
+            [python, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True
+        )
+        wall = (time.perf_counter() - started) * 1000
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "unknown error"
+            raise RuntimeError(error)
+        if best_wall is None or wall < best_wall:
+            best_wall, best_imports = wall, parse_importtime(process.stderr)
+    return best_wall, best_imports
+
+# Function: Summarize Target
+def summarize(name, wall_ms, imports, budget_ms, top_n=8):
+    """
+    Builds the report entry for one target.
+    """
+    top_level = [(module, cumulative) for module, (_, cumulative, depth) in imports.items() if depth == 0]
+    heaviest = sorted(top_level, key=lambda item: -item[1])[:top_n]
+    loaded = {module.split(".")[0] for module in imports}
+    return {
+        "target": name,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(cumulative for _, cumulative in top_level) / 1000, 1),
+        "budget_ms": budget_ms,
+        "modules": len(imports),
+        "heaviest": [{"module": module, "ms": round(cumulative / 1000, 1)} for module, cumulative in heaviest],
+        "forbidden": sorted(loaded.intersection(FORBIDDEN)) if name != "router" else [],
+        "over_budget": wall_ms > budget_ms,
+    }
+
+# Function: Main
+def main(argv=None):
+    """
+    Runs every target, prints a table and exits non-zero on any budget or forbidden-import violation.
+    """
+    parser = argparse.ArgumentParser(description="Cold-start import budget check for the SEM Planner pages.")
+    parser.add_argument("targets", nargs="*", help=f"Targets to measure (default: all of {', '.join(TARGETS)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per target; the fastest counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply all budgets (e.g. 1.5 on slow machines)")
+    parser.add_argument("--report", help="Write the full JSON report to this path")
+    args = parser.parse_args(argv)
+
+    results, failed = [], False
+    for name in args.targets or TARGETS:
+        budget_ms = BUDGETS_MS[name] * args.scale
+        try:
+            wall_ms, imports = measure(TARGETS[name], repeat=args.repeat)
+        except RuntimeError as e:
+            print(f"{name:<18} ERROR  {e}")
+            failed = True
+            continue
+        result = summarize(name, wall_ms, imports, budget_ms)
+        results.append(result)
+
+        status = "FAIL" if result["over_budget"] or result["forbidden"] else "ok"
+        failed = failed or status == "FAIL"
+        print(f"{name:<18} {status:<5} wall {result['wall_ms']:>8.1f} ms / budget {budget_ms:>7.0f} ms"
+              f"  imports {result['import_ms']:>8.1f} ms  modules {result['modules']:>5}")
+        print("    heaviest: " + ", ".join(f"{entry['module']} {entry['ms']:.0f} ms" for entry in result["heaviest"]))
+        if result["forbidden"]:
+            print(f"    forbidden at import time: {', '.join(result['forbidden'])}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# End of file: benchmarks/import_budget.py
@@ -0,0 +1,295 @@
+###############################################
+# Replay Benchmark
+# File: benchmarks/replay_benchmark.py
+# Purpose: Offline end-to-end benchmark of the four page flows and the full pipeline,
+#          replaying recorded LLM/search/crawl/BigQuery interactions and comparing against a baseline
+###############################################
+
+# Usage:
+#   python benchmarks/replay_benchmark.py --record              # capture live interactions (needs the app's secrets)
+#   python benchmarks/replay_benchmark.py                       # replay every flow offline
+#   python benchmarks/replay_benchmark.py full --latency recorded --repeat 3
+#   python benchmarks/replay_benchmark.py --latency llm=0.2,search=0 --hashed-embeddings
+#   python benchmarks/replay_benchmark.py --save-baseline       # store these results as the new baseline
+#
+# Each measurement runs in a fresh interpreter with an empty cache directory (cold caches).
+# Missing fixtures are answered with deterministic synthetic responses, so the suite also runs
+# before anything was recorded; the report shows how many calls were exact, fallback or synthetic.
+
+# Import required libraries
+import argparse  # Command-line options
+import gc  # Object counts
+import json  # Scenario, results and baseline files
+import os  # Paths and environment
+import statistics  # Median of repeated runs
+import subprocess  # Fresh interpreter per measurement
+import sys  # Interpreter path and exit code
+import tempfile  # Cold cache directory per measurement
+import time  # Wall-clock timing
+import tracemalloc  # Python memory peak
+
+# Repository root (parent of this folder)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fixtures (one folder per scenario and flow) and the stored baseline
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "replay_baseline.json")
+
+# Flows: the four pages and the full pipeline
+FLOWS = ("business", "website", "keyword", "ad_copy", "full")
+
+# Allowed slowdown / memory growth over the baseline before a flow counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+# Inputs used when no --scenario file is given
+DEFAULT_SCENARIO = {
+    "name": "default",
+    "business_name": "Siam Running Co.",
+    "product_service": "Running shoes, trail gear and same-day delivery in Bangkok",
+    "target_audience": "Urban runners aged 25-45 in Bangkok training for races",
+    "our_url": "https://www.siam-running.example",
+    "competitor_urls": ["https://www.bkk-runners.example"],
+    "keywords": "running shoes, trail running shoes, รองเท้าวิ่ง",
+    "business_analysis": "Audience: urban runners 25-45. Goals: race preparation, fast delivery, expert fitting.",
+    "website_analysis": "Competitor ranks for 'trail running shoes' and 'marathon shoes'; our site lacks product descriptions.",
+    "keyword_plan": "Primary: running shoes (Exact), trail running shoes (Phrase). Secondary: รองเท้าวิ่ง (Broad).",
+}
+
+# Environment of every measured run: no vendor telemetry, caches and spans kept local
+WORKER_ENV = {
+    "CREWAI_TRACING_ENABLED": "false",
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+    "SEM_PLANNER_TRACING": "1",
+}
+
+# Class: Memory Span Sink
+class MemorySpanSink:
+    """
+    Keeps finished spans in memory for the per-stage breakdown.
+    """
+
+    def __init__(self):
+        """
+        Start empty.
+        """
+        self.spans = []
+
+    def export(self, span):
+        """
+        Stores one finished span.
+        """
+        self.spans.append(span)
+
+# Function: Run Flow
+def run_flow(flow, scenario, job):
+    """
+    Runs one flow exactly as its page (or the batch runner, for `full`) does.
+    """
+    if flow == "business":
+        from utils.sem_pipeline import business_analysis_job
+        return business_analysis_job(job, scenario["business_name"], scenario["product_service"], scenario["target_audience"])
+    if flow == "website":
+        from utils.sem_pipeline import website_analysis_job
+        return website_analysis_job(job, scenario["our_url"], scenario["competitor_urls"])
+    if flow == "keyword":
+        from pages.page_03_keyword_planner import keyword_plan_job
+        return keyword_plan_job(job, scenario["keywords"])
+    if flow == "ad_copy":
+        from pages.page_04_ad_copywriter import text_ads_job
+        # As the page does: the other pages' results feed the ad_copy stage of the pipeline
+        inputs = {
+            key: scenario[key]
+            for key in ("business_name", "product_service", "target_audience", "our_url", "competitor_urls", "keywords")
+        }
+        completed = {
+            "business": {"outputs": [scenario["business_analysis"]]},
+            "website": {"outputs": [scenario["website_analysis"]]},
+            "keyword_categorization": scenario["keyword_plan"],
+            "keyword_trend": "",
+        }
+        return text_ads_job(job, inputs, completed)
+    from utils.sem_pipeline import sem_plan_job
+    return sem_plan_job(job, scenario)
+
+# Function: Worker
+def worker(flow, scenario, fixtures_dir, mode, latency, hashed_embeddings, result_path):
+    """
+    One measurement in this (fresh) interpreter: installs the stand-ins, runs the flow and
+    writes wall time, per-stage times, memory peak, object counts and fixture usage to `result_path`.
+    """
+    from utils.bootstrap import apply_sqlite_fix
+    apply_sqlite_fix()
+
+    from replay_fixtures import FixtureStore, LatencyModel, install_stand_ins  # Stand-ins (this folder)
+    import utils.telemetry as telemetry  # Spans give the per-stage breakdown
+    from utils.job_runner import Job  # Progress/cancellation handle expected by the flows
+
+    fixtures = FixtureStore(fixtures_dir, mode)
+    install_stand_ins(fixtures, LatencyModel(latency), hashed_embeddings)
+    sink = MemorySpanSink()
+    telemetry._shared_tracer = telemetry.Tracer([sink])
+
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    started = time.perf_counter()
+    with telemetry.span("stage" if flow != "full" else "benchmark", {"sem.stage": flow if flow != "full" else None}):
+        run_flow(flow, scenario, Job(flow))
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+
+    stages, operations = {}, {}
+    for span in sink.spans:
+        if span.name == "stage":
+            stages[span.attributes["sem.stage"]] = round(span.duration_ms / 1000, 3)
+        totals = operations.setdefault(span.name, {"count": 0, "seconds": 0.0})
+        totals["count"] += 1
+        totals["seconds"] = round(totals["seconds"] + span.duration_ms / 1000, 3)
+
+    result = {
+        "flow": flow,
+        "wall_s": round(wall, 3),
+        "stages": stages,
+        "operations": operations,
+        "peak_mb": round(peak / 2**20, 2),
+        "objects": len(gc.get_objects()),
+        "objects_delta": len(gc.get_objects()) - objects_before,
+        "fixtures": fixtures.stats,
+    }
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+# Function: Measure
+def measure(flow, args, scenario):
+    """
+    Runs `flow` in `args.repeat` fresh interpreters and returns the median-wall-time result.
+    """
+    runs = []
+    for _ in range(1 if args.record else args.repeat):
+        with tempfile.TemporaryDirectory(prefix="sem-bench-") as cache_dir:
+            result_path = os.path.join(cache_dir, "result.json")
+            command = [
+                sys.executable, os.path.abspath(__file__), "--worker", flow,
+                "--scenario-json", json.dumps(scenario), "--result", result_path,
+                "--fixtures", os.path.join(args.fixtures, scenario["name"], flow),
+                "--latency", args.latency or "",
+            ]
+            command += ["--record"] * args.record + ["--hashed-embeddings"] * args.hashed_embeddings
+            env = {**os.environ, **WORKER_ENV, "SEM_PLANNER_CACHE_DIR": cache_dir}
+            completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+            if completed.returncode != 0 or not os.path.exists(result_path):
+                error = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+                return {"flow": flow, "error": error}
+            with open(result_path, encoding="utf-8") as f:
+                runs.append(json.load(f))
+    median = statistics.median(run["wall_s"] for run in runs)
+    return min(runs, key=lambda run: abs(run["wall_s"] - median))
+
+# Function: Compare
+def compare(result, baseline, tolerance):
+    """
+    Lists the metrics of `result` that exceed the baseline by more than `tolerance`.
+    """
+    regressions = []
+    for metric in ("wall_s", "peak_mb"):
+        previous = (baseline or {}).get(metric)
+        if previous and result[metric] > previous * (1 + tolerance):
+            regressions.append(f"{metric} {previous} -> {result[metric]} (+{result[metric] / previous - 1:.0%})")
+    return regressions
+
+# Function: Format Fixture Usage
+def format_fixture_usage(stats):
+    """
+    e.g. "llm 12 exact / 1 synthetic, search 4 exact".
+    """
+    return ", ".join(
+        f"{kind} " + " / ".join(f"{count} {outcome}" for outcome, count in sorted(counts.items()))
+        for kind, counts in sorted(stats.items())
+    ) or "no external calls"
+
+# Function: Main
+def main(argv=None):
+    """
+    Measures every selected flow, prints a table and exits non-zero on errors or regressions.
+    """
+    parser = argparse.ArgumentParser(description="Offline replay benchmark of the SEM planner flows.")
+    parser.add_argument("flows", nargs="*", help=f"Flows to run (default: all of {', '.join(FLOWS)})")
+    parser.add_argument("--record", action="store_true", help="Call the live services and store fixtures")
+    parser.add_argument("--scenario", help="JSON file with inputs (see DEFAULT_SCENARIO for the keys)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Fixture root folder")
+    parser.add_argument("--latency", help='Injected latency, e.g. "recorded" or "llm=1.5,search=0.3,crawl=0.05"')
+    parser.add_argument("--repeat", type=int, default=1, help="Fresh interpreters per flow; the median run counts")
+    parser.add_argument("--hashed-embeddings", action="store_true", help="Replace the embedding model (no model download)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed regression ratio")
+    parser.add_argument("--report", help="Write the full results as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--scenario-json", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        sys.path.insert(0, ROOT)
+        from replay_fixtures import parse_latency  # Stand-ins (this folder)
+        worker(args.worker, json.loads(args.scenario_json), args.fixtures, "record" if args.record else "replay",
+               parse_latency(args.latency), args.hashed_embeddings, args.result)
+        return 0
+
+    scenario = dict(DEFAULT_SCENARIO)
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as f:
+            scenario.update(json.load(f))
+    unknown = [flow for flow in args.flows if flow not in FLOWS]
+    if unknown:
+        parser.error(f"unknown flow(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get(scenario["name"], {})
+
+    results, failed = {}, False
+    for flow in args.flows or FLOWS:
+        result = measure(flow, args, scenario)
+        results[flow] = result
+        if "error" in result:
+            failed = True
+            print(f"{flow:<10} ERROR  {result['error']}")
+            continue
+        regressions = compare(result, baseline.get(flow), args.tolerance)
+        failed = failed or bool(regressions)
+        status = "REGRESSED" if regressions else ("ok" if flow in baseline else "new")
+        print(
+            f"{flow:<10} {status:<9} wall {result['wall_s']:7.2f} s  peak {result['peak_mb']:7.1f} MB  "
+            f"objects {result['objects']:>8,} (+{result['objects_delta']:,})"
+        )
+        for stage, seconds in sorted(result["stages"].items(), key=lambda item: -item[1]):
+            print(f"    {stage:<24} {seconds:7.2f} s")
+        print(f"    fixtures: {format_fixture_usage(result['fixtures'])}")
+        for regression in regressions:
+            print(f"    regression: {regression}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline and not args.record:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                stored = json.load(f)
+        stored.setdefault(scenario["name"], {}).update(
+            {flow: result for flow, result in results.items() if "error" not in result}
+        )
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# End of file: benchmarks/replay_benchmark.py
@@ -0,0 +1,498 @@
+###############################################
+# Replay Fixtures
+# File: benchmarks/replay_fixtures.py
+# Purpose: Records live LLM, search, crawl and BigQuery interactions into fixtures and serves them
+#          back through local stand-ins with injected latency, for offline benchmarks
+###############################################
+
+# Import required libraries
+import asyncio  # Async crawl stand-in
+import hashlib  # Hashed embedding stand-in
+import json  # Fixture files
+import os  # Paths
+import re  # Synthetic content
+import threading  # Fixture writes from parallel stages
+import time  # Injected and recorded latency
+from typing import Any  # Pydantic fields holding helpers
+
+import numpy as np  # Hashed embedding stand-in
+import pandas as pd  # Synthetic keyword data
+import pyarrow as pa  # Keyword slices
+import pyarrow.parquet as pq  # Keyword slice fixtures
+from crewai.llms.base_llm import BaseLLM  # LLM stand-in base class
+from crewai.tools import BaseTool  # Tool stand-in base class
+from pydantic import BaseModel, Field  # Tool argument schema
+
+from tools.cached_search_tool import CachedSerperDevTool  # Search tool whose HTTP call is replaced
+from tools.keyword_store import KEYWORD_COLUMNS, KeywordStore, get_keyword_store  # Keyword data path
+from tools.site_crawler_tool import SiteCrawler  # Crawler whose fetching is replaced
+from utils.llm_cache import CachedLLM  # Response cache in front of the LLM stand-in
+from utils.registry import ResourceRegistry  # Pooled resources are swapped at registration
+from utils.sqlite_cache import make_key  # Fixture keys
+
+# Fixture kinds and their default injected latency in seconds (crawl: per page)
+DEFAULT_LATENCY = {"llm": 1.0, "search": 0.3, "crawl": 0.05, "bigquery": 1.5, "tool": 0.2}
+
+# Secrets seen by the registry in replay mode (nothing leaves the machine)
+REPLAY_SECRETS = {
+    "GEMINI_API_KEY": "replay",
+    "SERPER_API_KEY": "replay",
+    "BIGQUERY_PROJECT_ID": "",
+    "BIGQUERY_CREDENTIALS_PATH": "",
+}
+
+# Class: Fixture Store
+class FixtureStore:
+    """
+    Interactions of one scenario, one JSON line per call in `<kind>.jsonl`:
+    - `record(kind, key, group, value, seconds)` appends a live interaction.
+    - `replay(kind, key, group)` returns the exact match, else the next unused recording of the
+      same group in recorded order, else None (the caller then synthesizes a response).
+    - `stats` counts exact, fallback and synthetic answers per kind.
+    """
+
+    def __init__(self, directory, mode="replay"):
+        """
+        Load existing fixtures (replay) or start empty files (record).
+        """
+        self.directory = directory
+        self.mode = mode
+        self.stats = {}
+        self._by_key = {}
+        self._by_group = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if mode == "record":
+            for name in os.listdir(directory):
+                if name.endswith(".jsonl"):
+                    os.remove(os.path.join(directory, name))
+            return
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".jsonl"):
+                continue
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._by_key.setdefault((record["kind"], record["key"]), record)
+                    self._by_group.setdefault((record["kind"], record["group"]), []).append(record)
+
+    def record(self, kind, key, group, value, seconds):
+        """
+        Appends one live interaction.
+        """
+        record = {"kind": kind, "key": key, "group": group, "value": value, "seconds": round(seconds, 4)}
+        with self._lock, open(os.path.join(self.directory, f"{kind}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._count(kind, "recorded")
+
+    def replay(self, kind, key, group):
+        """
+        Returns the recorded interaction for `key` (or the group's next one), or None.
+        """
+        with self._lock:
+            record = self._by_key.get((kind, key))
+            if record is not None:
+                self._count(kind, "exact")
+                return record
+            queue = self._by_group.get((kind, group))
+            if queue:
+                self._count(kind, "fallback")
+                return queue.pop(0)
+            self._count(kind, "synthetic")
+            return None
+
+    def _count(self, kind, outcome):
+        """
+        Increments a stats counter. Caller must hold the lock.
+        """
+        counts = self.stats.setdefault(kind, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+# Class: Latency Model
+class LatencyModel:
+    """
+    Injected delay per fixture kind: a fixed number of seconds, or "recorded" to
+    replay the duration measured while recording.
+    """
+
+    def __init__(self, settings=None):
+        """
+        `settings` is {kind: seconds or "recorded"} on top of DEFAULT_LATENCY.
+        """
+        self.settings = {**DEFAULT_LATENCY, **(settings or {})}
+
+    def seconds(self, kind, record=None):
+        """
+        Delay for one call of `kind`.
+        """
+        setting = self.settings[kind]
+        if setting == "recorded":
+            return record["seconds"] if record else DEFAULT_LATENCY[kind]
+        return float(setting)
+
+    def sleep(self, kind, record=None, units=1):
+        """
+        Blocks for the delay of `units` calls of `kind`.
+        """
+        time.sleep(self.seconds(kind, record) * units)
+
+# Function: Parse Latency
+def parse_latency(text):
+    """
+    Parses "llm=1.5,search=recorded" (or just "recorded") into LatencyModel settings.
+    """
+    if not text:
+        return {}
+    if "=" not in text:
+        return {kind: text for kind in DEFAULT_LATENCY}
+    settings = {}
+    for part in text.split(","):
+        kind, value = part.split("=", 1)
+        if kind.strip() not in DEFAULT_LATENCY:
+            raise ValueError(f"Unknown latency kind '{kind}' (expected one of {', '.join(DEFAULT_LATENCY)})")
+        settings[kind.strip()] = value.strip() if value.strip() == "recorded" else float(value)
+    return settings
+
+# Function: Synthetic Answer
+def synthetic_answer(messages):
+    """
+    Deterministic final answer built from words of the prompt, in the agent's text format.
+    """
+    text = messages if isinstance(messages, str) else " ".join(str(message.get("content", "")) for message in messages)
+    words = sorted(set(re.findall(r"[A-Za-z\u0E00-\u0E7F]{4,}", text)))[:40]
+    bullets = "\n".join(f"- {word}: recommendation for {word}" for word in words[:15])
+    return (
+        "Thought: I now can give a great answer\n"
+        f"Final Answer: ## Summary\nKey terms: {', '.join(words)}\n\n## Recommendations\n{bullets}"
+    )
+
+# Class: Fixture LLM
+class FixtureLLM(BaseLLM):
+    """
+    LLM stand-in: forwards to `inner` and records in record mode, serves fixtures in replay mode.
+    Function calling is reported as unsupported in both modes, so recorded and replayed runs
+    use the same text-based tool protocol.
+    """
+
+    def __init__(self, fixtures, latency, inner=None, role=None, model="replay"):
+        """
+        Wrap `inner` (record) or nothing (replay).
+        """
+        super().__init__(model=getattr(inner, "model", model), temperature=getattr(inner, "temperature", None))
+        self._fixtures = fixtures
+        self._latency = latency
+        self._inner = inner
+        self._role = role
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        """
+        Returns the recorded (or live) response for this prompt.
+        """
+        role = getattr(kwargs.get("from_agent"), "role", None) or self._role
+        key = make_key(role, messages, [tool.get("name") if isinstance(tool, dict) else str(tool) for tool in tools or []])
+
+        if self._inner is not None:
+            started = time.perf_counter()
+            self._inner.stop = self.stop
+            response = self._inner.call(messages, None, callbacks, available_functions, **kwargs)
+            self._fixtures.record("llm", key, role, response, time.perf_counter() - started)
+            return response
+
+        record = self._fixtures.replay("llm", key, role)
+        self._latency.sleep("llm", record)
+        return record["value"] if record else synthetic_answer(messages)
+
+    def supports_function_calling(self):
+        """
+        Text-based tool calls only (see class docstring).
+        """
+        return False
+
+    def supports_stop_words(self):
+        """
+        Stop words are honoured by the text protocol.
+        """
+        return True
+
+    def get_context_window_size(self):
+        """
+        Context window of the wrapped LLM, or a generous default.
+        """
+        return self._inner.get_context_window_size() if self._inner is not None else 1_000_000
+
+# Class: Fixture Search Tool
+class FixtureSerperTool(CachedSerperDevTool):
+    """
+    Serper tool whose HTTP request is recorded or replayed; normalization and caching still run.
+    """
+
+    fixtures: Any = None
+    latency: Any = None
+    live: bool = False  # Record mode: call Serper and store the response
+
+    def _make_api_request(self, search_query, search_type):
+        """
+        Returns the recorded (or live) Serper response.
+        """
+        key = make_key(search_query, search_type, self.n_results)
+        if self.live:
+            started = time.perf_counter()
+            results = super()._make_api_request(search_query, search_type)
+            self.fixtures.record("search", key, search_type, results, time.perf_counter() - started)
+            return results
+
+        record = self.fixtures.replay("search", key, search_type)
+        self.latency.sleep("search", record)
+        if record:
+            return record["value"]
+        return {"organic": [
+            {"title": f"{search_query} result {rank}", "link": f"https://example.com/{rank}",
+             "snippet": f"Overview of {search_query}, prices, reviews and alternatives.", "position": rank}
+            for rank in range(1, self.n_results + 1)
+        ]}
+
+# Class: Fixture Tool Arguments
+class FixtureToolSchema(BaseModel):
+    """
+    Input schema of the BigQuery tool stand-in.
+    """
+    query: str = Field(..., description="SQL query to run")
+
+# Class: Fixture Tool
+class FixtureTool(BaseTool):
+    """
+    Generic tool stand-in: records the wrapped tool's outputs or replays them by arguments.
+    """
+
+    name: str = "Query BigQuery"
+    description: str = "Runs a SQL query against BigQuery and returns the rows."
+    args_schema: type[BaseModel] = FixtureToolSchema
+    fixtures: Any = None
+    latency: Any = None
+    inner: Any = None  # The real tool (record mode)
+
+    def _run(self, **kwargs):
+        """
+        Returns the recorded (or live) tool output.
+        """
+        key = make_key(self.name, kwargs)
+        if self.inner is not None:
+            started = time.perf_counter()
+            output = self.inner.run(**kwargs)
+            self.fixtures.record("tool", key, self.name, output, time.perf_counter() - started)
+            return output
+
+        record = self.fixtures.replay("tool", key, self.name)
+        self.latency.sleep("tool", record)
+        return record["value"] if record else "keyword,avg_monthly_searches\n" + "\n".join(
+            f"keyword {rank},{1000 // rank}" for rank in range(1, 21)
+        )
+
+# Class: Fixture Keyword Backend
+class FixtureKeywordBackend:
+    """
+    Keyword store backend stand-in: slices are kept as Parquet next to the fixtures.
+    Keys ignore the time window so recordings stay valid in later months.
+    """
+
+    def __init__(self, fixtures, latency, inner=None):
+        """
+        Wrap the live backend (record) or nothing (replay).
+        """
+        self.fixtures = fixtures
+        self.latency = latency
+        self.inner = inner
+
+    def fetch(self, terms, since):
+        """
+        Returns the recorded (or live) slice as an Arrow table.
+        """
+        key = make_key(terms)
+        path = os.path.join(self.fixtures.directory, f"keywords_{key[:16]}.parquet")
+        if self.inner is not None:
+            started = time.perf_counter()
+            table = self.inner.fetch(terms, since)
+            pq.write_table(table, path)
+            self.fixtures.record("bigquery", key, "slice", os.path.basename(path), time.perf_counter() - started)
+            return table
+
+        record = self.fixtures.replay("bigquery", key, "slice")
+        self.latency.sleep("bigquery", record)
+        if record:
+            return pq.read_table(os.path.join(self.fixtures.directory, record["value"]))
+        return synthetic_keyword_table(terms, since)
+
+# Function: Synthetic Keyword Table
+def synthetic_keyword_table(terms, since, variants=60):
+    """
+    Deterministic keyword rows (terms x modifiers x months) with trend, seasonality and noise.
+    """
+    modifiers = ["", "best", "cheap", "near me", "online", "price", "review", "sale", "2024", "buy"]
+    keywords = [f"{modifier} {term}".strip() for term in terms for modifier in modifiers][:variants * max(len(terms), 1)]
+    months = pd.date_range(since, periods=24, freq="MS")
+    rng = np.random.default_rng(int(make_key(terms)[:8], 16))
+    base = rng.lognormal(6, 1.2, len(keywords))
+    trend = 1 + rng.normal(0, 0.02, len(keywords))[:, None] * np.arange(len(months))
+    season = 1 + 0.3 * np.sin(2 * np.pi * (months.month.to_numpy() - rng.integers(1, 13, len(keywords))[:, None]) / 12)
+    volume = np.maximum(base[:, None] * trend * season * rng.lognormal(0, 0.1, (len(keywords), len(months))), 0).round()
+    frame = pd.DataFrame({
+        "keyword": np.repeat(keywords, len(months)),
+        "month": np.tile(months.date, len(keywords)),
+        "search_volume": volume.ravel().astype(int),
+        "cpc": np.repeat(rng.uniform(0.2, 3.0, len(keywords)).round(2), len(months)),
+        "competition": np.repeat(rng.uniform(0, 1, len(keywords)).round(2), len(months)),
+    })
+    return pa.Table.from_pandas(frame[list(KEYWORD_COLUMNS)], preserve_index=False)
+
+# Function: Synthetic Pages
+def synthetic_pages(root, pages=12):
+    """
+    Deterministic small site: home page plus product pages with SEO metadata.
+    """
+    name = re.sub(r"^https?://(www\.)?|[/.].*$", "", root) or "site"
+    topics = ["pricing", "features", "reviews", "contact", "blog", "delivery", "sale", "support", "faq", "about", "guide"]
+    result = []
+    for index, topic in enumerate(["home"] + topics[:pages - 1]):
+        url = root if topic == "home" else root.rstrip("/") + f"/{topic}"
+        html = (
+            f"<html><head><title>{name} {topic}</title>"
+            f"<meta name='description' content='{name} {topic} page with offers and details'></head>"
+            f"<body><h1>{name} {topic}</h1><h2>{topic} overview</h2>"
+            f"<p>{' '.join(f'{name} {topic} {word}' for word in topics)}</p></body></html>"
+        )
+        result.append({"url": url, "status": 200, "depth": 0 if topic == "home" else 1, "html": html})
+    return result
+
+# Function: Install Crawl Stand-In
+def install_crawl_stand_in(fixtures, latency):
+    """
+    Replaces SiteCrawler.crawl_sites so crawls are recorded (record mode) or served from fixtures.
+    """
+    live_crawl = SiteCrawler.crawl_sites
+
+    async def crawl_sites(crawler, urls):
+        if fixtures.mode == "record":
+            started = time.perf_counter()
+            sites = await live_crawl(crawler, urls)
+            for url in urls:
+                fixtures.record("crawl", make_key(url), "site", sites.get(url, []), time.perf_counter() - started)
+            return sites
+
+        sites = {}
+        for url in urls:
+            record = fixtures.replay("crawl", make_key(url), "site")
+            sites[url] = record["value"] if record else synthetic_pages(url)
+            await asyncio.sleep(latency.seconds("crawl") * len(sites[url]))
+        return sites
+
+    SiteCrawler.crawl_sites = crawl_sites
+
+# Class: Hashed Encoder
+class HashedEncoder:
+    """
+    Embedding model stand-in: normalized character-trigram hashing vectors
+    (for machines without the sentence-transformers model).
+    """
+
+    def __init__(self, dim=384):
+        """
+        Vector size matching the default model.
+        """
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        """
+        Vector size.
+        """
+        return self.dim
+
+    def encode(self, texts, **options):
+        """
+        L2-normalized trigram count vectors.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f"  {text.lower()} "
+            for start in range(len(padded) - 2):
+                digest = hashlib.blake2b(padded[start:start + 3].encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+# Class: Benchmark Registry
+class BenchmarkRegistry(ResourceRegistry):
+    """
+    Resource registry that swaps pooled LLMs and tools for recording or replaying stand-ins
+    as they are registered, so agents are built exactly as in the app.
+    """
+
+    def __init__(self, fixtures, latency, secrets_source=None):
+        """
+        Use replay secrets unless recording with the app's secrets.
+        """
+        super().__init__(secrets_source=secrets_source or (lambda: REPLAY_SECRETS))
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def register(self, name, factory, secrets=(), health_check=None):
+        """
+        Registers the stand-in version of `name`.
+        """
+        record = self.fixtures.mode == "record"
+        kind, _, detail = name.partition(":")
+
+        if kind == "llm":
+            role = None if detail == "default" else detail
+
+            def build(**values):
+                if not record:
+                    return CachedLLM(FixtureLLM(self.fixtures, self.latency, role=role), role=role)
+                cached = factory(**values)
+                cached._llm = FixtureLLM(self.fixtures, self.latency, inner=cached._llm, role=role)
+                return cached
+        elif kind == "serper":
+            def build(**values):
+                return FixtureSerperTool(
+                    api_key=values.get("SERPER_API_KEY", ""), n_results=int(detail),
+                    fixtures=self.fixtures, latency=self.latency, live=record
+                )
+        elif name == "bigquery":
+            def build(**values):
+                inner = factory(**values) if record else None
+                return FixtureTool(fixtures=self.fixtures, latency=self.latency, inner=inner)
+            health_check = None
+        else:
+            build = factory  # Crawler tool (fetching is replaced by install_crawl_stand_in), clients
+        super().register(name, build, secrets, health_check)
+
+# Function: Install Stand-Ins
+def install_stand_ins(fixtures, latency, hashed_embeddings=False):
+    """
+    Routes every external dependency of a run through the fixtures:
+    LLMs and tools via the registry, crawling, the keyword store backend and, optionally, embeddings.
+    """
+    import utils.registry as registry_module  # Process-wide registry
+    import tools.keyword_store as keyword_store_module  # Process-wide keyword store
+
+    secrets_source = None
+    if fixtures.mode == "record":
+        secrets_source = registry_module.ResourceRegistry().secrets_source  # The app's secrets
+    registry_module._shared_registry = BenchmarkRegistry(fixtures, latency, secrets_source)
+    install_crawl_stand_in(fixtures, latency)
+
+    # Recording keeps the app's keyword source (none if unconfigured); replay always has one
+    if fixtures.mode == "record":
+        live_store = get_keyword_store()
+        if live_store is not None:
+            keyword_store_module._shared_store = KeywordStore(
+                FixtureKeywordBackend(fixtures, latency, inner=live_store.backend)
+            )
+    else:
+        keyword_store_module._shared_store = KeywordStore(FixtureKeywordBackend(fixtures, latency))
+
+    if hashed_embeddings:
+        from tools.embedding_service import get_embedding_service  # Shared embedding service
+
+        get_embedding_service()._model = HashedEncoder()
+
+# End of file: benchmarks/replay_fixtures.py
@@ -4,25 +4,44 @@
 # Purpose: Provides Streamlit interface for Business Analyst tasks
 ###############################################
 
-# Import SQLite compatibility fix for GitHub environment
-__import__('pysqlite3')  # Ensure SQLite works in certain environments
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')  # Replace sqlite3 with pysqlite3
-
 # Import required libraries
 import streamlit as st  # Streamlit for UI handling
-from crewai import Crew  # CrewAI framework for handling agents and tasks
+from utils.job_ui import render_job, start_job  # Background job helpers
+from utils.sem_pipeline import sem_plan_job  # Business stage of the SEM pipeline
+
+# Session state key for this page's background job
+JOB_KEY = "business_analyst_job"
+
+# Function: Business Job
+def business_job(job, business_name, product_service, target_audience):
+    """
+    Background job: runs the business stage of the SEM pipeline
+    (a stored result for the same inputs and prompts is reused).
+    """
+    inputs = {"business_name": business_name, "product_service": product_service, "target_audience": target_audience}
+    return sem_plan_job(job, inputs, only=["business"])["business"]
+
+# Function: Render Business Analysis
+def render_business_analysis(result):
+    """
+    Displays task descriptions and the generated report.
+    """
+    st.subheader("Research Task Description")
+    st.markdown(result["research_description"])  # Show research task details
 
-# Import Business Analyst agents and tasks
-from src.agents.agent_01_business_analyst import create_business_analyst_agents
-from tasks.task_01_business_analyst import create_business_analyst_tasks
+    st.subheader("Writing Task Description")
+    st.markdown(result["writing_description"])  # Show writing task details
+
+    st.subheader("Generated Business Analysis Report")
+    for output in result["outputs"]:
+        st.markdown(output)
 
 # Function: Run Business Analyst Page
 def run_business_analyst():
     """
     Streamlit interface for Business Analyst tasks:
     - Allows users to input business details.
-    - Generates business analysis report based on inputs.
+    - Generates business analysis report based on inputs in the background.
     """
     # Page Title
     st.title("📋 Business Analyst")
@@ -36,36 +55,15 @@ def run_business_analyst():
     if st.button("Generate Business Analysis"):
         # Validate inputs
         if business_name and product_service and target_audience:
-            # Step 1: Create agents for research and writing tasks
-            senior_research_business_analyst, senior_writer_business_analyst = create_business_analyst_agents()
-
-            # Step 2: Create tasks using the agents
-            research_task, writing_task = create_business_analyst_tasks(
-                senior_research_business_analyst,
-                senior_writer_business_analyst,
-                business_name,
-                product_service,
-                target_audience
+            start_job(
+                JOB_KEY, "Business Analysis", business_job, business_name, product_service, target_audience,
+                pipeline_inputs={"business_name": business_name, "product_service": product_service, "target_audience": target_audience}
             )
-
-            # Step 3: Display task descriptions
-            st.subheader("Research Task Description")
-            st.markdown(research_task.description)  # Show research task details
-
-            st.subheader("Writing Task Description")
-            st.markdown(writing_task.description)  # Show writing task details
-
-            # Step 4: Execute tasks
-            crew = Crew(agents=[senior_research_business_analyst, senior_writer_business_analyst], tasks=[research_task, writing_task])
-            results = crew.kickoff()
-
-            # Step 5: Display results
-            st.subheader("Generated Business Analysis Report")
-            for result in results:
-                st.markdown(result)
-
         else:
             # Warning if inputs are incomplete
             st.warning("Please fill in all fields before generating the analysis.")
 
+    # Show progress or results of the latest run (survives reruns and page switches)
+    render_job(JOB_KEY, render_business_analysis)
+
 # End of file: pages/page_01_business_analyst.py
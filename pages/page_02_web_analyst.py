@@ -4,23 +4,54 @@
 # Purpose: Provides Streamlit interface for Web Analyst tasks
 ###############################################
 
-# Import SQLite compatibility fix for GitHub environment
-__import__('pysqlite3')  # Ensure SQLite works in certain environments
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')  # Replace sqlite3 with pysqlite3
-
 # Import required libraries
 import streamlit as st  # Streamlit for UI handling
-from crewai import Crew  # CrewAI framework for handling agents and tasks
-from agents.agent_02_website_analyst import WebsiteAnalystAgents  # Import agents
-from tasks.task_02_website_analyst import WebsiteAnalystTasks  # Import tasks
+from utils.job_ui import render_job, start_job  # Background job helpers
+from utils.sem_pipeline import sem_plan_job  # Website stage of the SEM pipeline
+
+# Session state key for this page's background job
+JOB_KEY = "web_analyst_job"
+
+# Function: Website Job
+def website_job(job, our_url, competitor_urls):
+    """
+    Background job: runs the website stage of the SEM pipeline
+    (a stored result for the same URLs from the last day is reused).
+    """
+    return sem_plan_job(job, {"our_url": our_url, "competitor_urls": competitor_urls}, only=["website"])["website"]
+
+# Function: Render Website Analysis
+def render_website_analysis(result):
+    """
+    Displays the extracted summary, analysis results and key recommendations.
+    """
+    if result.get("reused_analysis"):
+        st.info("No material changes since the last analysis; showing the previous analysis.")
+    if result.get("changes"):
+        with st.expander("Changes Since the Last Analysis"):
+            st.table([{"Site": site, **counts} for site, counts in result["changes"].items()])
+
+    with st.expander("Extracted SEO Summary"):
+        st.markdown(result["seo_summary"])
+
+    st.subheader("Analysis Results")
+    for output in result["outputs"]:
+        st.markdown(output)
+
+    # Key Recommendations
+    st.subheader("Key Insights and Recommendations")
+    st.markdown("""
+    - **Optimize Metadata:** Update titles and descriptions for better SEO.
+    - **Keyword Optimization:** Focus on high-performing keywords.
+    - **Improve Content Structure:** Ensure content aligns with target keywords.
+    """)
 
 # Function: Run Web Analyst Page
 def run_web_analyst():
     """
     Streamlit interface for Web Analyst tasks:
     - Allows users to input website URLs.
-    - Analyzes metadata and keywords for SEO optimization.
+    - Analyzes metadata and keywords for SEO optimization in the background.
     """
     # Page Title
     st.title("🌐 Web Analyst")
@@ -28,39 +59,24 @@ def run_web_analyst():
     # Collect user input
     our_url = st.text_input("Enter your website URL:", placeholder="https://www.ourwebsite.com")
     competitor_url = st.text_input("Enter competitor's website URL:", placeholder="https://www.competitor.com")
+    other_competitors = st.text_area(
+        "Additional competitor URLs (optional, one per line):", placeholder="https://www.competitor2.com"
+    )
 
     # Analyze Button
     if st.button("Analyze Websites"):
         # Validate inputs
         if our_url and competitor_url:
-            try:
-                # Step 1: Create agents and tasks
-                agents = WebsiteAnalystAgents()
-                tasks = WebsiteAnalystTasks()
-                agent = agents.web_analyst_agent()
-                analysis_task = tasks.website_analysis_task(agent, our_url, competitor_url)
-
-                # Step 2: Execute task
-                crew = Crew(agents=[agent], tasks=[analysis_task], verbose=True)
-                results = crew.kickoff()
-
-                # Step 3: Display results
-                st.subheader("Analysis Results")
-                for result in results:
-                    st.markdown(result)
-
-                # Key Recommendations
-                st.subheader("Key Insights and Recommendations")
-                st.markdown("""
-                - **Optimize Metadata:** Update titles and descriptions for better SEO.
-                - **Keyword Optimization:** Focus on high-performing keywords.
-                - **Improve Content Structure:** Ensure content aligns with target keywords.
-                """)
-
-            except Exception as e:
-                st.error(f"An error occurred during analysis: {str(e)}")
+            competitor_urls = [competitor_url] + [url.strip() for url in other_competitors.splitlines() if url.strip()]
+            start_job(
+                JOB_KEY, "Website Analysis", website_job, our_url, competitor_urls,
+                pipeline_inputs={"our_url": our_url, "competitor_urls": competitor_urls}
+            )
         else:
             # Warning if inputs are incomplete
             st.warning("Please provide both URLs for analysis.")
 
+    # Show progress or results of the latest run (survives reruns and page switches)
+    render_job(JOB_KEY, render_website_analysis)
+
 # End of file: pages/page_02_web_analyst.py
@@ -4,23 +4,51 @@
 # Purpose: Provides Streamlit interface for Keyword Planner tasks
 ###############################################
 
-# Import SQLite compatibility fix for GitHub environment
-__import__('pysqlite3')  # Ensure SQLite works in certain environments
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')  # Replace sqlite3 with pysqlite3
-
 # Import required libraries
 import streamlit as st  # Streamlit for UI handling
-from crewai import Crew  # CrewAI framework for handling agents and tasks
-from agents.agent_03_keyword_planner import KeywordPlannerAgents  # Import Keyword Planner agents
-from tasks.task_03_keyword_planner import KeywordPlannerTasks  # Import Keyword Planner tasks
+from utils.job_ui import render_job, start_job  # Background job helpers
+from utils.sem_pipeline import sem_plan_job, split_keywords  # Keyword stages of the SEM pipeline
+
+# Session state key for this page's background job
+JOB_KEY = "keyword_planner_job"
+
+# Keyword Planner stages, in report order (discovery and trend run in parallel)
+KEYWORD_STAGES = ("keyword_discovery", "keyword_categorization", "keyword_trend")
+
+# Function: Keyword Plan Job
+def keyword_plan_job(job, query_input):
+    """
+    Background job: runs the Keyword Planner stages of the SEM pipeline.
+    Returns plain data so results can be rendered after any rerun.
+    """
+    results = sem_plan_job(job, {"keywords": query_input}, only=KEYWORD_STAGES)
+    return {"keywords": split_keywords(query_input), "outputs": [results[stage] for stage in KEYWORD_STAGES]}
+
+# Function: Render Keyword Plan
+def render_keyword_plan(result):
+    """
+    Displays each task output and key recommendations.
+    """
+    st.subheader("Keyword Plan Report")
+    for i, output in enumerate(result["outputs"]):
+        st.markdown(f"### Task {i + 1} Output")
+        st.write(output)
+
+    # Key Recommendations
+    st.subheader("Key Recommendations")
+    st.markdown("""
+    - **Focus on Keyword Gaps:** Target missing keywords for SEM improvement.
+    - **Use Negative Keywords:** Reduce irrelevant traffic and ad spend.
+    - **Ad Group Structuring:** Group keywords into themes for targeted ads.
+    - **Optimize Metadata:** Enhance descriptions and headlines based on findings.
+    """)
 
 # Function: Run Keyword Planner Page
 def run_keyword_planner():
     """
     Streamlit interface for Keyword Planner tasks:
     - Allows users to input keywords for analysis.
-    - Generates keyword plans based on SEM strategies.
+    - Generates keyword plans based on SEM strategies in the background.
     """
     # Page Title
     st.title("🔑 Keyword Planner")
@@ -28,51 +56,19 @@ def run_keyword_planner():
 
     # Collect user input
     query_input = st.text_input(
-        "Enter Keywords or Topics:", placeholder="Enter keywords or topics to analyze."
+        "Enter Keywords or Topics:", placeholder="Enter keywords or topics to analyze (comma-separated)."
     )
 
     # Generate Keyword Plan Button
     if st.button("Generate Keyword Plan"):
         # Validate inputs
         if query_input:
-            try:
-                # Step 1: Initialize agents and tasks
-                agents = KeywordPlannerAgents()
-                tasks = KeywordPlannerTasks()
-                keyword_planner = agents.keyword_planner_agent()
-
-                # Step 2: Create tasks for keyword discovery and categorization
-                discovery_task = tasks.keyword_discovery_task(keyword_planner, query_input)
-                categorization_task = tasks.keyword_categorization_task(keyword_planner, [query_input])
-                trend_task = tasks.keyword_trend_analysis_task(keyword_planner, query_input)
-
-                # Step 3: Create Crew and execute tasks
-                crew = Crew(
-                    agents=[keyword_planner],
-                    tasks=[discovery_task, categorization_task, trend_task],
-                    verbose=True,
-                )
-                results = crew.kickoff()
-
-                # Step 4: Display results
-                st.subheader("Keyword Plan Report")
-                for i, result in enumerate(results):
-                    st.markdown(f"### Task {i + 1} Output")
-                    st.write(result)
-
-                # Key Recommendations
-                st.subheader("Key Recommendations")
-                st.markdown("""
-                - **Focus on Keyword Gaps:** Target missing keywords for SEM improvement.
-                - **Use Negative Keywords:** Reduce irrelevant traffic and ad spend.
-                - **Ad Group Structuring:** Group keywords into themes for targeted ads.
-                - **Optimize Metadata:** Enhance descriptions and headlines based on findings.
-                """)
-
-            except Exception as e:
-                st.error(f"An error occurred while generating the keyword plan: {str(e)}")
+            start_job(JOB_KEY, "Keyword Plan", keyword_plan_job, query_input, pipeline_inputs={"keywords": query_input})
         else:
             # Warning if inputs are incomplete
             st.warning("Please provide keywords or topics for analysis.")
 
+    # Show progress or results of the latest run (survives reruns and page switches)
+    render_job(JOB_KEY, render_keyword_plan)
+
 # End of file: pages/page_03_keyword_planner.py
@@ -4,61 +4,109 @@
 # Purpose: Provides Streamlit interface for generating SEM text ads
 ###############################################
 
-# Import SQLite compatibility fix for GitHub environment
-__import__('pysqlite3')  # Ensure SQLite works in certain environments
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')  # Replace sqlite3 with pysqlite3
-
 # Import required libraries
 import streamlit as st  # Streamlit for UI handling
-from crewai import Crew  # CrewAI framework for handling agents and tasks
-from agents.agent_04_adcopywriter import AdcopyWriterAgents  # Import Ad Copywriter agents
-from tasks.task_04_adcopy_writer import AdCopyWriterTasks  # Import Ad Copywriter tasks
+from pages.page_01_business_analyst import JOB_KEY as BUSINESS_JOB_KEY  # Upstream page jobs
+from pages.page_02_web_analyst import JOB_KEY as WEBSITE_JOB_KEY
+from pages.page_03_keyword_planner import JOB_KEY as KEYWORD_JOB_KEY, KEYWORD_STAGES
+from tools.ad_copy import DEFAULT_VARIANTS, LIMITS  # Ad variants and Google Ads limits
+from utils.job_runner import SUCCEEDED  # Job states
+from utils.job_ui import current_job, job_inputs, render_job, start_job  # Background job helpers
+from utils.sem_pipeline import sem_plan_job, split_keywords  # The SEM pipeline shared with the other pages
+
+# Session state key for this page's background job
+JOB_KEY = "ad_copywriter_job"
+
+# Function: Upstream Result
+def upstream_result(session_key):
+    """
+    Result of the latest successful run on another page in this session, or None.
+    """
+    job = current_job(session_key)
+    return job.result if job is not None and job.status == SUCCEEDED else None
+
+# Function: Text Ads Job
+def text_ads_job(job, inputs, completed):
+    """
+    Background job: runs the ad_copy stage of the SEM pipeline on the results of the other pages
+    (`completed`); a stored result for the same inputs is reused, missing keyword stages are computed.
+    The run uses the agent memory of the client named by the upstream inputs (see sem_plan_job).
+    Returns plain data so results can be rendered after any rerun.
+    """
+    return {"ads": sem_plan_job(job, inputs, only=["ad_copy"], completed=completed)["ad_copy"]}
+
+# Function: Render Text Ads
+def render_text_ads(result):
+    """
+    Displays each ad variant's headlines and descriptions with their character counts.
+    """
+    ads = result["ads"]
+    st.subheader("Generated Text Ads")
+    for number, ad in enumerate(ads["variants"], start=1):
+        st.markdown(f"#### Ad {number}")
+        for field in ("headlines", "descriptions"):
+            st.dataframe(
+                [{field.title()[:-1]: text, "Characters": f"{len(text)}/{LIMITS[field]}"} for text in ad[field]],
+                hide_index=True
+            )
+
+    if ads["issues"]:
+        st.warning("Some lines still break the Google Ads rules:\n" + "\n".join(
+            f"- Ad {issue['variant'] + 1}, {issue['field'][:-1]} {issue['index'] + 1}: {issue['problem']}"
+            for issue in ads["issues"]
+        ))
+    if ads["repair_calls"]:
+        st.caption(f"Failing lines were rewritten in {ads['repair_calls']} follow-up call(s).")
 
 # Function: Run Ad Copywriter Page
 def run_ad_copywriter():
     """
     Streamlit interface for Ad Copywriter tasks:
-    - Generates SEM text ads with headlines and descriptions.
+    - Generates several SEM text ad variants with headlines and descriptions in the background,
+      as the ad_copy stage of the SEM pipeline on the results of the other pages.
+    - Lines are checked against Google Ads limits; failing lines are rewritten individually.
     """
     # Page Title
     st.title("✍️ Ad Copywriter")
     st.markdown("Generate compelling Google Ads text, including headlines and descriptions, for SEM campaigns.")
 
-    # Button to trigger text ad generation
-    if st.button("Generate Text Ads"):
-        try:
-            # Step 1: Initialize agents and tasks
-            agents = AdcopyWriterAgents()
-            tasks = AdCopyWriterTasks()
-            ad_copywriter = agents.adcopy_writer_agent()
-
-            # Step 2: Create Ad Copywriting Task
-            ad_copywriter_task = tasks.ad_copywriter_task(ad_copywriter)
+    # Results (and pipeline inputs) of the other pages in this session feed the ads
+    inputs, completed, used = {}, {}, []
+    for label, session_key, stage in (
+        ("Business Analysis", BUSINESS_JOB_KEY, "business"), ("Website Analysis", WEBSITE_JOB_KEY, "website")
+    ):
+        result = upstream_result(session_key)
+        if result is not None:
+            inputs.update(job_inputs(session_key))
+            completed[stage] = result
+            used.append(label)
+    keyword_result = upstream_result(KEYWORD_JOB_KEY)
+    if keyword_result is not None:
+        used.append("Keyword Planning")
+    st.caption(f"Using results from: {', '.join(used)}" if used else "Run the other pages first to tailor the ads.")
 
-            # Step 3: Create Crew and execute tasks
-            crew = Crew(
-                agents=[ad_copywriter],
-                tasks=[ad_copywriter_task],
-                verbose=True
-            )
-            result = crew.kickoff()
-
-            # Step 4: Display Results
-            st.subheader("Generated Text Ads")
-
-            # Display headlines
-            st.markdown("### Headlines:")
-            for i, headline in enumerate(result.get('headlines', []), start=1):
-                st.write(f"{i}. {headline}")
+    # Keywords every ad should carry (from the Keyword Planner run) and the number of ad variants
+    keywords = st.text_input(
+        "Keywords to include:", value=", ".join(keyword_result.get("keywords", [])) if keyword_result else "",
+        placeholder="Comma-separated keywords each ad should contain"
+    )
+    variants = st.number_input("Ad variants:", min_value=1, max_value=5, value=DEFAULT_VARIANTS)
 
-            # Display descriptions
-            st.markdown("### Descriptions:")
-            for i, description in enumerate(result.get('descriptions', []), start=1):
-                st.write(f"{i}. {description}")
+    # Button to trigger text ad generation
+    if st.button("Generate Text Ads"):
+        if split_keywords(keywords):
+            # Same keywords as the Keyword Planner run: its plan is reused, otherwise the keyword stages run first
+            same_plan = keyword_result is not None and split_keywords(keywords) == keyword_result["keywords"]
+            if same_plan:
+                completed.update(zip(KEYWORD_STAGES, keyword_result["outputs"]))
+            inputs["keywords"] = job_inputs(KEYWORD_JOB_KEY).get("keywords", keywords) if same_plan else keywords
+            inputs["ad_variants"] = int(variants)
+            start_job(JOB_KEY, "Text Ads", text_ads_job, inputs, completed, pipeline_inputs=inputs)
+        else:
+            # Warning if inputs are incomplete
+            st.warning("Please provide keywords, or run the Keyword Planner first.")
 
-        except Exception as e:
-            # Handle errors
-            st.error(f"An error occurred while generating text ads: {str(e)}")
+    # Show progress or results of the latest run (survives reruns and page switches)
+    render_job(JOB_KEY, render_text_ads)
 
 # End of file: pages/page_04_ad_copywriter.py
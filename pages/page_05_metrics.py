@@ -0,0 +1,182 @@
+###############################################
+# Metrics Page
+# File: pages/page_05_metrics.py
+# Purpose: Latency and token metrics per stage, LLM call and tool call from the recorded spans
+###############################################
+
+# Import required libraries
+import time  # Time windows
+import pandas as pd  # Span aggregation
+import streamlit as st  # Streamlit for UI handling
+from utils.agent_memory import get_memory_store  # Agent memory per client
+from utils.artifact_store import get_artifact_store  # Stored stage results
+from utils.rate_limiter import limiter_stats  # Live provider rate limits
+from utils.telemetry import get_tracer  # Recorded spans
+
+# Selectable time windows in days
+WINDOWS = {"Last 24 hours": 1, "Last 7 days": 7, "Last 30 days": 30}
+
+# Spans measuring what a user waits for (pipeline stages and whole page runs)
+STAGE_SPANS = ("stage", "job")
+
+# Function: Span Frame
+def span_frame(spans):
+    """
+    Flattens span dicts into a DataFrame with timing, stage and token columns.
+    """
+    frame = pd.DataFrame(spans)
+    attributes = frame.pop("attributes")
+    frame["stage"] = frame["stage"].fillna("(none)")
+    frame["started"] = pd.to_datetime(frame["start_ns"], unit="ns")
+    frame["day"] = frame["started"].dt.floor("D")
+    frame["seconds"] = frame["duration_ms"] / 1000
+    frame["error"] = frame["status"] == "ERROR"
+    for column, key in (
+        ("input_tokens", "gen_ai.usage.input_tokens"),
+        ("output_tokens", "gen_ai.usage.output_tokens"),
+        ("bytes_scanned", "sem.bigquery.bytes_processed"),
+        ("prompt_tokens_in", "sem.prompt.tokens_in"),
+        ("prompt_tokens_kept", "sem.prompt.tokens_kept"),
+    ):
+        frame[column] = [attrs.get(key) or 0 for attrs in attributes]
+    frame["cache_hit"] = [bool(attrs.get("sem.cache_hit")) for attrs in attributes]
+    frame["prompt_trimmed"] = [attrs.get("sem.prompt.trimmed") or [] for attrs in attributes]
+    return frame
+
+# Function: Compaction Summary
+def compaction_summary(stages):
+    """
+    Prompt data tokens before and after compaction per stage, and how often prompts were trimmed.
+    """
+    grouped = stages.groupby("stage")
+    summary = pd.DataFrame({
+        "runs": grouped.size(),
+        "tokens in": grouped["prompt_tokens_in"].sum(),
+        "tokens kept": grouped["prompt_tokens_kept"].sum(),
+        "trimmed runs": grouped["prompt_trimmed"].apply(lambda trimmed: sum(1 for reports in trimmed if reports)),
+    })
+    summary["kept share"] = summary["tokens kept"] / summary["tokens in"]
+    return summary.sort_values("tokens in", ascending=False).round(2)
+
+# Function: Latency Summary
+def latency_summary(frame, by):
+    """
+    Count, p50/p95/max latency in seconds, total time and error rate per `by` group.
+    """
+    grouped = frame.groupby(by)["seconds"]
+    summary = pd.DataFrame({
+        "runs": grouped.size(),
+        "p50 (s)": grouped.quantile(0.5),
+        "p95 (s)": grouped.quantile(0.95),
+        "max (s)": grouped.max(),
+        "total (s)": grouped.sum(),
+        "error rate": frame.groupby(by)["error"].mean(),
+    })
+    return summary.sort_values("total (s)", ascending=False).round(2)
+
+# Function: Token Summary
+def token_summary(llm_calls):
+    """
+    LLM calls, cache hit rate and tokens per stage (tokens per run averaged over traces).
+    """
+    grouped = llm_calls.groupby("stage")
+    summary = pd.DataFrame({
+        "calls": grouped.size(),
+        "cache hit rate": grouped["cache_hit"].mean(),
+        "input tokens": grouped["input_tokens"].sum(),
+        "output tokens": grouped["output_tokens"].sum(),
+        "tokens per run": (grouped["input_tokens"].sum() + grouped["output_tokens"].sum()) / grouped["trace_id"].nunique(),
+        "p50 call (s)": grouped["seconds"].quantile(0.5),
+        "p95 call (s)": grouped["seconds"].quantile(0.95),
+    })
+    return summary.sort_values("input tokens", ascending=False).round(2)
+
+# Function: Run Metrics Page
+def run_metrics():
+    """
+    Streamlit interface for run metrics:
+    - p50/p95 latency per stage, and over time.
+    - Token use per stage, prompt compaction and the slowest operations overall.
+    - Current provider rate limits of this process.
+    """
+    # Page Title
+    st.title("📈 Metrics")
+    st.markdown("Latency and token use of SEM planner runs, from the spans recorded for every run.")
+
+    window = st.selectbox("Time window", list(WINDOWS), index=1)
+    spans = get_tracer().query(since_ns=time.time_ns() - WINDOWS[window] * 86400 * 10**9)
+    if not spans:
+        st.info("No runs recorded in this window yet. Run one of the other pages first.")
+        return
+    frame = span_frame(spans)
+
+    # Stage latency
+    st.subheader("Stage latency")
+    stages = frame[frame["name"].isin(STAGE_SPANS)]
+    st.dataframe(latency_summary(stages, "stage"))
+
+    percentile = st.radio("Latency over time", ["p50", "p95"], horizontal=True)
+    daily = stages.groupby(["day", "stage"])["seconds"].quantile(0.5 if percentile == "p50" else 0.95)
+    st.line_chart(daily.unstack("stage"), y_label=f"{percentile} seconds")
+
+    # Token use
+    st.subheader("Token use per stage")
+    llm_calls = frame[frame["name"] == "llm.call"]
+    if llm_calls.empty:
+        st.caption("No LLM calls recorded in this window.")
+    else:
+        st.dataframe(token_summary(llm_calls))
+        tokens = llm_calls.assign(tokens=llm_calls["input_tokens"] + llm_calls["output_tokens"])
+        st.bar_chart(tokens.groupby(["day", "stage"])["tokens"].sum().unstack("stage"), y_label="tokens")
+        st.caption("Token counts are provider-reported where available, otherwise estimated locally; cached calls use none.")
+
+    # Prompt compaction: data cut to fit the per-task token budgets
+    st.subheader("Prompt compaction")
+    compacted = stages[stages["prompt_tokens_in"] > 0]
+    if compacted.empty:
+        st.caption("No compacted prompts recorded in this window.")
+    else:
+        st.dataframe(compaction_summary(compacted))
+        latest = [report for reports in compacted.sort_values("started")["prompt_trimmed"].tail(20) for report in reports]
+        if latest:
+            st.caption("Recently trimmed prompts: " + " | ".join(latest[-5:]))
+
+    # Hot spots: every operation type, ranked by total time spent in it
+    st.subheader("Hot spots")
+    operations = frame[~frame["name"].isin(STAGE_SPANS + ("sem_plan",))]
+    hot_spots = latency_summary(operations, "name")
+    hot_spots["cache hit rate"] = operations.groupby("name")["cache_hit"].mean().round(2)
+    hot_spots["bytes scanned"] = operations.groupby("name")["bytes_scanned"].sum()
+    st.dataframe(hot_spots)
+
+    # Slowest recent runs
+    st.subheader("Slowest runs")
+    roots = frame[frame["parent_span_id"].isna()].nlargest(10, "seconds")
+    st.dataframe(roots[["started", "name", "stage", "seconds", "status"]], hide_index=True)
+
+    # Provider rate limits (live, since the app started)
+    st.subheader("Provider rate limits")
+    limits = limiter_stats()
+    if limits:
+        st.dataframe(pd.DataFrame(limits).T.drop(columns="waiting"))
+        st.caption("Rate and concurrency adapt to throttling; wait_seconds is the total time calls queued for their turn.")
+    else:
+        st.caption("No provider calls since the app started.")
+
+    # Stored stage artifacts (reused while a stage's inputs and code/prompt version are unchanged)
+    st.subheader("Stored stage artifacts")
+    artifacts = get_artifact_store().stats()
+    if artifacts:
+        st.dataframe(pd.DataFrame(artifacts).T)
+    else:
+        st.caption("No stage results stored yet.")
+
+    # Agent memory per client (bounded by record count and age)
+    st.subheader("Agent memory")
+    memories = get_memory_store().stats()
+    if memories:
+        st.dataframe(pd.DataFrame(memories).T)
+    else:
+        st.caption("No agent memories stored yet.")
+
+# End of file: pages/page_05_metrics.py
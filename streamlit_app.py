@@ -4,33 +4,24 @@
 # Purpose: Main entry point for the SEM Planner application.
 ###############################################
 
-# Ensure compatibility for SQLite in certain environments
-__import__('pysqlite3')  # Fix SQLite compatibility for Streamlit
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+# Apply process-wide setup (SQLite compatibility fix) once, before anything imports sqlite3
+from utils.bootstrap import apply_sqlite_fix
+apply_sqlite_fix()
 
 # Import required libraries
-from crewai import Crew  # CrewAI framework for agents and tasks
+import importlib  # Load only the selected page
 from streamlit_option_menu import option_menu  # Sidebar navigation menu
 import streamlit as st  # Streamlit for UI rendering
 
-# Import modularized Agents
-from agents.agent_01_business_analyst import BusinessAnalystAgents
-from agents.agent_02_website_analyst import WebsiteAnalystAgents
-from agents.agent_03_keyword_planner import KeywordPlannerAgents
-from agents.agent_04_adcopywriter import AdcopyWriterAgents
-
-# Import modularized Tasks
-from tasks.task_01_business_analyst import BusinessAnalystTasks
-from tasks.task_02_website_analyst import WebsiteAnalystTasks
-from tasks.task_03_keyword_planner import KeywordPlannerTasks
-from tasks.task_04_adcopy_writer import AdCopyWriterTasks
-
-# Import views for modular UI handling
-from src.pages.page_01_business_analyst import run_business_analyst
-from pages.page_02_web_analyst import run_web_analyst
-from pages.page_03_keyword_planner import run_keyword_planner
-from pages.page_04_ad_copywriter import run_ad_copywriter
+# Pages: menu label -> (header, page module, entry function)
+# Modules are imported on first selection, so each page loads only its own agent/task stack.
+PAGES = {
+    "Business Analyst": ("📋 Business Analyst", "pages.page_01_business_analyst", "run_business_analyst"),
+    "Web Analyst": ("🌐 Web Analyst", "pages.page_02_web_analyst", "run_web_analyst"),
+    "Keyword Planner": ("🔑 Keyword Planner", "pages.page_03_keyword_planner", "run_keyword_planner"),
+    "Ad Copywriter": ("✍️ Ad Copywriter", "pages.page_04_ad_copywriter", "run_ad_copywriter"),
+    "Metrics": ("📈 Metrics", "pages.page_05_metrics", "run_metrics"),
+}
 
 # Configure Streamlit page settings
 st.set_page_config(
@@ -40,14 +31,6 @@ st.set_page_config(
     page_icon="🧠"  # Icon for the app
 )
 
-# Set Streamlit page configuration
-st.set_page_config(
-    layout="wide", 
-    initial_sidebar_state="expanded", 
-    page_title="SEM Planner - AI Powered App", 
-    page_icon="🧠"
-)
-
 # Sidebar Header and App Info
 st.sidebar.title("SEM Planner - AI Powered App")
 st.sidebar.info(
@@ -57,6 +40,7 @@ st.sidebar.info(
     - 🌐 Analyze Websites and Keywords
     - 🔑 Optimize Keyword Strategies
     - ✍️ Generate Ad Copies
+    - 📈 Monitor Run Metrics
     """
 )
 
@@ -64,27 +48,15 @@ st.sidebar.info(
 with st.sidebar:
     selected = option_menu(
         "Navigation Menu",
-        ["Business Analyst", "Web Analyst", "Keyword Planner", "Ad Copywriter"],
-        icons=["briefcase", "globe", "key", "pencil"],
+        list(PAGES),
+        icons=["briefcase", "globe", "key", "pencil", "bar-chart"],
         default_index=0
     )
 
-# Route to the selected module
-if selected == "Business Analyst":
-    st.header("📋 Business Analyst")
-    run_business_analyst()
-
-elif selected == "Web Analyst":
-    st.header("🌐 Web Analyst")
-    run_web_analyst()
-
-elif selected == "Keyword Planner":
-    st.header("🔑 Keyword Planner")
-    run_keyword_planner()
-
-elif selected == "Ad Copywriter":
-    st.header("✍️ Ad Copywriter")
-    run_ad_copywriter()
+# Route to the selected module (imported on demand, cached in sys.modules afterwards)
+header, module_name, entry = PAGES[selected]
+st.header(header)
+getattr(importlib.import_module(module_name), entry)()
 
 # Footer
 st.sidebar.markdown("---")
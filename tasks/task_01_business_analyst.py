@@ -1,14 +1,9 @@
 ###############################################
 # Business Analyst Tasks
-# File: tasks/task_01_business_analyst_.py
+# File: tasks/task_01_business_analyst.py
 # Purpose: Defines tasks for the Business Analyst agent to perform research and report writing
 ###############################################
 
-# Import SQLite compatibility fix for GitHub environment
-__import__('pysqlite3')  # Ensure SQLite works in certain environments
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')  # Replace sqlite3 with pysqlite3
-
 # Import required libraries
 import streamlit as st  # Streamlit for UI and secrets management
 from crewai import Task  # CrewAI framework for task handling
@@ -69,4 +64,4 @@ def create_business_analyst_tasks(senior_research_business_analyst, senior_write
     # Return both tasks
     return research_task, writing_task
 
-# End of file: tasks/task_01_business_analyst_.py
+# End of file: tasks/task_01_business_analyst.py
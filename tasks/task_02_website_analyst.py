@@ -8,15 +8,47 @@
 from crewai import Task  # Core CrewAI framework for tasks
 from textwrap import dedent  # For multi-line string formatting
 from crewai_tools import SerperDevTool, ScrapeWebsiteTool  # Tools for web search and scraping
+from tools.tfidf_engine import KeywordTfidfEngine, format_similarity_report  # Local TF-IDF similarity
+from utils.prompt_compaction import PromptBudget  # Token budgets for prompt data
 
 # Class: Website Analyst Tasks
 class WebsiteAnalystTasks:
 
-    def website_analysis_task(self, agent, our_url, competitor_url):
+    def website_analysis_task(self, agent, our_url, competitor_url, seo_summary=None):
         """
         Task: Analyze and compare metadata and keywords from two websites.
         Purpose: Identify SEM gaps, keyword opportunities, and optimization strategies.
+        When `seo_summary` (from tools.seo_extractor) is given, extraction, tokenization
+        and gap detection are already done locally and the agent only interprets them;
+        the summary (with any change report) is kept within the task's token budget.
         """
+        if seo_summary is not None:
+            budget = PromptBudget("website_analysis")
+            seo_summary = budget.text("seo summary", seo_summary)
+            budget.finish()
+
+            # The summary is appended after dedent so its own line breaks don't defeat dedent
+            return Task(
+                description=dedent(f"""
+                    Interpret the SEO metadata and keyword comparison of two websites.
+                    Metadata, keywords and keyword gaps were extracted locally from every crawled page;
+                    do not scrape the websites again.
+
+                    URLs:
+                    - Our Website: {our_url}
+                    - Competitor Website: {competitor_url}
+
+                    Deliverables:
+                    1. Assess metadata quality (titles, descriptions, headings, structured data).
+                    2. Explain the most important keyword gaps and opportunities.
+                    3. Recommend prioritized SEO/SEM optimizations.
+
+                    Extracted Summary:
+                """) + seo_summary,
+                expected_output="Markdown summary of metadata, keyword comparisons, and SEM insights.",
+                agent=agent
+            )
+
         return Task(
             description=dedent(f"""
                 Perform metadata and keyword analysis to compare two websites.
@@ -32,7 +64,7 @@ class WebsiteAnalystTasks:
                 3. Highlight keyword gaps and opportunities.
 
                 Tools Used:
-                - Web scraping for metadata.
+                - Site crawler: call it once with both URLs to fetch both websites concurrently.
                 - Keyword extraction and analysis.
             """),
             expected_output="Markdown summary of metadata, keyword comparisons, and SEM insights.",
@@ -43,38 +75,58 @@ class WebsiteAnalystTasks:
         """
         Task: Compare keyword similarities using TF-IDF and cosine similarity.
         Purpose: Evaluate keyword overlaps, gaps, and optimization opportunities.
+        `competitor_keywords` is a keyword list for one competitor or {name: keywords} for N;
+        scores are computed locally in one pass and only the results go into the prompt.
         """
+        if not isinstance(competitor_keywords, dict):
+            competitor_keywords = {"Competitor": competitor_keywords}
+
+        # Fit one vocabulary over our site plus every competitor
+        engine = KeywordTfidfEngine().fit({"Our Website": our_keywords, **competitor_keywords})
+        budget = PromptBudget("keyword_similarity")
+        report = budget.text("similarity report", format_similarity_report(engine.compare("Our Website")))
+        budget.finish()
+
         return Task(
             description=dedent(f"""
-                Analyze keyword similarity between two sets of keywords.
-                Provide scores and insights into overlaps and gaps.
-
-                Keywords:
-                - Our Keywords: {', '.join(our_keywords)}
-                - Competitor Keywords: {', '.join(competitor_keywords)}
+                Analyze keyword similarity between our website and {len(competitor_keywords)} competitor(s).
+                TF-IDF weights and cosine similarity were computed locally; interpret the results below.
 
                 Deliverables:
-                1. TF-IDF scores and cosine similarity metrics.
-                2. Categorize similarity as Low, Medium, or High.
+                1. Explain the similarity scores and their Low, Medium, or High categories.
+                2. Prioritize the keyword gaps worth targeting and the strengths worth defending.
                 3. Recommendations for keyword optimization.
 
-                Tools Used:
-                - TF-IDF vectorizer.
-                - Cosine similarity computation.
-            """),
+                Similarity Results (TF-IDF + cosine similarity):
+            """) + report,
             expected_output="Plain text summary of similarity scores and keyword recommendations.",
             agent=agent
         )
 
-    def keyword_visualization_task(self, agent, tfidf_matrix, feature_names, top_n=5):
+    def keyword_visualization_task(self, agent, tfidf_matrix, feature_names, top_n=5, site_names=None):
         """
         Task: Generate visualizations for keyword distribution based on TF-IDF scores.
         Purpose: Highlight keyword differences and optimization opportunities.
+        `tfidf_matrix` (sites x terms) and `feature_names` come from KeywordTfidfEngine.
         """
+        site_names = site_names or [f"Site {index + 1}" for index in range(tfidf_matrix.shape[0])]
+
+        # Top weighted terms per site, read straight from the sparse rows; sites share the budget equally
+        budget = PromptBudget("keyword_visualization")
+        top_terms = []
+        for name, row in zip(site_names, tfidf_matrix):
+            order = row.data.argsort()[::-1][:top_n]
+            terms = budget.items(
+                name, [f"{feature_names[row.indices[i]]} ({row.data[i]:.2f})" for i in order],
+                weights=[row.data[i] for i in order], share=1 / len(site_names)
+            )
+            top_terms.append(f"- {name}: {terms}")
+        budget.finish()
+
         return Task(
             description=dedent(f"""
                 Generate visualizations for keyword distribution using TF-IDF scores.
-                Highlight the top {top_n} keywords for both websites.
+                Highlight the top {top_n} keywords for each website.
 
                 Deliverables:
                 1. Visual plots comparing keyword distributions.
@@ -83,7 +135,9 @@ class WebsiteAnalystTasks:
                 Tools Used:
                 - TF-IDF analysis for keyword weighting.
                 - Visualization libraries for graphical outputs.
-            """),
+
+                Top TF-IDF Keywords:
+            """) + "\n".join(top_terms),
             expected_output=f"Graphical visualizations of top {top_n} keywords with insights.",
             agent=agent
         )
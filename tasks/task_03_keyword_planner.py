@@ -8,15 +8,32 @@
 from crewai import Task  # Core CrewAI framework for tasks
 from textwrap import dedent  # For multi-line string formatting
 from crewai_tools import QueryBigQueryTool  # Tool for querying data from BigQuery
+from tools.embedding_service import get_embedding_service  # Cached keyword embeddings
+from tools.keyword_clustering import KeywordClusterer, format_cluster_summaries  # Local theme clustering
+from utils.prompt_compaction import PromptBudget  # Token budgets for prompt data
+
+# Keyword lists longer than this are clustered locally before reaching the prompt
+CLUSTER_THRESHOLD = 50
+
+# Heading for keyword data served from the local keyword store
+PRELOADED_DATA_NOTE = (
+    "\nKeyword data (already fetched from BigQuery for this topic and cached locally; "
+    "analyze it directly instead of querying BigQuery again):\n"
+)
 
 # Class: Keyword Planner Tasks
 class KeywordPlannerTasks:
 
-    def keyword_discovery_task(self, agent, query_input):
+    def keyword_discovery_task(self, agent, query_input, keyword_data=None):
         """
         Task: Discover high-potential keywords for SEM strategies.
         Purpose: Analyze keyword relevance, search volume, and competition using BigQuery.
+        `keyword_data` (a metrics table from the keyword store) replaces the BigQuery scan.
         """
+        budget = PromptBudget("keyword_discovery")
+        keyword_data = budget.text("keyword data", keyword_data) if keyword_data else None
+        budget.finish()
+
         return Task(
             description=dedent(f"""
                 Perform keyword discovery using BigQuery tools.
@@ -30,16 +47,34 @@ class KeywordPlannerTasks:
 
                 Tools Used:
                 - BigQuery for keyword data retrieval and analysis.
-            """),
+            """) + (PRELOADED_DATA_NOTE + keyword_data if keyword_data else ""),
             expected_output="A ranked list of keywords with metrics such as search volume, CPC, and competition levels.",
             agent=agent
         )
 
-    def keyword_categorization_task(self, agent, keywords):
+    def keyword_categorization_task(self, agent, keywords, volumes=None, discovery_report=None):
         """
         Task: Categorize discovered keywords into themes and match types.
         Purpose: Group keywords based on search intent and performance.
+        Large keyword lists are clustered locally into candidate ad groups first,
+        so the prompt only carries cluster summaries ({keyword: volume} ranks them).
+        A discovery report from an earlier run, when given, is appended as context.
+        Keywords (ranked by volume), clusters and the report share the task's token budget.
         """
+        budget = PromptBudget("keyword_categorization")
+        if len(keywords) > CLUSTER_THRESHOLD:
+            clusters = KeywordClusterer(get_embedding_service()).cluster(keywords, volumes)
+            summaries = budget.text("clusters", format_cluster_summaries(clusters), share=0.5)
+            keyword_block = (
+                f"Candidate ad groups ({len(clusters)} clusters from {len(keywords)} keywords, "
+                f"representative keywords listed):\n{summaries}"
+            )
+        else:
+            keyword_block = f"Keywords:\n{budget.items('keywords', keywords, weights=volumes, share=0.5)}"
+        if discovery_report:
+            keyword_block += f"\n\nKeyword Discovery Results:\n{budget.text('discovery report', discovery_report)}"
+        budget.finish()
+
         return Task(
             description=dedent(f"""
                 Categorize keywords into themes and match types (Broad, Phrase, Exact).
@@ -49,19 +84,26 @@ class KeywordPlannerTasks:
                 1. Classify keywords by intent: informational, navigational, and transactional.
                 2. Map each keyword to match types (Broad, Phrase, Exact) for targeting flexibility.
                 3. Highlight primary and secondary keywords for campaign structuring.
+                4. When candidate ad groups are given, name and refine them instead of regrouping every keyword.
 
                 Tools Used:
                 - BigQuery for keyword grouping and match-type classification.
-            """),
+
+            """) + keyword_block,
             expected_output="Categorized keyword list with themes, match types, and targeting suggestions.",
             agent=agent
         )
 
-    def keyword_trend_analysis_task(self, agent, keyword):
+    def keyword_trend_analysis_task(self, agent, keyword, trend_data=None):
         """
         Task: Analyze keyword trends and seasonality patterns.
         Purpose: Evaluate growth trends and seasonal fluctuations using BigQuery.
+        `trend_data` (growth, seasonality and anomaly summary from the trend engine) replaces the BigQuery scan.
         """
+        budget = PromptBudget("keyword_trend")
+        trend_data = budget.text("trend summary", trend_data) if trend_data else None
+        budget.finish()
+
         return Task(
             description=dedent(f"""
                 Analyze keyword trends using BigQuery to track changes over time.
@@ -74,7 +116,7 @@ class KeywordPlannerTasks:
 
                 Tools Used:
                 - BigQuery for keyword trend analysis.
-            """),
+            """) + (PRELOADED_DATA_NOTE + trend_data if trend_data else ""),
             expected_output="Keyword trend analysis report highlighting growth trends and seasonality insights.",
             agent=agent
         )
@@ -7,15 +7,41 @@
 # Import required libraries
 from crewai import Task  # Core CrewAI framework for tasks
 from textwrap import dedent  # For multi-line string formatting
+from tools.ad_copy import (  # Ad copy output schema and limits
+    DEFAULT_VARIANTS, DESCRIPTION_LIMIT, DESCRIPTIONS_PER_AD, HEADLINE_LIMIT, HEADLINES_PER_AD, schema_example
+)
+from utils.prompt_compaction import PromptBudget  # Token budgets for prompt data
+
+# Function: Format Upstream Outputs
+def format_upstream(sections, budget):
+    """
+    Renders {heading: text} from earlier stages as prompt context, skipping empty ones.
+    The sections share `budget`; repeated lines are dropped and long sections truncated.
+    """
+    compacted = budget.texts(sections)
+    budget.finish()
+    blocks = [f"### {heading}\n{text}" for heading, text in compacted.items()]
+    if not blocks:
+        return ""
+    return "\nUpstream Outputs:\n\n" + "\n\n".join(blocks) + "\n"
 
 # Class: Ad Copywriter Tasks
 class AdCopyWriterTasks:
 
-    def ad_copywriter_task(self, agent):
+    def ad_copywriter_task(self, agent, business_analysis=None, website_analysis=None, keyword_plan=None,
+                           keywords=None, variants=DEFAULT_VARIANTS):
         """
         Task: Generate compelling ad copy for Google Ads.
-        Purpose: Create headlines and descriptions tailored to SEM strategies with keyword integration.
+        Purpose: Create `variants` ads of headlines and descriptions with keyword integration,
+        returned as JSON matching tools.ad_copy.AdCopySet (checked and repaired locally afterwards).
+        Outputs of the earlier stages, when given, are appended as context.
         """
+        keyword_rule = f"   - At least one headline of each ad contains one of: {', '.join(keywords)}.\n" if keywords else ""
+        upstream = format_upstream({
+            "Business Analysis": business_analysis,
+            "Website Analysis": website_analysis,
+            "Keyword Planning": keyword_plan,
+        }, PromptBudget("ad_copy"))
         return Task(
             description=dedent(f"""
                 Generate Google Ads text copy, including headlines and descriptions.
@@ -27,23 +53,36 @@ class AdCopyWriterTasks:
                    - Business Analysis for audience targeting and goals.
                    - Website Analysis for metadata and SEO optimization.
                    - Keyword Planning for targeted keywords and match types.
-                2. Generate 5 headlines, each within 30 characters.
-                3. Generate 5 descriptions, each within 90 characters.
+                2. Write {variants} ad variants, each with a different angle (e.g. price, quality, speed).
+                3. Each ad has {HEADLINES_PER_AD} headlines of at most {HEADLINE_LIMIT} characters
+                   and {DESCRIPTIONS_PER_AD} descriptions of at most {DESCRIPTION_LIMIT} characters.
                 4. Optimize text for clarity, relevance, and engagement.
 
+                Rules:
+                   - Count characters, including spaces; stay within the limits.
+                   - No emoji, symbols or repeated punctuation; no exclamation marks in headlines.
+                   - No line repeats another line of the same ad.
+            """) + keyword_rule + dedent(f"""
                 Output Requirements:
-                - Headline and description pairs that align with ad strategies.
-                - Ensure output uses markdown format with bullet points for readability.
-            """),
-            expected_output="5 Headlines (30 characters each) and 5 Descriptions (90 characters each) optimized for SEM strategies in markdown format.",
+                - Return only JSON in this shape, without markdown or commentary:
+                  {schema_example(variants)}
+            """) + upstream,
+            expected_output=f"JSON with {variants} ad variants of {HEADLINES_PER_AD} headlines and {DESCRIPTIONS_PER_AD} descriptions each.",
             agent=agent
         )
 
-    def full_planner_task(self, agent):
+    def full_planner_task(self, agent, business_analysis=None, website_analysis=None, keyword_plan=None, ad_copy=None):
         """
         Task: Compile a comprehensive SEM planner report.
         Purpose: Integrate outputs from all agents to create a cohesive SEM strategy.
+        Outputs of the earlier stages, when given, are appended as context.
         """
+        upstream = format_upstream({
+            "Business Analysis": business_analysis,
+            "Website Analysis": website_analysis,
+            "Keyword Planning": keyword_plan,
+            "Ad Copywriting": ad_copy,
+        }, PromptBudget("full_plan"))
         return Task(
             description=dedent(f"""
                 Compile a full SEM planner report integrating outputs from:
@@ -56,7 +95,7 @@ class AdCopyWriterTasks:
                 1. Organize findings into sections for each analysis component.
                 2. Highlight key insights, trends, and recommendations.
                 3. Format the final report in markdown for readability and presentation.
-            """),
+            """) + upstream,
             expected_output="Complete SEM planner report formatted as markdown, integrating all agent outputs and recommendations.",
             agent=agent
         )
@@ -0,0 +1,307 @@
+###############################################
+# Ad Copy Schema and Validator
+# File: tools/ad_copy.py
+# Purpose: Structured ad copy output, local Google Ads constraint checks
+#          and targeted regeneration of only the lines that fail them
+###############################################
+
+# Import required libraries
+import json  # JSON output of the task and the repair call
+import re  # Output parsing and character checks
+import unicodedata  # Normalization before length checks
+
+from pydantic import BaseModel, Field, ValidationError  # Output schema
+
+from utils.telemetry import span  # Repair call spans
+
+# Google Ads text limits and the number of lines per ad
+HEADLINE_LIMIT = 30
+DESCRIPTION_LIMIT = 90
+HEADLINES_PER_AD = 5
+DESCRIPTIONS_PER_AD = 5
+LIMITS = {"headlines": HEADLINE_LIMIT, "descriptions": DESCRIPTION_LIMIT}
+COUNTS = {"headlines": HEADLINES_PER_AD, "descriptions": DESCRIPTIONS_PER_AD}
+
+# Ad variants written in one task call
+DEFAULT_VARIANTS = 3
+
+# Follow-up calls that regenerate failing lines before the remaining issues are fixed locally
+MAX_REPAIR_ROUNDS = 2
+
+# Characters rejected by Google Ads editorial policy (emoji, symbols, markdown leftovers)
+BANNED_CHARACTERS = re.compile(r"[\u2022\u2600-\u27BF\U0001F000-\U0001FAFF*#|~^<>{}\[\]\\]")
+REPEATED_PUNCTUATION = re.compile(r"([!?.,])\1+")
+
+# Bullets, numbering, "Headline 1:" labels, quotes and "(28 characters)" notes around a line
+LIST_ITEM = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s+(.*)$")
+LINE_LABEL = re.compile(r"^(?:headline|description)\s*\d*\s*:\s*", re.IGNORECASE)
+LENGTH_NOTE = re.compile(r"\s*[(\[]\s*\d+\s*(?:characters|chars|[\u0E00-\u0E7F]+)?\s*[)\]]\s*$", re.IGNORECASE)
+
+# Class: Text Ad
+class TextAd(BaseModel):
+    """
+    One responsive search ad variant.
+    """
+    headlines: list[str] = Field(default_factory=list, description=f"{HEADLINES_PER_AD} headlines of at most {HEADLINE_LIMIT} characters")
+    descriptions: list[str] = Field(default_factory=list, description=f"{DESCRIPTIONS_PER_AD} descriptions of at most {DESCRIPTION_LIMIT} characters")
+
+# Class: Ad Copy Set
+class AdCopySet(BaseModel):
+    """
+    Output schema of the ad copywriter task: several ad variants with different angles.
+    """
+    variants: list[TextAd] = Field(default_factory=list, description="Ad variants, each with a different angle")
+
+# Function: Schema Example
+def schema_example(variants=DEFAULT_VARIANTS):
+    """
+    Compact JSON example of the output schema, for the task prompt.
+    """
+    ad = {"headlines": ["..."] * HEADLINES_PER_AD, "descriptions": ["..."] * DESCRIPTIONS_PER_AD}
+    return json.dumps({"variants": [ad] * variants}, ensure_ascii=False)
+
+# Function: Clean Line
+def clean_line(text):
+    """
+    Strips list markers, labels, quotes and length notes the model adds around a line.
+    """
+    text = unicodedata.normalize("NFC", str(text)).strip()
+    match = LIST_ITEM.match(text)
+    if match:
+        text = match.group(1)
+    text = LENGTH_NOTE.sub("", LINE_LABEL.sub("", text.replace("**", ""))).strip()
+    return text.strip("\"'\u201c\u201d").strip()
+
+# Function: Line Key
+def line_key(text):
+    """
+    Comparison key for duplicates: case, punctuation and spacing ignored.
+    """
+    return " ".join(re.sub(r"[^\w\s\u0E00-\u0E7F]", " ", text.casefold()).split())
+
+# Function: Extract JSON
+def extract_json(text):
+    """
+    The first JSON object or array in `text` (code fences and surrounding prose ignored), or None.
+    """
+    text = text or ""
+    for opening, closing in (("{", "}"), ("[", "]")):
+        start, end = text.find(opening), text.rfind(closing)
+        if start != -1 and end > start:
+            try:
+                return json.loads(text[start:end + 1])
+            except json.JSONDecodeError:
+                continue
+    return None
+
+# Function: Parse Markdown Ads
+def parse_markdown_ads(text):
+    """
+    Fallback parser for markdown output: list items under "Headlines"/"Descriptions" headings,
+    a new variant starting whenever headlines follow descriptions.
+    """
+    variants, field = [{"headlines": [], "descriptions": []}], None
+    for line in (text or "").splitlines():
+        lowered = line.casefold()
+        item = LIST_ITEM.match(line)
+        if not item and "headline" in lowered:
+            field = "headlines"
+        elif not item and "description" in lowered:
+            field = "descriptions"
+        elif item and field:
+            if field == "headlines" and variants[-1]["descriptions"]:
+                variants.append({"headlines": [], "descriptions": []})
+            variants[-1][field].append(item.group(1))
+    return [variant for variant in variants if variant["headlines"] or variant["descriptions"]]
+
+# Function: Parse Ad Copy
+def parse_ad_copy(raw, variants=DEFAULT_VARIANTS):
+    """
+    Parses the task output into an AdCopySet with exactly `variants` ads. Never fails:
+    JSON is tried first, then markdown lists; missing ads or lines are left empty for
+    the validator to report (and the repair call to fill).
+    """
+    data = extract_json(raw)
+    if isinstance(data, list):
+        data = {"variants": data}
+    elif isinstance(data, dict) and "variants" not in data:
+        data = {"variants": [data]}
+    try:
+        ad_set = AdCopySet.model_validate(data)
+    except ValidationError:
+        ad_set = AdCopySet(variants=[TextAd(**variant) for variant in parse_markdown_ads(raw)])
+
+    ads = ad_set.variants[:variants] + [TextAd() for _ in range(variants - len(ad_set.variants))]
+    for ad in ads:
+        ad.headlines = [line for line in map(clean_line, ad.headlines) if line][:HEADLINES_PER_AD]
+        ad.descriptions = [line for line in map(clean_line, ad.descriptions) if line][:DESCRIPTIONS_PER_AD]
+    return AdCopySet(variants=ads)
+
+# Function: Line Problem
+def line_problem(text, field):
+    """
+    Why one headline or description breaks the rules, or None when it is fine.
+    """
+    if not text:
+        return "missing"
+    if len(text) > LIMITS[field]:
+        return f"{len(text)} characters (limit {LIMITS[field]})"
+    if BANNED_CHARACTERS.search(text):
+        return "contains emoji or symbols"
+    if REPEATED_PUNCTUATION.search(text):
+        return "repeated punctuation"
+    if field == "headlines" and "!" in text:
+        return "exclamation mark in a headline"
+    return None
+
+# Function: Validate Ads
+def validate_ads(ad_set, keywords=()):
+    """
+    Checks every ad against the limits, banned characters, duplicates and keyword inclusion.
+    Returns [{"variant", "field", "index", "text", "problem"}] (0-based positions).
+    """
+    keys = [line_key(keyword) for keyword in keywords if line_key(keyword)]
+    issues = []
+    for variant, ad in enumerate(ad_set.variants):
+        for field in ("headlines", "descriptions"):
+            lines = getattr(ad, field)
+            seen = set()
+            for index in range(COUNTS[field]):
+                text = lines[index] if index < len(lines) else ""
+                problem = line_problem(text, field)
+                if problem is None and line_key(text) in seen:
+                    problem = "duplicate of an earlier line"
+                seen.add(line_key(text))
+                if problem:
+                    issues.append({"variant": variant, "field": field, "index": index, "text": text, "problem": problem})
+
+        # At least one headline per ad should carry a target keyword (the first one, when rewritten)
+        if keys and not any(key in line_key(headline) for headline in ad.headlines for key in keys):
+            if not any(issue["variant"] == variant and issue["field"] == "headlines" and issue["index"] == 0 for issue in issues):
+                text = ad.headlines[0] if ad.headlines else ""
+                issues.append({"variant": variant, "field": "headlines", "index": 0, "text": text,
+                               "problem": "no headline of this ad contains a target keyword"})
+    return issues
+
+# Function: Repair Prompt
+def repair_prompt(ad_set, issues, keywords=()):
+    """
+    Follow-up prompt asking for replacements of the failing lines only.
+    """
+    lines = [
+        "Rewrite only the Google Ads lines listed below. Keep each ad's angle and tone.",
+        f"Rules: headlines at most {HEADLINE_LIMIT} characters, descriptions at most {DESCRIPTION_LIMIT} characters, "
+        "no emoji or symbols, no repeated punctuation, no exclamation marks in headlines, "
+        "no line repeating another line of the same ad.",
+    ]
+    if keywords:
+        lines.append(f"Target keywords: {', '.join(keywords)}")
+    for variant in sorted({issue["variant"] for issue in issues}):
+        ad = ad_set.variants[variant]
+        lines.append(f"\nAd {variant + 1} currently: {json.dumps(ad.model_dump(), ensure_ascii=False)}")
+    lines.append("\nLines to rewrite:")
+    for issue in issues:
+        position = f'- variant {issue["variant"] + 1}, {issue["field"]} {issue["index"] + 1}: '
+        lines.append(position + (f'"{issue["text"]}" ({issue["problem"]})' if issue["text"] else "write a new line"))
+    lines.append(
+        '\nReply with JSON only: {"fixes": [{"variant": 1, "field": "headlines", "index": 1, "text": "..."}]}'
+    )
+    return "\n".join(lines)
+
+# Function: Apply Fixes
+def apply_fixes(ad_set, response, issues):
+    """
+    Writes the replacement lines from a repair response into `ad_set`.
+    Only positions that were asked for are touched; returns how many lines were replaced.
+    """
+    data = extract_json(response)
+    fixes = data.get("fixes", []) if isinstance(data, dict) else data if isinstance(data, list) else []
+    wanted = {(issue["variant"], issue["field"], issue["index"]) for issue in issues}
+    applied = 0
+    for fix in fixes:
+        try:
+            position = (int(fix["variant"]) - 1, fix["field"], int(fix["index"]) - 1)
+            text = clean_line(fix["text"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if position not in wanted or not text:
+            continue
+        lines = getattr(ad_set.variants[position[0]], position[1])
+        if position[2] < len(lines):
+            lines[position[2]] = text
+        else:
+            lines.append(text)
+        applied += 1
+    return applied
+
+# Function: Shorten
+def shorten(text, limit):
+    """
+    Cuts `text` to `limit` characters at a word boundary when there is one.
+    """
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    if " " in cut and text[limit] != " ":
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:-")
+
+# Function: Enforce Locally
+def enforce_locally(ad_set, keywords=()):
+    """
+    Last resort after the repair rounds: shortens, strips symbols, drops duplicates and
+    empty lines, and puts a keyword headline first when no headline carries one.
+    """
+    for ad in ad_set.variants:
+        for field in ("headlines", "descriptions"):
+            kept, seen = [], set()
+            for text in getattr(ad, field):
+                text = REPEATED_PUNCTUATION.sub(r"\1", BANNED_CHARACTERS.sub("", text))
+                if field == "headlines":
+                    text = text.replace("!", "")
+                text = shorten(" ".join(text.split()), LIMITS[field])
+                if text and line_key(text) not in seen:
+                    seen.add(line_key(text))
+                    kept.append(text)
+            setattr(ad, field, kept)
+
+        keys = [line_key(keyword) for keyword in keywords]
+        if keys and not any(key and key in line_key(headline) for headline in ad.headlines for key in keys):
+            fitting = [keyword.strip() for keyword in keywords if 0 < len(keyword.strip()) <= HEADLINE_LIMIT]
+            if fitting:
+                ad.headlines = [fitting[0][:1].upper() + fitting[0][1:]] + ad.headlines[:HEADLINES_PER_AD - 1]
+    return ad_set
+
+# Function: Repair Ads
+def repair_ads(llm, ad_set, keywords=(), max_rounds=MAX_REPAIR_ROUNDS):
+    """
+    Regenerates only the failing lines in small follow-up calls to `llm`, then fixes what
+    is left locally. Returns (ad_set, remaining issues, repair calls made).
+    """
+    calls = 0
+    issues = validate_ads(ad_set, keywords)
+    while issues and calls < max_rounds:
+        with span("ad_copy.repair", {"sem.ad_copy.failing_lines": len(issues)}) as repair_span:
+            response = llm.call([{"role": "user", "content": repair_prompt(ad_set, issues, keywords)}])
+            repair_span.set_attribute("sem.ad_copy.fixed_lines", apply_fixes(ad_set, response, issues))
+        calls += 1
+        issues = validate_ads(ad_set, keywords)
+    if issues:
+        issues = validate_ads(enforce_locally(ad_set, keywords), keywords)
+    return ad_set, issues, calls
+
+# Function: Format Ads
+def format_ads(ad_set):
+    """
+    Markdown rendering of the ads, used as the ad copy report for later stages.
+    """
+    blocks = []
+    for number, ad in enumerate(ad_set.variants, start=1):
+        lines = [f"### Ad {number}", "**Headlines**"]
+        lines += [f"- {headline} ({len(headline)})" for headline in ad.headlines]
+        lines += ["", "**Descriptions**"]
+        lines += [f"- {description} ({len(description)})" for description in ad.descriptions]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+# End of file: tools/ad_copy.py
@@ -0,0 +1,155 @@
+###############################################
+# Cached Search Tool
+# File: tools/cached_search_tool.py
+# Purpose: SerperDevTool wrapper with query normalization and a persistent result cache
+###############################################
+
+# Import required libraries
+import os  # Fallback API key from the environment
+import re  # Token splitting and punctuation cleanup
+import threading  # Guard lazy creation of the shared cache and session
+import unicodedata  # Unicode normalization for Thai/English queries
+import requests  # Pooled HTTP session for Serper calls
+from crewai_tools import SerperDevTool  # Serper web search tool
+
+from utils.rate_limiter import get_limiter  # Shared Serper rate limit and retries
+from utils.sqlite_cache import SQLiteCache, make_key  # Persistent TTL/LRU cache
+from utils.telemetry import span  # Search spans
+
+# Result sections that are ranked lists and can be truncated to a smaller n_results
+RESULT_LISTS = ("organic", "news", "images", "places", "videos", "peopleAlsoAsk", "relatedSearches")
+
+# Thai characters (U+0E00-U+0E7F) vs. everything else, used to split mixed-script tokens
+SCRIPT_RUNS = re.compile(r"[\u0E00-\u0E7F]+|[^\u0E00-\u0E7F]+")
+PUNCTUATION = re.compile(r"[^\w\u0E00-\u0E7F]+")
+
+# Connections kept open to the Serper API across all tools and sessions
+HTTP_POOL_SIZE = 16
+
+_shared_cache = None  # Process-wide search cache, created on first use
+_shared_cache_lock = threading.Lock()
+_shared_session = None  # Process-wide HTTP session, created on first use
+_shared_session_lock = threading.Lock()
+
+# Function: Shared Search Cache
+def get_search_cache():
+    """
+    Returns the process-wide search result cache (expiry is applied per tool on lookup).
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SQLiteCache("search_cache.sqlite3", table="serper_results", ttl=None)
+    return _shared_cache
+
+# Function: Shared HTTP Session
+def get_http_session():
+    """
+    Returns the process-wide requests session (keep-alive connection pool for Serper).
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_SIZE)
+            _shared_session.mount("https://", adapter)
+    return _shared_session
+
+# Function: Normalize Query
+def normalize_query(query):
+    """
+    Normalizes a search query for cache lookups:
+    - NFKC normalization and case folding.
+    - Punctuation and repeated whitespace removed.
+    - Thai and English runs split apart and sorted, so token order doesn't matter.
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    tokens = []
+    for word in PUNCTUATION.sub(" ", text).split():
+        tokens.extend(SCRIPT_RUNS.findall(word))  # "ที่พักbangkok" -> ["ที่พัก", "bangkok"]
+    return " ".join(sorted(tokens))
+
+# Class: Cached Serper Search Tool
+class CachedSerperDevTool(SerperDevTool):
+    """
+    SerperDevTool that serves repeated and near-identical queries from disk:
+    1. Cache key is (normalized query, search type, country, location, locale).
+    2. A cached result set with more results also answers smaller n_results requests.
+    3. Entries older than `cache_ttl` seconds are fetched again.
+    4. Misses go through one shared keep-alive session, authenticated with `api_key`.
+    """
+
+    cache_ttl: int = 24 * 3600  # Time-to-live for cached results in seconds
+    api_key: str = ""  # Serper API key (falls back to SERPER_API_KEY in the environment)
+
+    def _run(self, **kwargs):
+        """
+        Returns cached results when possible, otherwise queries Serper and stores the response.
+        """
+        search_query = kwargs.get("search_query") or kwargs.get("query")
+        if not search_query:
+            return super()._run(**kwargs)  # Let the base tool report the missing query
+
+        search_type = kwargs.get("search_type", self.search_type)
+        key = make_key(normalize_query(search_query), search_type, self.country, self.location, self.locale)
+        cache = get_search_cache()
+
+        with span("serper.search", {"sem.search.type": search_type, "sem.search.n_results": self.n_results}) as search_span:
+            # Serve from cache when the stored result set is at least as large as requested
+            cached = cache.get(key, ttl=self.cache_ttl)
+            hit = cached is not None and cached["n_results"] >= self.n_results
+            search_span.set_attribute("sem.cache_hit", hit)
+            if hit:
+                return self._truncate(cached["results"], self.n_results)
+
+            # Cache miss (or too few cached results): query Serper and store the response
+            results = super()._run(**kwargs)
+            if isinstance(results, dict):
+                cache.set(key, {"n_results": self.n_results, "results": results})
+            return results
+
+    def _make_api_request(self, search_query, search_type):
+        """
+        Sends the Serper request over the shared session instead of a new connection per call,
+        within the shared Serper rate limit (429s and 5xx responses are retried with backoff).
+        """
+        payload = {"q": search_query, "num": self.n_results}
+        if self.country:
+            payload["gl"] = self.country
+        if self.location:
+            payload["location"] = self.location
+        if self.locale:
+            payload["hl"] = self.locale
+
+        headers = {
+            "X-API-KEY": self.api_key or os.environ["SERPER_API_KEY"],
+            "content-type": "application/json",
+        }
+        url = self._get_search_url(search_type)
+
+        def post():
+            response = get_http_session().post(url, headers=headers, json=payload, timeout=10)
+            response.raise_for_status()
+            return response
+
+        with span("serper.request", {"http.request.method": "POST", "url.full": url}, kind="CLIENT") as request_span:
+            response = get_limiter("serper").call(post)
+            request_span.set_attribute("http.response.status_code", response.status_code)
+            request_span.set_attribute("http.response.body.size", len(response.content))
+        results = response.json()
+        if not results:
+            raise ValueError("Empty response from Serper API")
+        return dict(results)
+
+    @staticmethod
+    def _truncate(results, n_results):
+        """
+        Trims every ranked result list to `n_results` entries.
+        """
+        trimmed = dict(results)
+        for section in RESULT_LISTS:
+            if isinstance(trimmed.get(section), list):
+                trimmed[section] = trimmed[section][:n_results]
+        return trimmed
+
+# End of file: tools/cached_search_tool.py
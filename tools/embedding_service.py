@@ -0,0 +1,299 @@
+###############################################
+# Embedding Service
+# File: tools/embedding_service.py
+# Purpose: Batched sentence-transformers embeddings with a persistent memory-mapped cache
+###############################################
+
+# Import required libraries
+import ast  # Parse the .npy header dictionary
+import contextlib  # Store lock context manager
+import hashlib  # Hash index keys
+import os  # File handling
+import struct  # .npy header length field
+import threading  # Serialize appends and lazy model loading
+
+try:
+    import fcntl  # Inter-process file lock (POSIX)
+except ImportError:
+    fcntl = None  # Windows: appends are only serialized within the process
+
+import numpy as np  # Vector math and memory-mapped arrays
+
+from utils.paths import cache_path  # Location of local cache files
+
+# Multilingual model so Thai and English keywords share one vector space
+DEFAULT_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# Fixed-size .npy header: the shape can be rewritten in place on every append
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_BYTES = 128  # Total header size (multiple of 64, as numpy expects)
+
+# Class: Embedding Store
+class EmbeddingStore:
+    """
+    Append-only float32 matrix on disk with a hash index:
+    1. Vectors live in a .npy file read through a memory map.
+    2. Row i belongs to the i-th hash in the sidecar index file.
+    3. Appends write the new rows, rewrite the fixed-size header with the new shape, then extend the index.
+    4. Writers (threads and processes) hold an exclusive lock file and first catch up on rows
+       other processes appended, so concurrent Streamlit sessions and batch workers never overwrite each other.
+    """
+
+    def __init__(self, directory, dim=None):
+        """
+        Open (or create) the store in `directory`.
+        An existing store keeps its vector size in the .npy header; `dim` is only needed to create one.
+        """
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.index_path = os.path.join(directory, "index.txt")
+        self.lock_path = os.path.join(directory, "store.lock")
+        self._lock = threading.Lock()
+        self._mmap = None  # Read-only memory map, reopened after appends
+        self.dim = dim  # Vector dimension
+        self.rows = 0  # Rows with both a vector and an index line
+        self.index = {}  # Hash key -> row
+        self._index_offset = 0  # Bytes of index.txt already loaded
+        os.makedirs(directory, exist_ok=True)
+
+        with self.locked():
+            pass  # Creates the files if needed and loads the index
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Holds the store's exclusive lock (thread and process) and catches up on rows appended elsewhere.
+        """
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(self.vectors_path):
+                    if self.dim is None:
+                        raise ValueError(f"No embedding store in {os.path.dirname(self.vectors_path)} and no dimension given")
+                    with open(self.vectors_path, "wb") as handle:
+                        self._write_header(handle, 0)
+                    open(self.index_path, "w").close()
+                self._refresh()
+                yield self
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """
+        Reads the header shape and the index lines added since the last refresh.
+        Rows written without a complete index line (interrupted append) are ignored.
+        """
+        rows, self.dim = self._read_shape()
+        with open(self.index_path, "rb") as handle:
+            handle.seek(self._index_offset)
+            tail = handle.read()
+        for line in tail.splitlines(keepends=True):
+            if self.rows >= rows or not line.endswith(b"\n"):
+                break
+            self.index[line.decode("utf-8").strip()] = self.rows
+            self.rows += 1
+            self._index_offset += len(line)
+
+    def _write_header(self, handle, rows):
+        """
+        Writes a .npy v1.0 header padded to NPY_HEADER_BYTES.
+        """
+        header = repr({"descr": "<f4", "fortran_order": False, "shape": (rows, self.dim)})
+        length = NPY_HEADER_BYTES - len(NPY_MAGIC) - 2
+        handle.seek(0)
+        handle.write(NPY_MAGIC + struct.pack("<H", length) + header.ljust(length - 1).encode("latin1") + b"\n")
+
+    def _read_shape(self):
+        """
+        Returns the (rows, dim) shape recorded in the .npy header.
+        """
+        with open(self.vectors_path, "rb") as handle:
+            handle.seek(len(NPY_MAGIC))
+            length = struct.unpack("<H", handle.read(2))[0]
+            header = ast.literal_eval(handle.read(length).decode("latin1"))
+        return header["shape"]
+
+    def vectors(self):
+        """
+        Returns the stored matrix as a read-only memory map (rows x dim).
+        """
+        if self._mmap is None or self._mmap.shape[0] < self.rows:
+            self._mmap = np.load(self.vectors_path, mmap_mode="r") if self.rows else np.empty((0, self.dim), np.float32)
+        return self._mmap[:self.rows]
+
+    def lookup(self, keys):
+        """
+        Returns the row index for each key, or -1 when it isn't stored (as of the last refresh).
+        """
+        return np.array([self.index.get(key, -1) for key in keys], dtype=np.int64)
+
+    def fill(self, texts_by_key, encode):
+        """
+        Stores vectors for the keys that are still missing once the lock is held:
+        keys another process added in the meantime are not encoded again.
+        """
+        with self.locked():
+            missing = {key: text for key, text in texts_by_key.items() if key not in self.index}
+            if missing:
+                self._append(list(missing), encode(list(missing.values())))
+
+    def append(self, keys, vectors):
+        """
+        Appends new vectors with their keys (keys already stored are skipped).
+        """
+        with self.locked():
+            new = [offset for offset, key in enumerate(keys) if key not in self.index]
+            if new:
+                self._append([keys[offset] for offset in new], np.asarray(vectors)[new])
+
+    def _append(self, keys, vectors):
+        """
+        Writes rows after the last indexed one; the caller holds the lock.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="<f4").reshape(-1, self.dim)
+        with open(self.vectors_path, "r+b") as handle:
+            handle.seek(NPY_HEADER_BYTES + self.rows * self.dim * 4)
+            handle.write(vectors.tobytes())
+            self._write_header(handle, self.rows + len(vectors))
+        entries = "".join(f"{key}\n" for key in keys).encode("utf-8")
+        with open(self.index_path, "r+b") as handle:
+            handle.truncate(self._index_offset)  # Drops a partial line left by an interrupted append
+            handle.seek(self._index_offset)
+            handle.write(entries)
+        for offset, key in enumerate(keys):
+            self.index[key] = self.rows + offset
+        self.rows += len(vectors)
+        self._index_offset += len(entries)
+
+# Class: Embedding Service
+class EmbeddingService:
+    """
+    Encodes keywords and page sections with sentence-transformers:
+    - Texts already in the store are never encoded again (across runs and sessions).
+    - Missing texts are encoded in large CPU batches with a configurable thread count.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, batch_size=256, threads=None, device="cpu"):
+        """
+        Configure the model, batch size and CPU thread count (loaded lazily).
+        """
+        self.model_name = model_name  # sentence-transformers model id
+        self.batch_size = batch_size  # Texts per forward pass
+        self.threads = threads or os.cpu_count()  # Torch intra-op threads
+        self.device = device  # "cpu" or "cuda"
+        self._model = None
+        self._store = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """
+        Loads the sentence-transformers model once.
+        """
+        with self._lock:
+            if self._model is None:
+                import torch  # Heavy imports deferred until the first encode
+                from sentence_transformers import SentenceTransformer
+
+                torch.set_num_threads(self.threads)
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    @property
+    def store(self):
+        """
+        Opens the embedding store for this model.
+        The vector size comes from the store's header, so the model only loads to create a new store.
+        """
+        if self._store is None:
+            vectors_path = cache_path("embeddings", self.model_name.replace("/", "__"), "vectors.npy")
+            directory = os.path.dirname(vectors_path)
+            if os.path.exists(vectors_path):
+                self._store = EmbeddingStore(directory)
+            else:
+                self._store = EmbeddingStore(directory, self.model.get_sentence_embedding_dimension())
+        return self._store
+
+    def key(self, text):
+        """
+        Hash index key for one text.
+        """
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def encode(self, texts, cache=True):
+        """
+        Returns L2-normalized embeddings (len(texts) x dim), encoding only unseen texts.
+        With `cache=False` (one-off texts such as agent memories), nothing is looked up or stored.
+        """
+        texts = [text.strip() for text in texts]
+        if not cache:
+            return self._encode(texts)
+        keys = [self.key(text) for text in texts]
+        rows = self.store.lookup(keys)
+
+        # Encode each unseen text once, even if it repeats in the input
+        missing = {}
+        for text, key, row in zip(texts, keys, rows):
+            if row < 0:
+                missing.setdefault(key, text)
+        if missing:
+            self.store.fill(missing, self._encode)  # Lookup and append under one lock
+            rows = self.store.lookup(keys)
+        return np.asarray(self.store.vectors()[rows])
+
+    def _encode(self, texts):
+        """
+        Runs the model over `texts` in CPU batches.
+        """
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    def similarity(self, texts_a, texts_b):
+        """
+        Cosine similarity matrix (len(texts_a) x len(texts_b)).
+        """
+        return self.encode(texts_a) @ self.encode(texts_b).T
+
+    def semantic_gaps(self, our_keywords, competitor_keywords, threshold=0.75, chunk_size=4096):
+        """
+        Returns competitor keywords with no semantically close match among ours,
+        as [(keyword, best similarity), ...] sorted from least to most covered.
+        """
+        if not competitor_keywords:
+            return []
+        if not our_keywords:
+            return [(keyword, 0.0) for keyword in competitor_keywords]
+        ours = self.encode(our_keywords)
+        theirs = self.encode(competitor_keywords)
+
+        # Chunked matrix multiply keeps memory flat for tens of thousands of keywords
+        best = np.concatenate([
+            (theirs[start:start + chunk_size] @ ours.T).max(axis=1)
+            for start in range(0, len(theirs), chunk_size)
+        ])
+        order = np.argsort(best)
+        return [(competitor_keywords[i], round(float(best[i]), 3)) for i in order if best[i] < threshold]
+
+_shared_service = None  # Process-wide service, so the model loads once
+_shared_service_lock = threading.Lock()
+
+# Function: Shared Embedding Service
+def get_embedding_service():
+    """
+    Returns the process-wide embedding service
+    (thread count from SEM_PLANNER_EMBEDDING_THREADS, default: all cores).
+    """
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None:
+            threads = os.environ.get("SEM_PLANNER_EMBEDDING_THREADS")
+            _shared_service = EmbeddingService(threads=int(threads) if threads else None)
+    return _shared_service
+
+# End of file: tools/embedding_service.py
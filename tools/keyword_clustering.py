@@ -0,0 +1,125 @@
+###############################################
+# Keyword Clustering
+# File: tools/keyword_clustering.py
+# Purpose: Local keyword theme clustering that produces candidate ad groups
+###############################################
+
+# Import required libraries
+import numpy as np  # Vector math
+from sklearn.cluster import MiniBatchKMeans  # Scalable k-means
+from sklearn.feature_extraction.text import TfidfVectorizer  # Fallback keyword features
+from sklearn.metrics import silhouette_score  # Automatic k selection
+
+# Class: Keyword Clusterer
+class KeywordClusterer:
+    """
+    Groups keywords into themes (candidate ad groups):
+    1. Features are sentence embeddings when an embedding service is given,
+       otherwise character n-gram TF-IDF (works for Thai without segmentation).
+    2. k is chosen automatically by silhouette score on a sample.
+    3. Each cluster is summarized by the keywords closest to its centroid.
+    """
+
+    def __init__(self, embedding_service=None, min_k=2, max_k=40, candidates=8, sample_size=2000, random_state=42):
+        """
+        Configure the feature source and the range searched for k.
+        """
+        self.embedding_service = embedding_service  # tools.embedding_service.EmbeddingService or None
+        self.min_k = min_k  # Smallest number of clusters tried
+        self.max_k = max_k  # Largest number of clusters tried
+        self.candidates = candidates  # Number of k values evaluated
+        self.sample_size = sample_size  # Silhouette sample size
+        self.random_state = random_state  # Reproducible clustering
+
+    def features(self, keywords):
+        """
+        Returns an L2-normalized feature matrix for the keywords.
+        """
+        if self.embedding_service is not None:
+            return self.embedding_service.encode(keywords)
+        return TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True).fit_transform(keywords)
+
+    def choose_k(self, features):
+        """
+        Picks the k with the best silhouette score among evenly spaced candidates.
+        """
+        n_keywords = features.shape[0]
+        upper = min(self.max_k, n_keywords - 1)
+        if upper <= self.min_k:
+            return max(1, min(self.min_k, n_keywords))
+
+        best_k, best_score = self.min_k, -1.0
+        for k in np.unique(np.linspace(self.min_k, upper, self.candidates).astype(int)):
+            labels = self._fit(features, k).labels_
+            if len(set(labels)) < 2:
+                continue
+            score = silhouette_score(
+                features, labels, sample_size=min(self.sample_size, n_keywords), random_state=self.random_state
+            )
+            if score > best_score:
+                best_k, best_score = int(k), score
+        return best_k
+
+    def _fit(self, features, k):
+        """
+        Runs MiniBatchKMeans with k clusters.
+        """
+        return MiniBatchKMeans(
+            n_clusters=k, batch_size=1024, n_init=3, random_state=self.random_state
+        ).fit(features)
+
+    def cluster(self, keywords, volumes=None, k=None, representatives=5):
+        """
+        Clusters keywords and returns summaries sorted by total search volume (or size):
+        [{"theme", "size", "volume", "representatives", "top_volume"}, ...]
+        """
+        keywords = list(dict.fromkeys(keyword.strip() for keyword in keywords if keyword.strip()))
+        if not keywords:
+            return []
+        volumes = np.array([(volumes or {}).get(keyword, 0) for keyword in keywords], dtype=float)
+
+        features = self.features(keywords)
+        k = k or self.choose_k(features)
+        model = self._fit(features, k) if k > 1 else None
+        labels = model.labels_ if model is not None else np.zeros(len(keywords), dtype=int)
+
+        # Distance of each keyword to its own centroid ranks the representatives
+        if model is not None:
+            distances = model.transform(features)[np.arange(len(keywords)), labels]
+        else:
+            distances = np.zeros(len(keywords))
+
+        clusters = []
+        for label in np.unique(labels):
+            members = np.flatnonzero(labels == label)
+            closest = members[np.argsort(distances[members])][:representatives]
+            loudest = members[np.argsort(-volumes[members])][:representatives]
+            clusters.append({
+                "theme": keywords[closest[0]],
+                "size": int(len(members)),
+                "volume": int(volumes[members].sum()),
+                "representatives": [keywords[i] for i in closest],
+                "top_volume": [keywords[i] for i in loudest if volumes[i] > 0],
+                "keywords": [keywords[i] for i in members],
+            })
+        return sorted(clusters, key=lambda cluster: (-cluster["volume"], -cluster["size"]))
+
+# Function: Format Cluster Summaries
+def format_cluster_summaries(clusters, max_clusters=30):
+    """
+    Renders cluster summaries as compact text for task prompts
+    (prompt size depends on the number of clusters, not the number of keywords).
+    """
+    lines = []
+    for index, cluster in enumerate(clusters[:max_clusters], start=1):
+        line = f"{index}. {cluster['theme']} ({cluster['size']} keywords"
+        line += f", volume {cluster['volume']})" if cluster["volume"] else ")"
+        line += f": {', '.join(cluster['representatives'])}"
+        if cluster["top_volume"]:
+            line += f" | highest volume: {', '.join(cluster['top_volume'])}"
+        lines.append(line)
+    if len(clusters) > max_clusters:
+        lines.append(f"... {len(clusters) - max_clusters} smaller clusters omitted")
+    return "\n".join(lines)
+
+# End of file: tools/keyword_clustering.py
@@ -0,0 +1,336 @@
+###############################################
+# Keyword Normalizer
+# File: tools/keyword_normalizer.py
+# Purpose: Thai-aware keyword normalization and MinHash/LSH collapsing of near-duplicate
+#          keywords into canonical keywords, with a mapping back to the original variants
+###############################################
+
+# Import required libraries
+import functools  # Memoized tone-mark removal and romanization
+import re  # Script runs, punctuation and phonetic folding
+import unicodedata  # Unicode normalization
+import zlib  # Stable shingle hashes (Python's hash() is salted per process)
+
+import numpy as np  # Vectorized MinHash signatures
+
+from tools.thai_tokenizer import get_thai_tokenizer  # Batched, memoized Thai segmentation
+
+# Thai characters (U+0E00-U+0E7F) vs. everything else, used to split mixed-script keywords
+THAI_RUN = re.compile(r"[\u0E00-\u0E7F]+")
+SCRIPT_RUNS = re.compile(r"[\u0E00-\u0E7F]+|[^\u0E00-\u0E7F]+")
+PUNCTUATION = re.compile(r"[^\w\u0E00-\u0E7F]+")
+
+# Coarse phonetic folding so romanized Thai and typed transliterations agree
+# ("khon" / "kon", "raem" / "rem", "rongg" / "rong"); only applied to romanized Thai
+PHONETIC_RULES = (
+    (re.compile(r"([kptc])h"), r"\1"),
+    (re.compile(r"ae"), "e"),
+    (re.compile(r"(.)\1+"), r"\1"),
+)
+
+# Consecutive Latin words joined when looking for a transliterated Thai word ("rong raem")
+MAX_TRANSLITERATION_WORDS = 4
+
+# MinHash / LSH settings: 16 bands of 4 rows put the candidate threshold near Jaccard 0.5,
+# and candidates are then verified word by word (differing words need DEFAULT_THRESHOLD)
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.7
+MERSENNE_PRIME = (1 << 31) - 1
+SEED = 42
+
+# Shingles hashed per vectorized MinHash pass (bounds memory at NUM_PERM x this many uint64)
+CHUNK_SHINGLES = 100000
+
+# Members of one LSH bucket compared with each other (larger buckets are compared to their first members)
+MAX_BUCKET = 50
+
+# Function: Strip Tone Marks
+@functools.lru_cache(maxsize=65536)
+def strip_tonemarks(run):
+    """
+    A run of Thai text in normalized character order with tone marks removed
+    (tone-mark typos then give the same words).
+    """
+    from pythainlp.util import normalize, remove_tonemark  # Thai character order and tone marks
+
+    return remove_tonemark(normalize(run))
+
+# Function: Thai Words
+def thai_words(run):
+    """
+    Segments a run of Thai text into words with tone marks removed (memoized by the Thai tokenizer).
+    """
+    text = strip_tonemarks(run)
+    return get_thai_tokenizer().segment_runs([text])[text]
+
+# Function: Romanize Word
+@functools.lru_cache(maxsize=65536)
+def romanize_word(word):
+    """
+    Royal Thai General System romanization of one Thai word ("โรงแรม" -> "rongraem"),
+    the convention users follow when they type Thai keywords in Latin letters.
+    """
+    from pythainlp.transliterate import romanize  # Rule-based RTGS romanization
+
+    return romanize(word, engine="royin")
+
+# Function: Phonetic Fold
+def phonetic_fold(token):
+    """
+    Folds aspirated consonants, "ae" and doubled letters in a Latin token.
+    """
+    for pattern, replacement in PHONETIC_RULES:
+        token = pattern.sub(replacement, token)
+    return token
+
+# Function: Match Text
+def match_text(keyword):
+    """
+    NFKC normalized, case folded keyword with punctuation replaced by spaces.
+    """
+    return PUNCTUATION.sub(" ", unicodedata.normalize("NFKC", keyword).casefold())
+
+# Function: Thai Tokens
+def thai_tokens(run):
+    """
+    Match tokens of a run of Thai text: segmented, romanized and phonetically folded.
+    """
+    return [phonetic_fold(romanize_word(word)) for word in thai_words(run)]
+
+# Function: Latin Tokens
+def latin_tokens(words, romanized):
+    """
+    Match tokens of a run of Latin words. Consecutive words whose joined, phonetically folded
+    spelling is a romanized Thai word in `romanized` become that word ("rong raem" -> "rongrem");
+    all other words are kept as typed, so English words are never folded ("diner" vs "dinner").
+    """
+    if not romanized:
+        return words
+    tokens, start = [], 0
+    while start < len(words):
+        for end in range(min(len(words), start + MAX_TRANSLITERATION_WORDS), start, -1):
+            folded = phonetic_fold("".join(words[start:end]))
+            if folded in romanized:
+                tokens.append(folded)
+                start = end
+                break
+        else:
+            tokens.append(words[start])
+            start += 1
+    return tokens
+
+# Function: Keyword Tokens
+def keyword_tokens(keyword, romanized=frozenset()):
+    """
+    Match tokens of a keyword, in order: NFKC and case folded, punctuation removed,
+    Thai segmented, tone marks dropped, romanized and phonetically folded.
+    Latin words are folded only where they transliterate a Thai word in `romanized`:
+    "โรงแรม" gives ["rongrem"], and "rong raem" gives ["rongrem"] once "rongrem" is known.
+    """
+    tokens = []
+    for run in SCRIPT_RUNS.findall(match_text(keyword)):
+        if THAI_RUN.fullmatch(run):
+            tokens.extend(thai_tokens(run))
+        else:
+            tokens.extend(latin_tokens(run.split(), romanized))
+    return [token for token in tokens if token]
+
+# Function: Keyword Key
+def keyword_key(keyword):
+    """
+    Word-order independent match key: the sorted match tokens
+    ("รองเท้า วิ่ง", "รองเท้าวิ่ง" and "วิ่ง รองเท้า" share one key).
+    """
+    return " ".join(sorted(keyword_tokens(keyword)))
+
+# Function: Shingle Hashes
+def shingle_hashes(key, size=SHINGLE_SIZE):
+    """
+    Sorted unique CRC32 hashes of the character shingles of `key` (spaces removed,
+    so "running shoes" and "runningshoes" overlap fully).
+    """
+    text = key.replace(" ", "")
+    shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+    return np.array(sorted(zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64)
+
+# Function: Spelling Variant
+def spelling_variant(first, second, threshold=DEFAULT_THRESHOLD):
+    """
+    Whether two tokens are spellings of one word: neither contains a digit ("s23" / "s24",
+    "2" / "3" are different products) and their character shingle Jaccard is at least `threshold`.
+    """
+    if any(char.isdigit() for char in first + second):
+        return False
+    first, second = ({token[i:i + SHINGLE_SIZE] for i in range(max(len(token) - SHINGLE_SIZE + 1, 1))} for token in (first, second))
+    return len(first & second) >= threshold * len(first | second)
+
+# Function: Same Keyword
+def same_keyword(first, second, threshold=DEFAULT_THRESHOLD):
+    """
+    Token-level check of two near-duplicate candidate keys: every token one key has and the
+    other lacks must pair up with a spelling variant on the other side. Extra tokens
+    ("running shoes men" vs "running shoes") or a differing number/model token never match.
+    """
+    first, second = set(first.split()), set(second.split())
+    remaining = sorted(second - first)
+    extra = sorted(first - second)
+    if len(extra) != len(remaining):
+        return False
+    for token in extra:
+        match = next((other for other in remaining if spelling_variant(token, other, threshold)), None)
+        if match is None:
+            return False
+        remaining.remove(match)
+    return True
+
+# Function: MinHash Signatures
+def minhash_signatures(shingle_sets, num_perm=NUM_PERM, seed=SEED):
+    """
+    (len(shingle_sets) x num_perm) MinHash matrix, computed in vectorized chunks:
+    h_i(x) = (a_i * x + b_i) mod 2^31-1, minimized per keyword with np.minimum.reduceat.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+
+    start = 0
+    while start < len(shingle_sets):
+        end, total = start, 0
+        while end < len(shingle_sets) and (end == start or total + len(shingle_sets[end]) <= CHUNK_SHINGLES):
+            total += len(shingle_sets[end])
+            end += 1
+        chunk = shingle_sets[start:end]
+        offsets = np.cumsum([0] + [len(hashes) for hashes in chunk[:-1]])
+        values = (a * np.concatenate(chunk)[None, :] + b) % MERSENNE_PRIME
+        signatures[start:end] = np.minimum.reduceat(values, offsets, axis=1).T
+        start = end
+    return signatures
+
+# Class: Union Find
+class UnionFind:
+    """
+    Disjoint sets over 0..n-1 with path halving.
+    """
+
+    def __init__(self, n):
+        """
+        Every element starts in its own set.
+        """
+        self.parent = list(range(n))
+
+    def find(self, item):
+        """
+        Returns the representative of `item`'s set.
+        """
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first, second):
+        """
+        Merges the sets of `first` and `second`.
+        """
+        self.parent[self.find(first)] = self.find(second)
+
+# Function: Near Duplicate Groups
+def near_duplicate_groups(keys, threshold=DEFAULT_THRESHOLD, bands=BANDS, num_perm=NUM_PERM):
+    """
+    Groups distinct keys that differ only by spelling variants of single words:
+    1. MinHash signatures of the key shingles, split into `bands` LSH bands; keys sharing a band
+       bucket are candidates.
+    2. Candidates are verified at token level (see same_keyword): shingle Jaccard only decides
+       whether two differing words are one word spelled two ways, so "iphone 14 case" and
+       "iphone 15 case" or "running shoes men" and "running shoes" stay apart.
+    3. Verified pairs are merged transitively.
+    Work grows linearly with the number of keys (plus the size of the candidate buckets).
+    Returns a group label per key.
+    """
+    shingle_sets = [shingle_hashes(key) for key in keys]
+    groups = UnionFind(len(keys))
+    if len(keys) < 2:
+        return [groups.find(index) for index in range(len(keys))]
+
+    signatures = minhash_signatures(shingle_sets, num_perm)
+    rows = num_perm // bands
+    checked = set()
+    for band in range(bands):
+        buckets = {}
+        for index, row in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets.setdefault(row.tobytes(), []).append(index)
+        for members in buckets.values():
+            for position, first in enumerate(members[:MAX_BUCKET]):
+                for second in members[position + 1:]:
+                    if (first, second) in checked or groups.find(first) == groups.find(second):
+                        continue
+                    checked.add((first, second))
+                    if same_keyword(keys[first], keys[second], threshold):
+                        groups.union(first, second)
+    return [groups.find(index) for index in range(len(keys))]
+
+# Function: Collapse Keywords
+def collapse_keywords(keywords, volumes=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Collapses spacing, case, tone-mark, transliteration, word-order and small spelling
+    variants into one canonical keyword each (the highest-volume variant, else the most
+    frequent, else the first seen). Returns:
+    - "keywords": canonical keywords in order of first appearance
+    - "variants": {canonical: [distinct original variants, canonical first]}
+    - "mapping": {original: canonical}
+    - "volumes": {canonical: summed volume of its variants} (when `volumes` is given)
+    """
+    originals, counts = [], {}
+    for keyword in keywords:
+        keyword = str(keyword)
+        if keyword.strip():
+            if keyword not in counts:
+                originals.append(keyword)
+            counts[keyword] = counts.get(keyword, 0) + 1
+
+    # Segment every Thai run in one batch up front instead of one tokenizer call per keyword
+    thai_runs = [strip_tonemarks(run) for keyword in originals for run in THAI_RUN.findall(match_text(keyword))]
+    if thai_runs:
+        get_thai_tokenizer().segment_runs(thai_runs)
+    # Romanized Thai words of the batch: the only spellings Latin words are folded to
+    romanized = frozenset(
+        token for keyword in originals for run in THAI_RUN.findall(match_text(keyword)) for token in thai_tokens(run)
+    )
+
+    # Exact matches first (cheap): same sorted tokens (word order) or same tokens joined in
+    # order without spaces (spacing, and transliterations typed with other word breaks)
+    exact, seen, keys = UnionFind(len(originals)), {}, []
+    for index, keyword in enumerate(originals):
+        tokens = keyword_tokens(keyword, romanized) or [keyword.strip().casefold()]
+        keys.append(" ".join(sorted(tokens)))
+        for key in (keys[-1], "".join(tokens)):
+            exact.union(index, seen.setdefault(key, index))
+
+    # MinHash/LSH only over one key per exact group
+    roots = list(dict.fromkeys(exact.find(index) for index in range(len(originals))))
+    labels = dict(zip(roots, near_duplicate_groups([keys[root] for root in roots], threshold)))
+
+    members = {}
+    for index, keyword in enumerate(originals):
+        members.setdefault(labels[exact.find(index)], []).append(keyword)
+
+    volumes = volumes or {}
+    order = {keyword: index for index, keyword in enumerate(originals)}
+    result = {"keywords": [], "variants": {}, "mapping": {}}
+    for group in members.values():
+        canonical = max(group, key=lambda keyword: (volumes.get(keyword) or 0, counts[keyword], -order[keyword]))
+        result["keywords"].append(canonical)
+        result["variants"][canonical] = [canonical] + [keyword for keyword in group if keyword != canonical]
+        result["mapping"].update(dict.fromkeys(group, canonical))
+
+    result["keywords"].sort(key=lambda canonical: min(order[keyword] for keyword in result["variants"][canonical]))
+    if volumes:
+        result["volumes"] = {
+            canonical: sum(volumes.get(keyword) or 0 for keyword in variants)
+            for canonical, variants in result["variants"].items()
+        }
+    return result
+
+# End of file: tools/keyword_normalizer.py
@@ -0,0 +1,265 @@
+###############################################
+# Keyword Data Store
+# File: tools/keyword_store.py
+# Purpose: Fetches a topic's keyword metrics once, keeps them as local Parquet with a TTL,
+#          and serves discovery, categorization and trend analysis from that slice
+###############################################
+
+# Import required libraries
+import datetime  # Time windows
+import os  # File handling
+import threading  # One fetch per slice across parallel stages
+import time  # TTL checks
+
+import pandas as pd  # Local aggregation
+import pyarrow.parquet as pq  # On-disk Parquet cache
+
+from utils.paths import cache_path  # Location of local cache files
+from utils.rate_limiter import get_limiter  # Shared BigQuery rate limit and retries
+from utils.sqlite_cache import make_key  # Slice file names
+from utils.telemetry import span  # Query and slice spans
+
+# Columns every backend returns, one row per keyword and month
+KEYWORD_COLUMNS = ("keyword", "month", "search_volume", "cpc", "competition")
+
+# Default warehouse table (override with the BIGQUERY_KEYWORD_TABLE secret)
+DEFAULT_TABLE = "keyword_planner.keyword_metrics"
+
+# Months of history fetched per topic (trend analysis needs at least two years for seasonality)
+DEFAULT_WINDOW_MONTHS = 24
+
+# One query for every backend; `?` placeholders work in both BigQuery and DuckDB
+SLICE_SQL = """
+    SELECT {columns}
+    FROM {table}
+    WHERE ({terms}) AND month >= ?
+"""
+
+# Function: Slice Query
+def slice_query(table, terms, since):
+    """
+    Returns (sql, params) selecting all keywords containing any of `terms` since `since`.
+    """
+    sql = SLICE_SQL.format(
+        columns=", ".join(KEYWORD_COLUMNS), table=table, terms=" OR ".join(["LOWER(keyword) LIKE ?"] * len(terms))
+    )
+    return sql, [f"%{term.lower()}%" for term in terms] + [since]
+
+# Class: BigQuery Backend
+class BigQueryBackend:
+    """
+    Reads keyword slices from the BigQuery warehouse (google-cloud-bigquery client).
+    """
+
+    def __init__(self, client, table=DEFAULT_TABLE):
+        """
+        Use an existing BigQuery client (pooled by the resource registry).
+        """
+        self.client = client
+        self.table = table
+
+    def fetch(self, terms, since):
+        """
+        Runs the slice query within the shared BigQuery rate limit and returns an Arrow table.
+        """
+        from google.cloud import bigquery  # Query parameters
+
+        sql, params = slice_query(f"`{self.table}`", terms, since)
+        config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter(None, "DATE" if isinstance(value, datetime.date) else "STRING", value)
+            for value in params
+        ])
+
+        def run_query():
+            query = self.client.query(sql, job_config=config)
+            return query, query.to_arrow()
+
+        with span("bigquery.query", {"db.system": "bigquery", "db.collection.name": self.table}, kind="CLIENT") as query_span:
+            query, table = get_limiter("bigquery").call(run_query)
+            query_span.set_attribute("sem.bigquery.bytes_processed", query.total_bytes_processed)
+            query_span.set_attribute("sem.bigquery.bytes_billed", query.total_bytes_billed)
+            query_span.set_attribute("sem.cache_hit", query.cache_hit)
+            query_span.set_attribute("db.response.returned_rows", table.num_rows)
+            return table
+
+# Class: DuckDB Backend
+class DuckDBBackend:
+    """
+    In-process SQL stand-in for BigQuery, for offline runs and tests:
+    - `path` is a DuckDB database file, or None for an in-memory database.
+    - `load(frame)` fills the table from a DataFrame, Parquet or CSV file.
+    """
+
+    def __init__(self, path=None, table="keyword_metrics"):
+        """
+        Open (or create) the DuckDB database.
+        """
+        import duckdb  # Embedded analytical SQL engine
+
+        self.connection = duckdb.connect(path or ":memory:")
+        self.table = table
+        self._lock = threading.Lock()  # DuckDB connections are not safe for concurrent use
+
+    def load(self, source):
+        """
+        Replaces the table with `source` (DataFrame or path to a .parquet/.csv file).
+        """
+        with self._lock:
+            if isinstance(source, str):
+                reader = "read_parquet" if source.endswith(".parquet") else "read_csv_auto"
+                self.connection.execute(f"CREATE OR REPLACE TABLE {self.table} AS SELECT * FROM {reader}(?)", [source])
+            else:
+                self.connection.register("source_frame", source)
+                self.connection.execute(f"CREATE OR REPLACE TABLE {self.table} AS SELECT * FROM source_frame")
+                self.connection.unregister("source_frame")
+
+    def fetch(self, terms, since):
+        """
+        Runs the slice query and returns an Arrow table.
+        """
+        sql, params = slice_query(self.table, terms, since)
+        with span("duckdb.query", {"db.system": "duckdb", "db.collection.name": self.table}) as query_span, self._lock:
+            result = self.connection.execute(sql, params).arrow()
+            table = result.read_all() if hasattr(result, "read_all") else result  # Newer DuckDB returns a batch reader
+            query_span.set_attribute("db.response.returned_rows", table.num_rows)
+        return table
+
+# Class: Keyword Store
+class KeywordStore:
+    """
+    Local columnar cache in front of a keyword backend:
+    1. A slice (topic terms + time window) is fetched from the backend once.
+    2. It is stored as Parquet and reused by every task until `ttl` seconds pass.
+    3. Parallel stages asking for the same slice wait for a single fetch.
+    """
+
+    def __init__(self, backend, ttl=24 * 3600, directory=None, window_months=DEFAULT_WINDOW_MONTHS):
+        """
+        Configure the backend, expiry and cache location.
+        """
+        self.backend = backend
+        self.ttl = ttl  # Seconds before a slice is fetched again
+        self.directory = directory or cache_path("keywords")
+        self.window_months = window_months
+        self.fetches = 0  # Backend queries issued (for monitoring)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def slice(self, terms, today=None):
+        """
+        Returns the keyword rows for `terms` over the configured window as a DataFrame
+        (empty, without a query, when no term is left after stripping).
+        """
+        terms = sorted({term.strip().lower() for term in terms if term.strip()})
+        if not terms:
+            return pd.DataFrame(columns=list(KEYWORD_COLUMNS))
+        since = month_start(today or datetime.date.today(), self.window_months)
+        path = os.path.join(self.directory, make_key(terms, since.isoformat(), self.window_months) + ".parquet")
+
+        with span("keyword_store.slice", {"sem.keyword.terms": len(terms)}) as slice_span, self._lock_for(path):
+            fresh = self._fresh(path)
+            slice_span.set_attribute("sem.cache_hit", fresh)
+            if not fresh:
+                table = self.backend.fetch(terms, since)
+                self.fetches += 1
+                pq.write_table(table, path + ".tmp")
+                os.replace(path + ".tmp", path)  # Readers never see a partial file
+            return pq.read_table(path).to_pandas()
+
+    def _fresh(self, path):
+        """
+        True when the slice file exists and is younger than the TTL.
+        """
+        return os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl
+
+    def _lock_for(self, path):
+        """
+        Returns the lock serializing fetches of one slice.
+        """
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+# Function: Month Start
+def month_start(today, months_back):
+    """
+    First day of the month `months_back` months before `today`.
+    """
+    index = today.year * 12 + today.month - 1 - months_back
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+# Function: Keyword Metrics
+def keyword_metrics(frame):
+    """
+    One row per keyword: average monthly volume, latest-month volume, average CPC and competition,
+    ranked by average volume.
+    """
+    if frame.empty:
+        return pd.DataFrame(columns=["keyword", "avg_volume", "latest_volume", "cpc", "competition"])
+    latest = frame.sort_values("month").groupby("keyword")["search_volume"].last()
+    metrics = frame.groupby("keyword").agg(
+        avg_volume=("search_volume", "mean"), cpc=("cpc", "mean"), competition=("competition", "mean")
+    )
+    metrics["latest_volume"] = latest
+    metrics = metrics.reset_index().sort_values(["avg_volume", "keyword"], ascending=[False, True])  # Stable prompts
+    metrics = metrics.reset_index(drop=True)
+    return metrics[["keyword", "avg_volume", "latest_volume", "cpc", "competition"]]
+
+# Function: Collapse Metrics
+def collapse_metrics(metrics, mapping):
+    """
+    Re-aggregates keyword_metrics() rows onto canonical keywords ({original: canonical}):
+    volumes are summed, CPC and competition are averaged weighted by volume, re-ranked by volume.
+    """
+    if metrics.empty:
+        return metrics
+    frame = metrics.assign(keyword=metrics["keyword"].map(lambda keyword: mapping.get(keyword, keyword)))
+    weight = frame["avg_volume"].where(frame["avg_volume"] > 0, 0) + 1e-9  # Zero-volume groups fall back to a plain mean
+    frame = frame.assign(weight=weight, cpc=frame["cpc"] * weight, competition=frame["competition"] * weight)
+    grouped = frame.groupby("keyword")[["avg_volume", "latest_volume", "cpc", "competition", "weight"]].sum()
+    grouped["cpc"] /= grouped["weight"]
+    grouped["competition"] /= grouped["weight"]
+    grouped = grouped.reset_index().sort_values(["avg_volume", "keyword"], ascending=[False, True])  # Stable prompts
+    return grouped.reset_index(drop=True)[["keyword", "avg_volume", "latest_volume", "cpc", "competition"]]
+
+# Function: Format Keyword Table
+def format_keyword_table(metrics, top_n=50):
+    """
+    Markdown table of the top keywords for the prompt.
+    """
+    lines = ["| Keyword | Avg. monthly volume | Latest volume | CPC | Competition |", "|---|---|---|---|---|"]
+    for row in metrics.head(top_n).itertuples(index=False):
+        lines.append(
+            f"| {row.keyword} | {row.avg_volume:,.0f} | {row.latest_volume:,.0f} | {row.cpc:.2f} | {row.competition:.2f} |"
+        )
+    if len(metrics) > top_n:
+        lines.append(f"\n({len(metrics) - top_n} more keywords not shown)")
+    return "\n".join(lines)
+
+_shared_store = None  # Process-wide store, created on first use
+_shared_store_lock = threading.Lock()
+
+# Function: Shared Keyword Store
+def get_keyword_store():
+    """
+    Returns the process-wide keyword store, or None when no keyword source is configured:
+    - SEM_PLANNER_KEYWORD_DB (DuckDB file) takes precedence, for offline runs.
+    - Otherwise BigQuery, when the BIGQUERY_* secrets are set.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            backend = None
+            if os.environ.get("SEM_PLANNER_KEYWORD_DB"):
+                backend = DuckDBBackend(os.environ["SEM_PLANNER_KEYWORD_DB"])
+            else:
+                from utils.registry import get_bigquery_client, get_secret  # Pooled BigQuery client
+
+                client = get_bigquery_client()
+                if client is not None:
+                    backend = BigQueryBackend(client, get_secret("BIGQUERY_KEYWORD_TABLE", DEFAULT_TABLE))
+            if backend is not None:
+                _shared_store = KeywordStore(backend)
+    return _shared_store
+
+# End of file: tools/keyword_store.py
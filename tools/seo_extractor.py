@@ -0,0 +1,269 @@
+###############################################
+# SEO Metadata Extractor
+# File: tools/seo_extractor.py
+# Purpose: Deterministic local extraction of SEO metadata, keywords and keyword gaps
+###############################################
+
+# Import required libraries
+import json  # JSON-LD structured data
+import re  # Keyword tokenization
+from collections import Counter  # Keyword frequencies
+
+from bs4 import BeautifulSoup, SoupStrainer  # HTML parsing (lxml backend)
+
+from tools.site_crawler_tool import crawl_sites  # Concurrent site crawler
+from tools.thai_tokenizer import THAI_RUN, get_thai_tokenizer, thai_stopwords  # Thai word segmentation
+
+# Only these tags (plus microdata items) are parsed; everything else in the page is skipped by lxml
+SEO_TAG_NAMES = frozenset(["title", "meta", "link", "h1", "h2", "h3", "img", "script"])
+
+# Class: SEO Strainer
+class SEOStrainer(SoupStrainer):
+    """
+    Keeps the SEO tags and any tag carrying a microdata `itemtype` (div, section, ...).
+    """
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        """
+        Decides per tag, before lxml builds it, whether it is kept.
+        """
+        return name in SEO_TAG_NAMES or bool(attrs and "itemtype" in attrs)
+
+SEO_TAGS = SEOStrainer(list(SEO_TAG_NAMES))
+
+# Latin words (with inner hyphens/apostrophes) or runs of Thai characters
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*|[\u0E00-\u0E7F]+")
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has have how in is it its of on or our the their this to
+    we what when where which who why will with you your us more all about can get new
+""".split())
+
+# Function: Extract Page Metadata
+def extract_page_metadata(html, url):
+    """
+    Extracts SEO metadata from one page:
+    - Title, meta description, canonical URL and hreflang alternates.
+    - H1-H3 headings and image alt text.
+    - Structured data types (JSON-LD and microdata).
+    """
+    soup = BeautifulSoup(html, "lxml", parse_only=SEO_TAGS)
+
+    def meta_content(name):
+        tag = soup.find("meta", attrs={"name": re.compile(f"^{name}$", re.I)})
+        return tag.get("content", "").strip() if tag else ""
+
+    # Structured data: JSON-LD @type values plus microdata itemtype attributes
+    structured_data = []
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            items = data.get("@graph", [data])
+        elif isinstance(data, list):
+            items = data
+        else:
+            continue  # Scalar payloads carry no types
+        for item in items if isinstance(items, list) else [items]:
+            types = item.get("@type") if isinstance(item, dict) else None
+            structured_data.extend(str(value) for value in (types if isinstance(types, list) else [types]) if value)
+    structured_data.extend(
+        itemtype.rstrip("/").rsplit("/", 1)[-1] for tag in soup.find_all(itemtype=True) for itemtype in tag["itemtype"].split()
+    )
+
+    canonical = soup.find("link", rel="canonical")
+    return {
+        "url": url,
+        "title": soup.title.get_text(strip=True) if soup.title else "",
+        "description": meta_content("description"),
+        "canonical": canonical.get("href", "") if canonical else "",
+        "hreflang": sorted({tag.get("hreflang") for tag in soup.find_all("link", hreflang=True)}),
+        "h1": [tag.get_text(" ", strip=True) for tag in soup.find_all("h1")],
+        "h2": [tag.get_text(" ", strip=True) for tag in soup.find_all("h2")],
+        "h3": [tag.get_text(" ", strip=True) for tag in soup.find_all("h3")],
+        "alt": [tag["alt"].strip() for tag in soup.find_all("img", alt=True) if tag["alt"].strip()],
+        "structured_data": sorted(set(structured_data)),
+    }
+
+# Function: Is Stopword
+def is_stopword(token):
+    """
+    English stopwords, and Thai stopwords for Thai tokens (the Thai list loads only when needed).
+    """
+    if THAI_RUN.match(token):
+        return token in thai_stopwords()
+    return token in STOPWORDS
+
+# Function: Tokenize Keywords
+def tokenize(text):
+    """
+    Lower-cases text and returns keyword tokens without stopwords.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1 and not is_stopword(token)]
+
+# Function: Page Texts
+def page_texts(page):
+    """
+    Returns the SEO text fields of a page (title, description, headings, alt text).
+    """
+    return [page["title"], page["description"], *page["h1"], *page["h2"], *page["h3"], *page["alt"]]
+
+# Function: Segment Pages
+def segment_pages(pages):
+    """
+    Adds "keyword_texts" to every page: its SEO text fields with Thai runs split into words.
+    All pages go to the Thai tokenizer in one batch (memoized, parallel for large sites).
+    """
+    texts = [page_texts(page) for page in pages]
+    if not any(THAI_RUN.search(text) for fields in texts for text in fields):
+        for page, fields in zip(pages, texts):
+            page["keyword_texts"] = fields
+        return pages
+    segmented = iter(get_thai_tokenizer().segment_batch([text for fields in texts for text in fields]))
+    for page, fields in zip(pages, texts):
+        page["keyword_texts"] = [next(segmented) for _ in fields]
+    return pages
+
+# Function: Keyword Texts
+def keyword_texts(page):
+    """
+    Returns the page's SEO texts for keyword extraction (Thai segmented when segment_pages ran).
+    """
+    return page.get("keyword_texts") or page_texts(page)
+
+# Function: Page Keywords
+def page_keywords(page):
+    """
+    Returns the set of unigram and bigram keywords from a page's SEO fields.
+    """
+    keywords = set()
+    for text in keyword_texts(page):
+        tokens = tokenize(text)
+        keywords.update(tokens)
+        keywords.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    return keywords
+
+# Function: Summarize Site
+def summarize_site(pages, top_n=30):
+    """
+    Aggregates page metadata into a compact per-site summary.
+    """
+    titles = Counter(page["title"] for page in pages if page["title"])
+    keyword_pages = Counter()  # Number of pages each keyword appears on
+    for page in pages:
+        keyword_pages.update(page_keywords(page))
+
+    return {
+        "pages": len(pages),
+        "missing_title": sum(1 for page in pages if not page["title"]),
+        "missing_description": sum(1 for page in pages if not page["description"]),
+        "missing_h1": sum(1 for page in pages if not page["h1"]),
+        "duplicate_titles": sum(count for count in titles.values() if count > 1),
+        "avg_title_length": round(sum(len(title) * count for title, count in titles.items()) / max(sum(titles.values()), 1)),
+        "hreflang": sorted({lang for page in pages for lang in page["hreflang"]}),
+        "structured_data": sorted({kind for page in pages for kind in page["structured_data"]}),
+        "home": pages[0] if pages else None,
+        "keyword_pages": keyword_pages,
+        "top_keywords": [keyword for keyword, _ in keyword_pages.most_common(top_n)],
+    }
+
+# Function: Compare Sites
+def compare_sites(our_pages, competitor_pages, top_n=30):
+    """
+    Builds the structured comparison handed to the Website Analyst agent:
+    - Per-site metadata health and top keywords.
+    - Keyword presence: shared, competitor-only (gaps) and our-only (strengths).
+    """
+    ours = summarize_site(our_pages, top_n)
+    theirs = summarize_site(competitor_pages, top_n)
+    our_keywords = set(ours["keyword_pages"])
+    their_keywords = set(theirs["keyword_pages"])
+
+    def ranked(keywords, counts):
+        return sorted(keywords, key=lambda keyword: (-counts[keyword], keyword))[:top_n]
+
+    return {
+        "our_site": ours,
+        "competitor_site": theirs,
+        "shared_keywords": ranked(our_keywords & their_keywords, theirs["keyword_pages"] + ours["keyword_pages"]),
+        "keyword_gaps": ranked(their_keywords - our_keywords, theirs["keyword_pages"]),
+        "our_unique_keywords": ranked(our_keywords - their_keywords, ours["keyword_pages"]),
+    }
+
+# Function: Semantic Keyword Gaps
+def semantic_keyword_gaps(comparison, embedding_service, threshold=0.75, top_n=30):
+    """
+    Narrows competitor-only keywords to those with no semantically close keyword
+    on our site (e.g. a synonym or Thai/English equivalent doesn't count as a gap).
+    """
+    our_keywords = sorted(comparison["our_site"]["keyword_pages"])
+    candidates = sorted(set(comparison["competitor_site"]["keyword_pages"]) - set(our_keywords))
+    gaps = embedding_service.semantic_gaps(our_keywords, candidates, threshold)
+    counts = comparison["competitor_site"]["keyword_pages"]
+    return sorted((keyword for keyword, _ in gaps), key=lambda keyword: (-counts[keyword], keyword))[:top_n]
+
+# Function: Extract Sites
+def extract_sites(urls, snapshots=None, **crawl_options):
+    """
+    Crawls every site concurrently and returns {root_url: [page metadata, ...]},
+    with the Thai text of all pages segmented in one batch.
+    With a snapshot store, unchanged pages reuse their stored metadata instead of being
+    parsed again, and every page carries its change state ("change", "distance", "diff").
+    """
+    sites = crawl_sites(urls, snapshots=snapshots, **crawl_options)
+    extracted, fresh = {}, {}
+    for url in urls:
+        extracted[url] = []
+        for page in sites.get(url, []):
+            metadata = page.get("metadata")
+            if metadata is None:
+                metadata = fresh[page["url"]] = extract_page_metadata(page["html"], page["url"])
+            changes = {field: page[field] for field in ("change", "distance", "diff") if field in page}
+            extracted[url].append({**metadata, **changes})
+    if snapshots is not None and fresh:
+        snapshots.save_metadata(fresh)
+    segment_pages([page for pages in extracted.values() for page in pages])
+    return extracted
+
+# Function: Analyze Sites
+def analyze_sites(our_url, competitor_url, **crawl_options):
+    """
+    Crawls both sites, extracts metadata from every page and compares them.
+    """
+    sites = extract_sites([our_url, competitor_url], **crawl_options)
+    return compare_sites(sites[our_url], sites[competitor_url])
+
+# Function: Format Summary
+def format_summary(comparison):
+    """
+    Renders the comparison as compact markdown for the task prompt.
+    """
+    lines = []
+    for label, site in (("Our Website", comparison["our_site"]), ("Competitor Website", comparison["competitor_site"])):
+        home = site["home"] or {}
+        lines += [
+            f"### {label}",
+            f"- Pages analyzed: {site['pages']}",
+            f"- Home title: {home.get('title', '')}",
+            f"- Home description: {home.get('description', '')}",
+            f"- Home H1: {'; '.join(home.get('h1', []))}",
+            f"- Canonical: {home.get('canonical', '')}",
+            f"- Missing titles / descriptions / H1: {site['missing_title']} / {site['missing_description']} / {site['missing_h1']}",
+            f"- Duplicate titles: {site['duplicate_titles']}, average title length: {site['avg_title_length']}",
+            f"- hreflang: {', '.join(site['hreflang']) or 'none'}",
+            f"- Structured data: {', '.join(site['structured_data']) or 'none'}",
+            f"- Top keywords: {', '.join(site['top_keywords'])}",
+            "",
+        ]
+    lines += [
+        "### Keyword Presence",
+        f"- Shared: {', '.join(comparison['shared_keywords'])}",
+        f"- Gaps (competitor only): {', '.join(comparison['keyword_gaps'])}",
+        f"- Our unique keywords: {', '.join(comparison['our_unique_keywords'])}",
+    ]
+    if "semantic_gaps" in comparison:
+        lines.append(f"- Semantic gaps (no close match on our site): {', '.join(comparison['semantic_gaps'])}")
+    return "\n".join(lines)
+
+# End of file: tools/seo_extractor.py
@@ -0,0 +1,347 @@
+###############################################
+# Site Crawler Tool
+# File: tools/site_crawler_tool.py
+# Purpose: Async bounded-concurrency crawler that fetches whole sites for website analysis
+###############################################
+
+# Import required libraries
+import asyncio  # Concurrent page fetching
+import contextvars  # Keep the current trace span in the helper thread
+import re  # Whitespace cleanup
+import threading  # Run the event loop when one is already active
+from urllib.parse import urldefrag, urljoin, urlparse  # URL normalization
+from urllib.robotparser import RobotFileParser  # robots.txt rules
+from xml.etree import ElementTree  # sitemap.xml parsing
+
+import aiohttp  # Async HTTP client with keep-alive connection pooling
+from bs4 import BeautifulSoup, SoupStrainer  # HTML parsing
+from crewai.tools import BaseTool  # Base class for CrewAI tools
+from pydantic import BaseModel, Field  # Tool argument schema
+
+from tools.snapshot_store import conditional_headers  # Conditional GETs from stored snapshots
+from utils.rate_limiter import QuotaExhausted, ThrottledError, get_limiter  # Per-host rate limit shared by all crawls
+from utils.telemetry import span  # Crawl spans
+
+# Default crawler settings
+USER_AGENT = "SEMPlannerBot/1.0 (+https://github.com/Surapat-SV)"
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".zip", ".mp4", ".mp3",
+    ".css", ".js", ".ico", ".xml", ".doc", ".docx", ".xls", ".xlsx",
+)
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+# Function: Normalize URL
+def normalize_url(url, base=None):
+    """
+    Resolves `url` against `base` and drops the fragment.
+    """
+    absolute = urljoin(base, url) if base else url
+    return urldefrag(absolute)[0]
+
+# Function: Same Site Check
+def same_site(url, root):
+    """
+    Returns True if `url` is on the same host as `root` (ignoring a leading "www.").
+    """
+    host = urlparse(url).netloc.lower().removeprefix("www.")
+    return host == urlparse(root).netloc.lower().removeprefix("www.")
+
+# Function: Host Limiter
+def host_limiter(url):
+    """
+    Rate limiter shared by every crawl of `url`'s host, across sessions and batch rows.
+    """
+    return get_limiter("crawl:" + urlparse(url).netloc.lower().removeprefix("www."))
+
+# Function: Throttled
+def throttled(response):
+    """
+    Raises ThrottledError for 429/503 responses so the host limiter slows down and retries.
+    """
+    if response.status in (429, 503):
+        raise ThrottledError(response.status, response.headers.get("Retry-After"))
+
+# Class: Site Crawler
+class SiteCrawler:
+    """
+    Crawls one or more websites concurrently:
+    1. Reads robots.txt and skips disallowed paths.
+    2. Seeds the frontier from sitemap.xml and the home page.
+    3. Follows internal links breadth-first up to `max_depth` and `max_pages`.
+    4. Shares one keep-alive connection pool across all sites.
+    5. Paces requests per host with a rate limit shared by all concurrent crawls.
+    6. With a snapshot store, pages are fetched with conditional GETs (a 304 is served from
+       the stored snapshot) and every page is classified as new, unchanged, minor or changed.
+    """
+
+    def __init__(self, max_depth=2, max_pages=200, concurrency=10, timeout=15, user_agent=USER_AGENT, snapshots=None):
+        """
+        Configure crawl depth, page budget per site, concurrency per host and the snapshot store.
+        """
+        self.max_depth = max_depth  # Link hops from the home page
+        self.max_pages = max_pages  # Page budget per site
+        self.concurrency = concurrency  # Simultaneous requests per site
+        self.timeout = aiohttp.ClientTimeout(total=timeout)  # Per-request timeout
+        self.user_agent = user_agent  # Sent with every request and checked against robots.txt
+        self.snapshots = snapshots  # SnapshotStore for conditional GETs and change detection (optional)
+
+    async def crawl_sites(self, urls):
+        """
+        Crawls every site at the same time and returns {root_url: [page, ...]}.
+        Each page is a dict with url, status, depth, html, etag and last_modified;
+        with a snapshot store it also carries change, distance and (for changed pages) diff.
+        """
+        connector = aiohttp.TCPConnector(limit_per_host=self.concurrency, keepalive_timeout=30)
+        headers = {"User-Agent": self.user_agent, "Accept": "text/html,application/xhtml+xml"}
+        async with aiohttp.ClientSession(connector=connector, headers=headers, timeout=self.timeout) as session:
+            results = await asyncio.gather(*(self._crawl_site(session, url) for url in urls))
+        return dict(zip(urls, results))
+
+    async def _crawl_site(self, session, root):
+        """
+        Breadth-first crawl of a single site.
+        """
+        with span("crawl.site", {"url.full": root}, kind="CLIENT") as site_span:
+            pages = await self._crawl_pages(session, root)
+            site_span.set_attribute("sem.crawl.pages", len(pages))
+            site_span.set_attribute("sem.crawl.bytes", sum(len(page["html"]) for page in pages))
+            return pages
+
+    async def _crawl_pages(self, session, root):
+        """
+        Fetches pages level by level from the home page and sitemap, within the page budget.
+        """
+        robots = await self._read_robots(session, root)
+        previous = self.snapshots.load(root) if self.snapshots is not None else {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pages = []
+        failed = set()  # URLs that couldn't be fetched (network errors, throttling, server errors)
+        seen = {normalize_url(root)}
+        frontier = [normalize_url(root)]
+
+        # Sitemap URLs are one hop from the home page
+        sitemap_urls = await self._read_sitemaps(session, root, robots)
+        next_frontier = [url for url in sitemap_urls if url not in seen and same_site(url, root)]
+        seen.update(next_frontier)
+
+        for depth in range(self.max_depth + 1):
+            budget = self.max_pages - len(pages)
+            batch = [url for url in frontier if robots.can_fetch(self.user_agent, url)][:budget]
+            if not batch:
+                break
+
+            fetched = await asyncio.gather(*(self._fetch_page(session, semaphore, url, previous.get(url)) for url in batch))
+            for url, (status, html, validators) in zip(batch, fetched):
+                if html is None:
+                    if status is None or status >= 500:
+                        failed.add(url)
+                    continue
+                pages.append({"url": url, "status": status, "depth": depth, "html": html, **validators})
+
+                # Queue internal links for the next level
+                if depth < self.max_depth:
+                    for link in self._extract_links(html, url, root):
+                        if link not in seen:
+                            seen.add(link)
+                            next_frontier.append(link)
+
+            frontier, next_frontier = next_frontier, []
+
+        if self.snapshots is not None:
+            # Missing pages only count as removed when the site answered and the crawl covered it
+            home_fetched = any(page["url"] == normalize_url(root) for page in pages)
+            complete = home_fetched and len(pages) < self.max_pages
+            self.snapshots.update(root, pages, previous, complete=complete, failed=failed)
+        return pages
+
+    async def _fetch_page(self, session, semaphore, url, snapshot=None):
+        """
+        Fetches one HTML page; returns (status, html, validators) or (status, None, {}) on failure.
+        With a stored `snapshot`, the request is conditional and a 304 returns the stored HTML.
+        """
+
+        async def get():
+            async with session.get(url, allow_redirects=True, headers=conditional_headers(snapshot)) as response:
+                throttled(response)
+                if response.status == 304 and snapshot is not None:
+                    return 304, snapshot["html"], {"etag": snapshot["etag"], "last_modified": snapshot["last_modified"]}
+                if response.status != 200 or "html" not in response.headers.get("Content-Type", ""):
+                    return response.status, None, {}
+                validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+                return response.status, await response.text(errors="replace"), validators
+
+        async with semaphore:
+            try:
+                return await host_limiter(url).acall(get)
+            except (aiohttp.ClientError, asyncio.TimeoutError, QuotaExhausted):
+                return None, None, {}
+
+    async def _read_robots(self, session, root):
+        """
+        Downloads and parses robots.txt (a missing file allows everything).
+        """
+        robots = RobotFileParser()
+        status, text = await self._fetch_text(session, urljoin(root, "/robots.txt"))
+        robots.parse(text.splitlines() if status == 200 and text else [])
+        return robots
+
+    async def _read_sitemaps(self, session, root, robots):
+        """
+        Collects page URLs from the sitemaps listed in robots.txt (or /sitemap.xml),
+        following one level of sitemap index files.
+        """
+        sitemaps = robots.site_maps() or [urljoin(root, "/sitemap.xml")]
+        urls = []
+        for sitemap in sitemaps:
+            for loc, is_index in await self._parse_sitemap(session, sitemap):
+                if is_index:
+                    urls.extend(loc for loc, _ in await self._parse_sitemap(session, loc))
+                else:
+                    urls.append(loc)
+                if len(urls) >= self.max_pages:
+                    return [normalize_url(url) for url in urls[:self.max_pages]]
+        return [normalize_url(url) for url in urls]
+
+    async def _parse_sitemap(self, session, url):
+        """
+        Returns [(loc, is_index), ...] for one sitemap file.
+        """
+        status, text = await self._fetch_text(session, url)
+        if status != 200 or not text:
+            return []
+        try:
+            tree = ElementTree.fromstring(text.encode("utf-8"))
+        except ElementTree.ParseError:
+            return []
+        is_index = tree.tag.endswith("sitemapindex")
+        return [(loc.text.strip(), is_index) for loc in tree.iter(f"{SITEMAP_NS}loc") if loc.text]
+
+    async def _fetch_text(self, session, url):
+        """
+        Fetches a plain-text resource (robots.txt, sitemap.xml).
+        """
+
+        async def get():
+            async with session.get(url) as response:
+                throttled(response)
+                return response.status, await response.text(errors="replace")
+
+        try:
+            return await host_limiter(url).acall(get)
+        except (aiohttp.ClientError, asyncio.TimeoutError, QuotaExhausted):
+            return None, None
+
+    @staticmethod
+    def _extract_links(html, page_url, root):
+        """
+        Returns internal, crawlable links found on a page.
+        """
+        links = []
+        for anchor in BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("a", href=True)).find_all("a"):
+            link = normalize_url(anchor["href"], page_url)
+            path = urlparse(link).path.lower()
+            if link.startswith("http") and same_site(link, root) and not path.endswith(SKIPPED_EXTENSIONS):
+                links.append(link)
+        return links
+
+# Function: Crawl Sites
+def crawl_sites(urls, **options):
+    """
+    Synchronous entry point: crawls `urls` concurrently and returns {root_url: [page, ...]}.
+    Runs in a helper thread when called from inside a running event loop.
+    """
+    crawler = SiteCrawler(**options)
+    with span("crawl", {"sem.crawl.sites": len(urls)}):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(crawler.crawl_sites(urls))
+
+        # An event loop is already running in this thread: crawl on a separate one
+        outcome = {}
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                outcome["result"] = context.run(asyncio.run, crawler.crawl_sites(urls))
+            except BaseException as error:  # Re-raised in the calling thread below
+                outcome["error"] = error
+
+        worker = threading.Thread(target=run)
+        worker.start()
+        worker.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+# Function: Page Text
+def page_text(html, max_chars=1500):
+    """
+    Returns the page title and visible text, whitespace-collapsed and truncated.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "svg"]):
+        tag.decompose()
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    text = re.sub(r"\s+", " ", soup.get_text(" ")).strip()
+    return title, text[:max_chars]
+
+# Function: Build Site Corpus
+def build_corpus(pages, max_chars=20000, page_chars=1500):
+    """
+    Joins crawled pages into one compact markdown corpus capped at `max_chars`.
+    """
+    sections = []
+    total = 0
+    for page in pages:
+        title, text = page_text(page["html"], page_chars)
+        section = f"### {title or page['url']}\nURL: {page['url']}\n{text}\n"
+        if total + len(section) > max_chars:
+            break
+        sections.append(section)
+        total += len(section)
+    return "\n".join(sections)
+
+# Class: Site Crawler Tool Schema
+class SiteCrawlerToolSchema(BaseModel):
+    """
+    Input schema for SiteCrawlerTool.
+    """
+    our_url: str = Field(..., description="Home page URL of our website")
+    competitor_url: str = Field(..., description="Home page URL of the competitor website")
+
+# Class: Site Crawler Tool
+class SiteCrawlerTool(BaseTool):
+    """
+    CrewAI tool that crawls our site and the competitor site in one call
+    and returns a compact per-site corpus.
+    """
+
+    name: str = "Crawl websites"
+    description: str = (
+        "Crawls our website and the competitor website concurrently (sitemap and internal links, "
+        "robots.txt respected) and returns a compact text corpus for each site."
+    )
+    args_schema: type[BaseModel] = SiteCrawlerToolSchema
+    max_depth: int = 2  # Link hops from the home page
+    max_pages: int = 200  # Page budget per site
+    concurrency: int = 10  # Simultaneous requests per site
+    max_chars: int = 20000  # Corpus size cap per site
+
+    def _run(self, our_url, competitor_url):
+        """
+        Crawls both sites and formats the corpora for the agent.
+        """
+        sites = crawl_sites(
+            [our_url, competitor_url],
+            max_depth=self.max_depth,
+            max_pages=self.max_pages,
+            concurrency=self.concurrency,
+        )
+        output = []
+        for label, url in (("Our Website", our_url), ("Competitor Website", competitor_url)):
+            pages = sites.get(url, [])
+            output.append(f"## {label}: {url} ({len(pages)} pages crawled)\n\n{build_corpus(pages, self.max_chars)}")
+        return "\n\n".join(output)
+
+# End of file: tools/site_crawler_tool.py
@@ -0,0 +1,395 @@
+###############################################
+# Crawl Snapshot Store
+# File: tools/snapshot_store.py
+# Purpose: Per-URL crawl snapshots with HTTP validators, content and SEO field hashes and SimHash change detection
+###############################################
+
+# Import required libraries
+import hashlib  # Content hashes and SimHash shingle hashes
+import json  # Serialize page metadata and analyses
+import re  # Whitespace and token patterns
+import sqlite3  # On-disk storage (pysqlite3 when the compatibility fix is applied)
+import threading  # Serialize access from concurrent crawls
+import time  # Fetch and change timestamps
+import unicodedata  # Unicode normalization of page text
+import zlib  # Compress stored HTML and text
+
+import numpy as np  # Vectorized SimHash voting
+from bs4 import BeautifulSoup  # Visible text extraction
+
+from utils.paths import cache_path  # Location of local cache files
+
+# Tokens for SimHash shingles: Thai runs or Unicode words
+TOKEN_PATTERN = re.compile(r"[\u0E00-\u0E7F]+|\w+")
+SHINGLE_TOKENS = 3
+
+# SimHash distance (of 64 bits) above which a page counts as materially changed;
+# smaller distances are typo fixes, dates, counters and other boilerplate churn
+MATERIAL_BITS = 3
+
+# Change states of a crawled page
+NEW, UNCHANGED, MINOR, CHANGED = "new", "unchanged", "minor", "changed"
+
+# Diff lines quoted per changed page
+DIFF_SAMPLES = 3
+
+# Prefix of the SEO field lines stored ahead of a page's visible text
+SEO_PREFIX = "@seo "
+
+# Function: Normalize Line
+def normalize_line(line):
+    """
+    NFKC-normalized line with whitespace collapsed.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", line)).strip()
+
+# Function: SEO Fields
+def seo_fields(soup):
+    """
+    SEO fields that are not visible text, as "@seo <field>: <value>" lines:
+    meta description and robots, canonical URL, hreflang alternates, image alt text,
+    JSON-LD blocks (re-serialized with sorted keys) and microdata types.
+    """
+    fields = [
+        f"{meta['name'].lower()}: {meta.get('content', '')}"
+        for meta in soup.find_all("meta", attrs={"name": re.compile("^(description|robots)$", re.I)})
+    ]
+    for link in soup.find_all("link", href=True):
+        if "canonical" in [rel.lower() for rel in link.get("rel", [])]:
+            fields.append(f"canonical: {link['href']}")
+        if link.get("hreflang"):
+            fields.append(f"hreflang {link['hreflang']}: {link['href']}")
+    fields += [f"alt: {image['alt']}" for image in soup.find_all("img", alt=True) if image["alt"].strip()]
+    for script in soup.find_all("script", type="application/ld+json"):
+        data = script.string or ""
+        try:
+            data = json.dumps(json.loads(data), ensure_ascii=False, sort_keys=True)
+        except ValueError:
+            pass  # Invalid JSON-LD is compared as text
+        fields.append(f"json-ld: {data}")
+    fields += [f"itemtype: {tag['itemtype']}" for tag in soup.find_all(itemtype=True)]
+    return [SEO_PREFIX + normalize_line(field) for field in fields]
+
+# Function: Normalize Content
+def normalize_content(html):
+    """
+    SEO fields, then the visible text, of a page as normalized lines (NFKC, whitespace collapsed,
+    empty lines dropped), so markup, script and styling changes don't count as content changes.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    seo = seo_fields(soup)
+    for tag in soup(["script", "style", "noscript", "svg", "template"]):
+        tag.decompose()
+    lines = (normalize_line(line) for line in soup.get_text("\n").splitlines())
+    return seo + [line for line in lines if line]
+
+# Function: Split SEO Lines
+def split_seo(lines):
+    """
+    Splits normalized lines into (SEO field lines, visible text lines).
+    """
+    return [line for line in lines if line.startswith(SEO_PREFIX)], [line for line in lines if not line.startswith(SEO_PREFIX)]
+
+# Function: Content Hash
+def content_hash(lines):
+    """
+    Exact hash of normalized lines.
+    """
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+# Function: SimHash
+def simhash(lines):
+    """
+    64-bit SimHash over word 3-shingles: every shingle hash votes on each bit, so
+    near-identical texts get fingerprints a few bits apart.
+    """
+    tokens = TOKEN_PATTERN.findall(" ".join(lines).casefold())
+    if not tokens:
+        return 0
+    shingles = {" ".join(tokens[i:i + SHINGLE_TOKENS]) for i in range(max(len(tokens) - SHINGLE_TOKENS + 1, 1))}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") for shingle in shingles],
+        dtype="<u8",
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")  # (shingles x 64)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
+    return int(np.packbits(votes, bitorder="little").view("<u8")[0])
+
+# Function: Hamming Distance
+def hamming(first, second):
+    """
+    Number of differing bits between two fingerprints.
+    """
+    return bin(first ^ second).count("1")
+
+# Function: Diff Summary
+def diff_summary(old_lines, new_lines, samples=DIFF_SAMPLES):
+    """
+    Line-level diff of two normalized texts (order-insensitive):
+    {"added": n, "removed": n, "added_samples": [...], "removed_samples": [...]}.
+    """
+    old, new = set(old_lines), set(new_lines)
+    added = [line for line in dict.fromkeys(new_lines) if line not in old]
+    removed = [line for line in dict.fromkeys(old_lines) if line not in new]
+    return {
+        "added": len(added),
+        "removed": len(removed),
+        "added_samples": added[:samples],
+        "removed_samples": removed[:samples],
+    }
+
+# Function: Conditional Headers
+def conditional_headers(snapshot):
+    """
+    If-None-Match / If-Modified-Since headers from a stored snapshot.
+    """
+    headers = {}
+    if snapshot and snapshot.get("etag"):
+        headers["If-None-Match"] = snapshot["etag"]
+    if snapshot and snapshot.get("last_modified"):
+        headers["If-Modified-Since"] = snapshot["last_modified"]
+    return headers
+
+# Class: Snapshot Store
+class SnapshotStore:
+    """
+    Keeps the latest snapshot of every crawled URL in SQLite:
+    1. HTTP validators (ETag, Last-Modified) for conditional GETs on the next crawl.
+    2. Normalized text with the page's SEO fields, its exact hash, a hash of the SEO fields alone
+       and a 64-bit SimHash of the visible text for change classification.
+    3. Compressed HTML, so a 304 response still yields the page, and the extracted metadata,
+       so unchanged pages are not parsed again.
+    4. The last website analysis per set of sites with the page fingerprints it was built from,
+       reused while nothing changed materially since then.
+    """
+
+    def __init__(self, filename="snapshots.sqlite3"):
+        """
+        Open (or create) the snapshot database.
+        """
+        self.path = cache_path(filename)  # Database file inside the cache directory
+        self._lock = threading.Lock()
+
+        # Autocommit connection shared by all threads (guarded by the lock)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "url TEXT PRIMARY KEY, root TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "content_hash TEXT NOT NULL, simhash TEXT NOT NULL, text BLOB NOT NULL, html BLOB NOT NULL, "
+            "metadata TEXT, fetched_at REAL NOT NULL, changed_at REAL NOT NULL, removed_at REAL, seo_hash TEXT)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(snapshots)")]
+        if "seo_hash" not in columns:
+            self._conn.execute("ALTER TABLE snapshots ADD COLUMN seo_hash TEXT")  # Stores created before SEO hashing
+        self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_root ON snapshots (root)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses (key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def load(self, root):
+        """
+        Returns {url: snapshot} for the live (not removed) pages of the site at `root`.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, etag, last_modified, content_hash, seo_hash, simhash, text, html, metadata "
+                "FROM snapshots WHERE root = ? AND removed_at IS NULL", (root,)
+            ).fetchall()
+        return {
+            url: {
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_hash": text_hash,
+                "seo_hash": seo_hash,
+                "simhash": int(fingerprint, 16),
+                "lines": [line for line in zlib.decompress(text).decode("utf-8").split("\n") if line],
+                "html": zlib.decompress(html).decode("utf-8"),
+                "metadata": json.loads(metadata) if metadata else None,
+            }
+            for url, etag, last_modified, text_hash, seo_hash, fingerprint, text, html, metadata in rows
+        }
+
+    def update(self, root, pages, previous, complete=True, failed=()):
+        """
+        Classifies each crawled page against its previous snapshot and stores the new snapshots:
+        - Sets page["change"] (new/unchanged/minor/changed), page["distance"] (SimHash bits of the
+          visible text) and, for changed pages, page["diff"]; unchanged pages get their stored "metadata".
+          Any change of the SEO fields counts as changed.
+        - With `complete` (the home page was fetched and the crawl wasn't cut by the page budget),
+          stored pages that were not found again, except those in `failed` (fetch errors), are
+          marked removed. Returns the removed URLs.
+        """
+        now = time.time()
+        rows, touched = [], []
+        for page in pages:
+            snapshot = previous.get(page["url"])
+            if page.get("status") == 304 and snapshot is not None:
+                page.update(change=UNCHANGED, distance=0, metadata=snapshot["metadata"])
+                touched.append((now, page["url"]))
+                continue
+
+            lines = normalize_content(page["html"])
+            seo, text = split_seo(lines)
+            text_hash, seo_hash, fingerprint = content_hash(lines), content_hash(seo), simhash(text)
+            if snapshot is None:
+                page.update(change=NEW, distance=None)
+            elif text_hash == snapshot["content_hash"]:
+                page.update(change=UNCHANGED, distance=0, metadata=snapshot["metadata"])
+            else:
+                distance = hamming(fingerprint, snapshot["simhash"])
+                material = distance > MATERIAL_BITS or seo_hash != snapshot["seo_hash"]
+                page.update(change=CHANGED if material else MINOR, distance=distance)
+                page["diff"] = diff_summary(snapshot["lines"], lines)
+            changed_at = now if page["change"] != UNCHANGED else None
+            rows.append((
+                page["url"], root, page.get("etag"), page.get("last_modified"), text_hash, seo_hash, f"{fingerprint:016x}",
+                zlib.compress("\n".join(lines).encode("utf-8")), zlib.compress(page["html"].encode("utf-8")),
+                json.dumps(page.get("metadata"), ensure_ascii=False) if page.get("metadata") else None,
+                now, changed_at, page["url"],
+            ))
+
+        seen = {page["url"] for page in pages}
+        removed = sorted(url for url in previous if url not in seen and url not in failed) if complete else []
+        with self._lock:
+            with self._conn:  # One transaction per site
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO snapshots (url, root, etag, last_modified, content_hash, seo_hash, simhash, text, "
+                    "html, metadata, fetched_at, changed_at, removed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, "
+                    "COALESCE(?, (SELECT changed_at FROM snapshots WHERE url = ?), 0), NULL)",
+                    rows,
+                )
+                self._conn.executemany("UPDATE snapshots SET fetched_at = ? WHERE url = ?", touched)
+                self._conn.executemany(
+                    "UPDATE snapshots SET removed_at = ? WHERE url = ?", [(now, url) for url in removed]
+                )
+        return removed
+
+    def fingerprints(self, root):
+        """
+        Returns {url: {"content_hash", "seo_hash", "simhash"}} for the live pages of the site at `root`.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, content_hash, seo_hash, simhash FROM snapshots WHERE root = ? AND removed_at IS NULL", (root,)
+            ).fetchall()
+        return {
+            url: {"content_hash": text_hash, "seo_hash": seo_hash, "simhash": fingerprint}
+            for url, text_hash, seo_hash, fingerprint in rows
+        }
+
+    def save_metadata(self, metadata):
+        """
+        Stores extracted page metadata ({url: metadata}) next to the snapshots.
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "UPDATE snapshots SET metadata = ? WHERE url = ?",
+                    [(json.dumps(value, ensure_ascii=False), url) for url, value in metadata.items()],
+                )
+
+    def last_analysis(self, key):
+        """
+        Returns the last stored analysis for `key` as {"result", "basis"}, or None.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM analyses WHERE key = ?", (key,)).fetchone()
+        stored = json.loads(row[0]) if row else None
+        return stored if isinstance(stored, dict) and "basis" in stored else None  # Older entries have no basis
+
+    def save_analysis(self, key, result, basis):
+        """
+        Stores the latest analysis for `key` with its `basis`: the page fingerprints it was built from
+        ({root: {url: fingerprint}}, see analysis_basis()), which later crawls are compared against.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, result, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps({"result": result, "basis": basis}, ensure_ascii=False), time.time()),
+            )
+
+# Function: Analysis Basis
+def analysis_basis(sites, fingerprints):
+    """
+    Fingerprints of the crawled pages an analysis is built from:
+    {root: {url: fingerprint}} for crawled {root: [page, ...]} and current {root: SnapshotStore.fingerprints(root)}.
+    """
+    return {
+        root: {page["url"]: fingerprints[root][page["url"]] for page in pages if page["url"] in fingerprints.get(root, {})}
+        for root, pages in sites.items()
+    }
+
+# Function: Summarize Changes
+def summarize_changes(sites, fingerprints, basis=None):
+    """
+    Per-site change counts of the crawled {root: [page, ...]} against `basis`, the fingerprints
+    the previous analysis was built from (without one, every page is new), plus the materially
+    changed pages:
+    {"sites": {root: {state: count, "removed": n}}, "changed_pages": [...], "removed": {root: [url, ...]}, "material": bool}.
+    Changes accumulate across crawls until an analysis is stored again. Basis pages that are no
+    longer live snapshots (see SnapshotStore.update) count as removed.
+    """
+    basis = basis or {}
+    report = {"sites": {}, "changed_pages": [], "removed": {}, "material": False}
+    for root, pages in sites.items():
+        before, current = basis.get(root, {}), fingerprints.get(root, {})
+        counts = {NEW: 0, UNCHANGED: 0, MINOR: 0, CHANGED: 0}
+        for page in pages:
+            old, new = before.get(page["url"]), current.get(page["url"])
+            if old is None or new is None:
+                change = NEW
+            elif new["content_hash"] == old["content_hash"]:
+                change = UNCHANGED
+            else:
+                distance = hamming(int(new["simhash"], 16), int(old["simhash"], 16))
+                change = CHANGED if distance > MATERIAL_BITS or new["seo_hash"] != old["seo_hash"] else MINOR
+                if change == CHANGED:
+                    report["changed_pages"].append({"url": page["url"], "distance": distance, "diff": page.get("diff")})
+            counts[change] += 1
+        report["removed"][root] = sorted(url for url in before if url not in current)
+        counts["removed"] = len(report["removed"][root])
+        report["sites"][root] = counts
+        report["material"] |= bool(counts[NEW] or counts[CHANGED] or counts["removed"])
+    return report
+
+# Function: Format Changes
+def format_changes(report, max_pages=20):
+    """
+    Renders the change report as compact markdown for the analysis prompt.
+    """
+    lines = ["### Changes Since the Last Analysis"]
+    for root, counts in report["sites"].items():
+        lines.append(
+            f"- {root}: {counts[NEW]} new, {counts[CHANGED]} changed, {counts[MINOR]} minor edits, "
+            f"{counts[UNCHANGED]} unchanged, {counts['removed']} removed"
+        )
+    for page in report["changed_pages"][:max_pages]:
+        diff = page["diff"]
+        if diff is None:  # Changed before the last crawl: no line diff at hand
+            lines.append(f"- Changed: {page['url']}")
+            continue
+        lines.append(f"- Changed: {page['url']} (+{diff['added']} / -{diff['removed']} lines since the last crawl)")
+        lines += [f"  - Added: {line[:160]}" for line in diff["added_samples"]]
+        lines += [f"  - Removed: {line[:160]}" for line in diff["removed_samples"]]
+    for urls in report["removed"].values():
+        lines += [f"- Removed: {url}" for url in urls[:max_pages]]
+    return "\n".join(lines)
+
+_shared_store = None  # Process-wide snapshot store
+_shared_store_lock = threading.Lock()
+
+# Function: Shared Snapshot Store
+def get_snapshot_store():
+    """
+    Returns the process-wide crawl snapshot store.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = SnapshotStore()
+    return _shared_store
+
+# End of file: tools/snapshot_store.py
@@ -0,0 +1,180 @@
+###############################################
+# TF-IDF Similarity Engine
+# File: tools/tfidf_engine.py
+# Purpose: Sparse TF-IDF and cosine similarity across our site and N competitors
+###############################################
+
+# Import required libraries
+import numpy as np  # Vectorized math
+from scipy import sparse  # Sparse term matrices
+from sklearn.feature_extraction.text import CountVectorizer  # Tokenization and n-grams
+from sklearn.preprocessing import normalize  # L2 row normalization
+
+# Similarity buckets: (upper bound, label)
+SIMILARITY_BUCKETS = ((0.3, "Low"), (0.6, "Medium"), (1.01, "High"))
+
+# Function: Similarity Bucket
+def similarity_bucket(score):
+    """
+    Maps a cosine similarity score to Low, Medium or High.
+    """
+    for upper, label in SIMILARITY_BUCKETS:
+        if score < upper:
+            return label
+    return SIMILARITY_BUCKETS[-1][1]
+
+# Class: Keyword TF-IDF Engine
+class KeywordTfidfEngine:
+    """
+    Fits one vocabulary over our site plus N competitors:
+    1. Each site is one document (term counts summed over its keywords or page texts).
+    2. Only a changed site is re-tokenized on update; IDF and weights are
+       recomputed for all sites in one vectorized pass.
+    3. Cosine similarity for every site pair is a single sparse matrix multiply.
+    """
+
+    def __init__(self, ngram_range=(1, 2), sublinear_tf=True):
+        """
+        Configure n-gram range and sublinear term frequency scaling.
+        """
+        # Runs of Thai characters (incl. tone marks) or Unicode word tokens, English stopwords dropped
+        token_pattern = r"(?u)[\u0E00-\u0E7F]+|\b\w+\b"
+        self._analyzer = CountVectorizer(
+            ngram_range=ngram_range, token_pattern=token_pattern, stop_words="english"
+        ).build_analyzer()
+        self.sublinear_tf = sublinear_tf  # Use 1 + log(tf) instead of raw counts
+        self.vocabulary = {}  # term -> column index (grows, never reordered)
+        self.site_names = []  # Row order of the matrix
+        self._rows = {}  # site -> (column indices, counts)
+        self._matrix = None  # Cached L2-normalized TF-IDF matrix
+
+    def fit(self, sites):
+        """
+        Fits the engine on {site_name: [keyword or text, ...]}.
+        """
+        self.vocabulary, self.site_names, self._rows = {}, [], {}
+        for name, documents in sites.items():
+            self.update(name, documents)
+        return self
+
+    def update(self, name, documents):
+        """
+        Adds or replaces one site's corpus without re-tokenizing the others.
+        """
+        counts = {}
+        for document in documents:
+            for term in self._analyzer(document):
+                column = self.vocabulary.setdefault(term, len(self.vocabulary))
+                counts[column] = counts.get(column, 0) + 1
+
+        if name not in self._rows:
+            self.site_names.append(name)
+        self._rows[name] = (np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+                            np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        self._matrix = None  # Weights depend on every site's document frequencies
+        return self
+
+    def remove(self, name):
+        """
+        Drops a site from the comparison.
+        """
+        self._rows.pop(name)
+        self.site_names.remove(name)
+        self._matrix = None
+
+    @property
+    def feature_names(self):
+        """
+        Vocabulary terms ordered by column index.
+        """
+        names = np.empty(len(self.vocabulary), dtype=object)
+        for term, column in self.vocabulary.items():
+            names[column] = term
+        return names
+
+    @property
+    def matrix(self):
+        """
+        L2-normalized TF-IDF matrix (sites x terms), rebuilt lazily after updates.
+        """
+        if self._matrix is None:
+            self._matrix = self._build_matrix()
+        return self._matrix
+
+    def _build_matrix(self):
+        """
+        Assembles the count matrix and applies smoothed IDF weights.
+        """
+        rows = [self._rows[name] for name in self.site_names]
+        indptr = np.cumsum([0] + [len(columns) for columns, _ in rows])
+        indices = np.concatenate([columns for columns, _ in rows]) if rows else np.empty(0, dtype=np.int64)
+        data = np.concatenate([counts for _, counts in rows]) if rows else np.empty(0)
+        counts = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.vocabulary)))
+
+        if self.sublinear_tf:
+            counts.data = 1.0 + np.log(counts.data)
+
+        # Smoothed IDF as in scikit-learn: log((1 + n) / (1 + df)) + 1
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log((1 + counts.shape[0]) / (1 + document_frequency)) + 1.0
+        return normalize(counts @ sparse.diags(idf), norm="l2", copy=False).tocsr()
+
+    def similarity_matrix(self):
+        """
+        Returns the full pairwise cosine similarity matrix (sites x sites) as a dense array.
+        """
+        matrix = self.matrix
+        return (matrix @ matrix.T).toarray()
+
+    def compare(self, base, top_n=15):
+        """
+        Compares `base` with every other site in one vectorized pass:
+        - Cosine similarity and Low/Medium/High bucket per competitor.
+        - Terms the competitor weights higher (gaps) and lower (our strengths).
+        """
+        matrix = self.matrix
+        base_index = self.site_names.index(base)
+        competitors = [index for index in range(len(self.site_names)) if index != base_index]
+        if not competitors:
+            return {}
+
+        scores = (matrix[competitors] @ matrix[base_index].T).toarray().ravel()
+        deltas = (matrix[competitors] - matrix[[base_index] * len(competitors)]).toarray()
+        feature_names = self.feature_names
+
+        # Top positive and negative weight deltas per competitor row
+        order = np.argsort(deltas, axis=1)
+        report = {}
+        for row, index in enumerate(competitors):
+            gaps = [column for column in order[row, ::-1][:top_n] if deltas[row, column] > 0]
+            strengths = [column for column in order[row, :top_n] if deltas[row, column] < 0]
+            report[self.site_names[index]] = {
+                "similarity": round(float(scores[row]), 4),
+                "bucket": similarity_bucket(scores[row]),
+                "gaps": [(feature_names[column], round(float(deltas[row, column]), 4)) for column in gaps],
+                "strengths": [(feature_names[column], round(float(-deltas[row, column]), 4)) for column in strengths],
+            }
+        return report
+
+    def top_terms(self, name, top_n=5):
+        """
+        Returns the `top_n` highest-weighted terms for one site.
+        """
+        row = self.matrix[self.site_names.index(name)]
+        order = np.argsort(row.data)[::-1][:top_n]
+        feature_names = self.feature_names
+        return [(feature_names[row.indices[position]], round(float(row.data[position]), 4)) for position in order]
+
+# Function: Format Similarity Report
+def format_similarity_report(report):
+    """
+    Renders the output of KeywordTfidfEngine.compare as compact text for task prompts.
+    """
+    lines = []
+    for name, result in sorted(report.items(), key=lambda item: -item[1]["similarity"]):
+        lines.append(f"- {name}: cosine similarity {result['similarity']:.2f} ({result['bucket']})")
+        lines.append(f"  - Gaps (competitor weights higher): {', '.join(term for term, _ in result['gaps']) or 'none'}")
+        lines.append(f"  - Our strengths: {', '.join(term for term, _ in result['strengths']) or 'none'}")
+    return "\n".join(lines)
+
+# End of file: tools/tfidf_engine.py
@@ -0,0 +1,235 @@
+###############################################
+# Thai Tokenizer
+# File: tools/thai_tokenizer.py
+# Purpose: Batched, memoized Thai word segmentation with a warm engine and a process pool
+###############################################
+
+# Import required libraries
+import atexit  # Shut the worker pool down with the process
+import functools  # Stopword list loaded once
+import hashlib  # Memo keys
+import multiprocessing  # Spawn context for worker processes
+import os  # Engine and worker settings from the environment
+import re  # Thai/non-Thai runs
+import threading  # Guard the memo, engine and pool
+from collections import OrderedDict  # In-memory LRU memo
+from concurrent.futures import ProcessPoolExecutor  # Parallel segmentation of large corpora
+
+from utils.sqlite_cache import SQLiteCache  # Disk memo shared across runs
+from utils.telemetry import span  # Tokenization spans
+
+# Thai characters (U+0E00-U+0E7F) vs. everything else
+THAI_RUN = re.compile(r"[\u0E00-\u0E7F]+")
+SCRIPT_RUNS = re.compile(r"[\u0E00-\u0E7F]+|[^\u0E00-\u0E7F]+")
+
+# Speed/accuracy presets mapped to pythainlp engines (any pythainlp engine name also works):
+# newmm is dictionary maximal matching (fast), attacut and deepcut are neural (slower, better on unseen words)
+ENGINE_PRESETS = {"fast": "newmm", "safe": "newmm-safe", "accurate": "attacut", "best": "deepcut"}
+DEFAULT_ENGINE = "fast"
+
+# Memo sizes: Thai runs kept in memory, and entries kept on disk
+MEMORY_ENTRIES = 100000
+DISK_ENTRIES = 500000
+
+# Uncached Thai text (in characters) worth sending to the process pool instead of segmenting inline
+PARALLEL_MIN_CHARS = 20000
+CHUNKS_PER_WORKER = 4
+
+_worker_tokenizer = None  # Warm engine inside each pool worker
+
+# Function: Load Engine
+def load_engine(engine):
+    """
+    Builds a pythainlp Tokenizer for `engine` and runs it once, so dictionaries
+    and models are loaded before the first real call.
+    """
+    from pythainlp.tokenize import Tokenizer  # Thai word segmentation
+
+    tokenizer = Tokenizer(engine=engine, keep_whitespace=False)
+    tokenizer.word_tokenize("ภาษาไทย")
+    return tokenizer
+
+# Function: Init Worker
+def _init_worker(engine):
+    """
+    Pool initializer: loads the engine once per worker process.
+    """
+    global _worker_tokenizer
+    _worker_tokenizer = load_engine(engine)
+
+# Function: Segment Chunk
+def _segment_chunk(runs):
+    """
+    Pool task: segments a chunk of Thai runs with the worker's warm engine.
+    """
+    return [[word for word in _worker_tokenizer.word_tokenize(run) if word.strip()] for run in runs]
+
+# Function: Thai Stopwords
+@functools.lru_cache(maxsize=1)
+def thai_stopwords():
+    """
+    pythainlp's Thai stopword list (loaded on first use).
+    """
+    from pythainlp.corpus import thai_stopwords as load_stopwords  # Thai stopword corpus
+
+    return frozenset(load_stopwords())
+
+# Class: Thai Tokenizer
+class ThaiTokenizer:
+    """
+    Segments Thai text in batches:
+    1. Texts are split into Thai and non-Thai runs; only distinct Thai runs are segmented.
+    2. Runs are looked up in an in-memory LRU, then in a disk memo keyed on (engine, run) hashes.
+    3. Misses are segmented by a warm engine kept between calls: inline for small batches,
+       on a pool of worker processes (one warm engine each) for large scraped corpora.
+    """
+
+    def __init__(self, engine=DEFAULT_ENGINE, workers=None, disk=True):
+        """
+        Configure the engine (preset or pythainlp engine name), pool size and disk memo.
+        """
+        self.engine = ENGINE_PRESETS.get(engine, engine)  # pythainlp engine name
+        self.workers = workers or os.cpu_count() or 1  # Pool processes for large batches
+        self.disk = SQLiteCache(
+            "thai_tokens.sqlite3", table="thai_tokens", ttl=None, max_entries=DISK_ENTRIES
+        ) if disk else None
+        self._memory = OrderedDict()  # run -> words, most recently used last
+        self._tokenizer = None  # Warm in-process engine, loaded on first miss
+        self._pool = None  # Worker processes, started on the first large batch
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "segmented": 0, "parallel_batches": 0}
+
+    def key(self, run):
+        """
+        Disk memo key for one Thai run.
+        """
+        return hashlib.sha1(f"{self.engine}\0{run}".encode("utf-8")).hexdigest()
+
+    @property
+    def tokenizer(self):
+        """
+        Loads the in-process engine once.
+        """
+        with self._lock:
+            if self._tokenizer is None:
+                self._tokenizer = load_engine(self.engine)
+        return self._tokenizer
+
+    @property
+    def pool(self):
+        """
+        Starts the worker pool once (spawned processes, so no Streamlit threads are forked).
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=(self.engine,)
+                )
+                atexit.register(self._pool.shutdown, cancel_futures=True)
+        return self._pool
+
+    def segment_runs(self, runs):
+        """
+        Returns {run: [words]} for the distinct Thai runs in `runs`.
+        """
+        runs = list(dict.fromkeys(runs))
+        words = {}
+        with self._lock:
+            for run in runs:
+                if run in self._memory:
+                    self._memory.move_to_end(run)
+                    words[run] = self._memory[run]
+            self._counters["memory_hits"] += len(words)
+        missing = [run for run in runs if run not in words]
+        if not missing:
+            return words
+
+        with span("thai.tokenize", {"sem.thai.engine": self.engine, "sem.thai.runs": len(runs)}) as tokenize_span:
+            # Disk memo
+            from_disk = {}
+            if self.disk is not None:
+                keys = {self.key(run): run for run in missing}
+                from_disk = {keys[key]: value for key, value in self.disk.get_many(list(keys)).items()}
+                missing = [run for run in missing if run not in from_disk]
+
+            # Segment what's left: inline, or across the worker pool for large batches
+            segmented = {}
+            parallel = self.workers > 1 and sum(len(run) for run in missing) >= PARALLEL_MIN_CHARS
+            if parallel:
+                chunks = [missing[start::self.workers * CHUNKS_PER_WORKER] for start in range(self.workers * CHUNKS_PER_WORKER)]
+                for chunk, results in zip(chunks, self.pool.map(_segment_chunk, chunks)):
+                    segmented.update(zip(chunk, results))
+            elif missing:
+                tokenizer = self.tokenizer
+                segmented = {run: [word for word in tokenizer.word_tokenize(run) if word.strip()] for run in missing}
+            if segmented and self.disk is not None:
+                self.disk.set_many({self.key(run): value for run, value in segmented.items()})
+
+            tokenize_span.set_attribute("sem.thai.memory_hits", len(words))
+            tokenize_span.set_attribute("sem.thai.disk_hits", len(from_disk))
+            tokenize_span.set_attribute("sem.thai.segmented", len(segmented))
+            tokenize_span.set_attribute("sem.thai.parallel", parallel)
+
+        with self._lock:
+            self._counters["disk_hits"] += len(from_disk)
+            self._counters["segmented"] += len(segmented)
+            self._counters["parallel_batches"] += parallel
+            for run, value in {**from_disk, **segmented}.items():
+                self._memory[run] = value
+                words[run] = value
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+        return words
+
+    def tokenize_batch(self, texts):
+        """
+        Returns the tokens of each text: Thai runs as segmented words, other text split on whitespace.
+        """
+        parts = [SCRIPT_RUNS.findall(text) for text in texts]
+        words = self.segment_runs(part for runs in parts for part in runs if THAI_RUN.fullmatch(part))
+        return [
+            [token for part in runs for token in (words[part] if part in words else part.split())]
+            for runs in parts
+        ]
+
+    def tokenize(self, text):
+        """
+        Tokens of one text (see tokenize_batch).
+        """
+        return self.tokenize_batch([text])[0]
+
+    def segment_batch(self, texts):
+        """
+        Returns each text with its Thai runs split into space-separated words
+        ("รองเท้าวิ่ง nike" -> "รองเท้า วิ่ง nike"), for regex- or whitespace-based tokenizers.
+        """
+        return [" ".join(tokens) for tokens in self.tokenize_batch(texts)]
+
+    def stats(self):
+        """
+        Memo and segmentation counters for this process.
+        """
+        with self._lock:
+            return {"engine": self.engine, "memory_entries": len(self._memory), **self._counters}
+
+_shared_tokenizer = None  # Process-wide tokenizer, so the engine and memo stay warm
+_shared_tokenizer_lock = threading.Lock()
+
+# Function: Shared Thai Tokenizer
+def get_thai_tokenizer():
+    """
+    Returns the process-wide Thai tokenizer
+    (engine from SEM_PLANNER_THAI_ENGINE, pool size from SEM_PLANNER_THAI_WORKERS, default: all cores).
+    """
+    global _shared_tokenizer
+    with _shared_tokenizer_lock:
+        if _shared_tokenizer is None:
+            workers = os.environ.get("SEM_PLANNER_THAI_WORKERS")
+            _shared_tokenizer = ThaiTokenizer(
+                engine=os.environ.get("SEM_PLANNER_THAI_ENGINE", DEFAULT_ENGINE),
+                workers=int(workers) if workers else None,
+            )
+    return _shared_tokenizer
+
+# End of file: tools/thai_tokenizer.py
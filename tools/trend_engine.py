@@ -0,0 +1,166 @@
+###############################################
+# Trend Engine
+# File: tools/trend_engine.py
+# Purpose: Vectorized growth, seasonality and anomaly analysis over many keyword time series at once
+###############################################
+
+# Import required libraries
+import warnings  # Empty-slice warnings of the NaN-aware reductions
+import numpy as np  # Vectorized math
+import pandas as pd  # Time series reshaping
+
+# Month names for peak-month reporting
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# |z-score| of the seasonally adjusted residual above which a month counts as an anomaly
+ANOMALY_Z = 3.0
+
+# Keywords below this average monthly volume are left out of growth rankings (too noisy)
+MIN_RANKED_VOLUME = 50
+
+# Function: Volume Matrix
+def volume_matrix(frame):
+    """
+    Pivots long rows (keyword, month, search_volume) into a keywords x months matrix
+    over a gap-free monthly range; missing months are NaN.
+    """
+    months = pd.to_datetime(frame["month"]).dt.to_period("M")
+    pivot = frame.assign(month=months).pivot_table(
+        index="keyword", columns="month", values="search_volume", aggfunc="sum"
+    )
+    full_range = pd.period_range(months.min(), months.max(), freq="M")
+    pivot = pivot.reindex(columns=full_range)
+    return pivot.index.to_numpy(), full_range, pivot.to_numpy(dtype=float)
+
+# Function: Analyze Trends
+def analyze_trends(keywords, months, volumes):
+    """
+    Computes per-keyword trend statistics for the whole matrix in one pass:
+    - growth_3m: last 3 months vs. the 3 before; yoy: last 12 months vs. the 12 before
+      (or last month vs. the same month a year earlier when less history is available).
+    - monthly_trend: fitted month-over-month growth of the log-linear trend.
+    - seasonal index per calendar month (volume / trend, averaged), peak month and seasonality strength.
+    - latest_z / anomaly: how far the latest month is from the trend x season expectation.
+    Returns (DataFrame with one row per keyword, seasonal index matrix keywords x 12).
+    """
+    V = np.asarray(volumes, dtype=float)
+    k, m = V.shape
+    observed = ~np.isnan(V)
+    # Keywords with no data in a window give NaN by design; numpy warns about those as well
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        avg = np.nanmean(V, axis=1)
+
+        # Short-term growth and year-over-year change
+        last3 = np.nanmean(V[:, -3:], axis=1)
+        prev3 = np.nanmean(V[:, -6:-3], axis=1) if m >= 6 else np.full(k, np.nan)
+        growth_3m = np.where(prev3 > 0, last3 / prev3 - 1, np.nan)
+        if m >= 24:
+            current, previous = np.nansum(V[:, -12:], axis=1), np.nansum(V[:, -24:-12], axis=1)
+        elif m >= 13:
+            current, previous = V[:, -1], V[:, -13]
+        else:
+            current, previous = np.full(k, np.nan), np.full(k, np.nan)
+        yoy = np.where(previous > 0, current / previous - 1, np.nan)
+
+        # Log-linear trend fitted per row with NaN-aware least squares
+        log_v = np.where(observed, np.log1p(np.nan_to_num(V)), 0.0)
+        t = np.broadcast_to(np.arange(m, dtype=float), (k, m))
+        n = observed.sum(axis=1)
+        t_mean = np.where(observed, t, 0).sum(axis=1) / n
+        y_mean = log_v.sum(axis=1) / n
+        dt = np.where(observed, t - t_mean[:, None], 0)
+        slope = (dt * (log_v - y_mean[:, None])).sum(axis=1) / (dt ** 2).sum(axis=1)
+        slope = np.nan_to_num(slope)
+        fitted = np.expm1(y_mean[:, None] + slope[:, None] * (t - t_mean[:, None]))
+        monthly_trend = np.expm1(slope)
+
+        # Seasonal index: volume relative to trend, averaged per calendar month (one matrix product)
+        ratio = np.where(observed & (fitted > 0), V / fitted, np.nan)
+        calendar = np.zeros((m, 12))
+        calendar[np.arange(m), months.month.to_numpy() - 1] = 1.0
+        ratio_observed = ~np.isnan(ratio)
+        seasonal = (np.nan_to_num(ratio) @ calendar) / (ratio_observed @ calendar)
+        seasonal = seasonal / np.nanmean(seasonal, axis=1, keepdims=True)
+        peak = np.where(np.isnan(seasonal).all(axis=1), -1, np.nanargmax(np.nan_to_num(seasonal, nan=-np.inf), axis=1))
+        strength = np.nanmax(seasonal, axis=1) - np.nanmin(seasonal, axis=1)
+
+        # Anomalies: residual against trend x season, scaled by each keyword's own robust spread (MAD),
+        # so a single spike doesn't inflate the yardstick it is measured with
+        expected = fitted * seasonal[:, months.month.to_numpy() - 1]
+        residual = np.where(observed & (expected > 0), V / expected - 1, np.nan)
+        center = np.nanmedian(residual, axis=1, keepdims=True)
+        spread = 1.4826 * np.nanmedian(np.abs(residual - center), axis=1)
+        residual = residual - center
+        latest_z = np.where(spread > 0, residual[:, -1] / spread, 0.0)
+        anomaly_count = (np.abs(residual / spread[:, None]) > ANOMALY_Z).sum(axis=1)
+
+    report = pd.DataFrame({
+        "keyword": keywords,
+        "avg_volume": avg,
+        "latest_volume": V[:, -1],
+        "growth_3m": growth_3m,
+        "yoy": yoy,
+        "monthly_trend": monthly_trend,
+        "peak_month": [MONTH_NAMES[i] if i >= 0 else "" for i in peak],
+        "seasonality": strength,
+        "latest_z": np.nan_to_num(latest_z),
+        "anomaly": np.abs(np.nan_to_num(latest_z)) > ANOMALY_Z,
+        "anomaly_months": anomaly_count,
+    })
+    return report, seasonal
+
+# Function: Analyze Frame
+def analyze_frame(frame):
+    """
+    Runs the engine on long keyword rows and adds the account-level seasonal profile.
+    Returns (per-keyword report, account seasonal index of length 12, months analyzed).
+    """
+    keywords, months, volumes = volume_matrix(frame)
+    report, _ = analyze_trends(keywords, months, volumes)
+    _, account_seasonal = analyze_trends(np.array(["(all keywords)"]), months, np.nansum(volumes, axis=0, keepdims=True))
+    return report, account_seasonal[0], months
+
+# Function: Format Trend Summary
+def format_trend_summary(report, account_seasonal, months, top_n=10):
+    """
+    Compact ranked summary for the prompt: account seasonality, fastest growing and declining
+    keywords, most seasonal keywords and current anomalies.
+    """
+    def pct(value):
+        return "n/a" if pd.isna(value) else f"{value:+.0%}"
+
+    ranked = report[report["avg_volume"] >= MIN_RANKED_VOLUME]
+    by_yoy = ranked.dropna(subset=["yoy"]).sort_values(["yoy", "keyword"], ascending=[False, True])
+    lines = [
+        f"Analyzed {len(report)} keywords over {len(months)} months ({months[0]} to {months[-1]}).",
+        "",
+        "Account seasonality (index, 1.00 = average month): " + ", ".join(
+            f"{name} {value:.2f}" for name, value in zip(MONTH_NAMES, account_seasonal) if not pd.isna(value)
+        ),
+        "",
+        "Fastest growing (YoY | last 3 months | avg volume):",
+    ]
+    lines += [
+        f"- {row.keyword}: {pct(row.yoy)} | {pct(row.growth_3m)} | {row.avg_volume:,.0f}"
+        for row in by_yoy[by_yoy["yoy"] > 0].head(top_n).itertuples()
+    ]
+    lines += ["", "Declining (YoY | last 3 months | avg volume):"]
+    lines += [
+        f"- {row.keyword}: {pct(row.yoy)} | {pct(row.growth_3m)} | {row.avg_volume:,.0f}"
+        for row in by_yoy[by_yoy["yoy"] < 0].tail(top_n).iloc[::-1].itertuples()
+    ]
+    lines += ["", "Most seasonal (peak month | peak-to-trough index spread):"]
+    lines += [
+        f"- {row.keyword}: {row.peak_month} | {row.seasonality:.2f}"
+        for row in ranked.sort_values(["seasonality", "keyword"], ascending=[False, True]).head(top_n).itertuples()
+    ]
+    anomalies = report[report["anomaly"]].sort_values("latest_z", key=np.abs, ascending=False)
+    lines += ["", f"Latest-month anomalies (|z| > {ANOMALY_Z:.0f}): {len(anomalies)}"]
+    lines += [
+        f"- {row.keyword}: {'spike' if row.latest_z > 0 else 'drop'} (z = {row.latest_z:+.1f}, volume {row.latest_volume:,.0f})"
+        for row in anomalies.head(top_n).itertuples()
+    ]
+    return "\n".join(lines)
+
+# End of file: tools/trend_engine.py
@@ -0,0 +1,557 @@
+###############################################
+# Agent Memory
+# File: utils/agent_memory.py
+# Purpose: Bounded, per-tenant CrewAI agent memory with local embeddings and one shared SQLite vector store
+###############################################
+
+# Import required libraries
+# CrewAI is imported inside the functions that build memories and records, so pages that
+# only set the tenant of a run don't load it.
+import asyncio  # Async variants of the storage calls
+import contextvars  # Tenant of the run executing in the current context
+import functools  # Memory class built once
+import hashlib  # Tenant namespace suffixes
+import json  # Serialize categories and metadata
+import re  # Tenant name slugs
+import sqlite3  # On-disk storage (pysqlite3 when the compatibility fix is applied)
+import threading  # Serialize access from concurrent sessions and stage threads
+import time  # Access times for age and LRU eviction
+from collections import Counter, OrderedDict  # Category counts, warm tenant memories
+from contextlib import contextmanager  # Tenant scope of a run
+from datetime import datetime, timezone  # CrewAI records carry naive UTC datetimes
+from urllib.parse import urlparse  # Tenant from a website URL
+
+import numpy as np  # Vector search
+
+from utils.paths import cache_path  # Location of local cache files
+
+# Records kept per tenant (least recently used beyond this are evicted) and how long
+# a record may go unused before it is dropped, for every tenant (seconds)
+MAX_RECORDS = 2000
+MAX_AGE = 90 * 24 * 3600
+
+# Records one memory lookup returns at most, whatever the agent asks for
+RECALL_TOP_K = 5
+
+# Tenant memories (and their in-RAM vector matrices) kept loaded in this process
+CACHED_TENANTS = 16
+
+# LLM role that extracts memories
+MEMORY_ROLE = "Agent Memory"
+
+# Record columns, in the order _record() reads them
+RECORD_COLUMNS = "id, scope, content, categories, metadata, importance, created_at, last_accessed, source, private"
+
+# Tenant of the run executing in the current context (set by memory_tenant(), None outside it)
+_current_tenant = contextvars.ContextVar("sem_memory_tenant", default=None)
+
+# Function: Tenant Name
+def tenant_name(name):
+    """
+    Namespace of a client name or website URL: a readable slug plus a hash, so distinct
+    clients never share one ("Siam Running Co." -> "siam-running-co-<hash>"). None without a name.
+    """
+    name = (name or "").strip()
+    if "://" in name:
+        name = (urlparse(name).hostname or name).removeprefix("www.")
+    if not name:
+        return None
+    slug = re.sub(r"[^a-z0-9]+", "-", name.casefold()).strip("-")[:40]
+    digest = hashlib.sha1(name.casefold().encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}" if slug else digest
+
+# Function: Current Tenant
+def current_tenant():
+    """
+    Returns the memory namespace of the code running in the current context, or None.
+    """
+    return _current_tenant.get()
+
+# Function: Memory Tenant
+@contextmanager
+def memory_tenant(name):
+    """
+    Runs the enclosed code (and the stage threads it starts) with the memory of client `name`.
+    Without a client name or website the code runs without memory.
+    """
+    token = _current_tenant.set(tenant_name(name))
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+# Function: Epoch
+def _epoch(moment):
+    """
+    Seconds since the epoch of a (naive UTC) datetime.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+# Function: UTC
+def _utc(seconds):
+    """
+    Naive UTC datetime of an epoch timestamp, as CrewAI records expect.
+    """
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+# Function: In Scope
+def _in_scope(scope, prefix):
+    """
+    True when `scope` is `prefix` or lies below it ("/a" covers "/a/b", not "/ab").
+    """
+    prefix = (prefix or "").rstrip("/")
+    return not prefix or scope == prefix or scope.startswith(prefix + "/")
+
+# Function: Child Scope
+def _child_scope(scope, parent):
+    """
+    The immediate child of `parent` that `scope` lies in, or None.
+    """
+    base = (parent or "").rstrip("/")
+    if not scope.startswith(base + "/"):
+        return None
+    first = scope[len(base) + 1:].split("/", 1)[0]
+    return f"{base}/{first}" if first else None
+
+# Function: Matches
+def _matches(record, categories=None, metadata_filter=None):
+    """
+    True when the record has one of `categories` and every `metadata_filter` value.
+    """
+    if categories and not any(category in record.categories for category in categories):
+        return False
+    return not metadata_filter or all(record.metadata.get(key) == value for key, value in metadata_filter.items())
+
+# Class: Local Embedder
+class LocalEmbedder:
+    """
+    CrewAI embedder callable backed by the shared sentence-transformers service, so memories
+    are embedded on this machine (they are not added to the keyword embedding cache).
+    """
+
+    def __call__(self, texts):
+        """
+        L2-normalized embeddings of `texts`, as lists (CrewAI tests the result for truthiness).
+        """
+        from tools.embedding_service import get_embedding_service  # Shared local model
+
+        return get_embedding_service().encode(list(texts), cache=False).tolist()
+
+# Class: Agent Memory Store
+class AgentMemoryStore:
+    """
+    One SQLite vector store for the memories of every tenant:
+    1. Each record belongs to a tenant; tenant views only ever read and write their own rows.
+    2. Records unused for `max_age` seconds are dropped, and each tenant keeps at most
+       `max_records` (least recently used evicted), so disk use stays flat.
+    3. Freed pages are returned to the file system (incremental vacuum) after evictions.
+    """
+
+    def __init__(self, filename="agent_memory.sqlite3", max_records=MAX_RECORDS, max_age=MAX_AGE):
+        """
+        Open (or create) the memory database.
+        """
+        self.path = cache_path(filename)  # Database file inside the cache directory
+        self.max_records = max_records  # Records kept per tenant
+        self.max_age = max_age  # Seconds a record may go unused
+        self.writes = 0  # Write counter, so tenant views know when to reload their vectors
+        self._lock = threading.Lock()
+
+        # Autocommit connection shared by all threads (guarded by the lock)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # Takes effect for a new database
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memories ("
+            "id TEXT PRIMARY KEY, tenant TEXT NOT NULL, scope TEXT NOT NULL, content TEXT NOT NULL, "
+            "categories TEXT NOT NULL, metadata TEXT NOT NULL, importance REAL NOT NULL, created_at REAL NOT NULL, "
+            "last_accessed REAL NOT NULL, source TEXT, private INTEGER NOT NULL, embedding BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memories_tenant ON memories (tenant, last_accessed)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memories_age ON memories (last_accessed)")
+
+    def read(self, sql, params=()):
+        """
+        Runs a query and returns all rows.
+        """
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def version(self):
+        """
+        Changes whenever any connection (this process or another) wrote to the database.
+        """
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0], self.writes
+
+    def write(self, tenant, statements, evict=False):
+        """
+        Runs [(sql, params), ...] in one transaction (a list of param tuples runs executemany)
+        and returns the number of changed rows. With `evict`, applies the age and size limits.
+        """
+        changed = 0
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        changed += self._conn.executemany(sql, params).rowcount
+                    else:
+                        changed += self._conn.execute(sql, params).rowcount
+                evicted = self._evict(tenant) if evict else 0
+            if evicted:
+                self._conn.execute("PRAGMA incremental_vacuum").fetchall()  # Runs to completion only when stepped through
+            self.writes += 1
+        return changed
+
+    def _evict(self, tenant):
+        """
+        Drops records past the age limit (every tenant) and the tenant's least recently used
+        records beyond `max_records`. Caller must hold the lock.
+        """
+        evicted = self._conn.execute(
+            "DELETE FROM memories WHERE last_accessed < ?", (time.time() - self.max_age,)
+        ).rowcount
+        evicted += self._conn.execute(
+            "DELETE FROM memories WHERE id IN (SELECT id FROM memories WHERE tenant = ? "
+            "ORDER BY last_accessed DESC LIMIT -1 OFFSET ?)",
+            (tenant, self.max_records),
+        ).rowcount
+        return evicted
+
+    def stats(self):
+        """
+        Returns {tenant: {"records", "bytes", "last_used"}} for the stored memories.
+        """
+        rows = self.read(
+            "SELECT tenant, COUNT(*), SUM(LENGTH(content) + LENGTH(embedding)), MAX(last_accessed) "
+            "FROM memories GROUP BY tenant"
+        )
+        return {
+            tenant: {"records": count, "bytes": size, "last_used": _utc(last_used).isoformat(timespec="seconds")}
+            for tenant, count, size, last_used in rows
+        }
+
+# Class: Tenant Memory Storage
+class TenantMemoryStorage:
+    """
+    CrewAI memory storage backend over one tenant's rows of the shared store:
+    - Vector search is a matrix product over the tenant's vectors, kept in RAM until the next write.
+    - A search returns at most `top_k` records, whatever limit the caller passes.
+    - Saves apply the store's age and size limits.
+    """
+
+    def __init__(self, store, tenant, top_k=RECALL_TOP_K):
+        """
+        Bind the view to `tenant` and cap search results at `top_k`.
+        """
+        self.store = store  # Shared AgentMemoryStore
+        self.tenant = tenant  # Namespace of this view
+        self.top_k = top_k  # Results per search
+        self._matrix = None  # (version, dim, ids, scopes, vectors) of the last vector load
+        self._matrix_lock = threading.Lock()
+
+    def _where(self, scope_prefix=None):
+        """
+        SQL condition and params selecting the tenant's records in `scope_prefix`.
+        """
+        prefix = (scope_prefix or "").rstrip("/")
+        if not prefix:
+            return "tenant = ?", [self.tenant]
+        return "tenant = ? AND (scope = ? OR substr(scope, 1, ?) = ?)", [self.tenant, prefix, len(prefix) + 1, prefix + "/"]
+
+    def _record(self, row):
+        """
+        MemoryRecord from a row of RECORD_COLUMNS.
+        """
+        from crewai.memory.types import MemoryRecord  # CrewAI memory record
+
+        record_id, scope, content, categories, metadata, importance, created_at, last_accessed, source, private = row
+        return MemoryRecord(
+            id=record_id, scope=scope, content=content, categories=json.loads(categories),
+            metadata=json.loads(metadata), importance=importance, created_at=_utc(created_at),
+            last_accessed=_utc(last_accessed), source=source, private=bool(private),
+        )
+
+    def _rows(self, records):
+        """
+        Upsert params for records; a record without an embedding keeps its stored vector.
+        """
+        rows = []
+        for record in records:
+            vector = None
+            if record.embedding:
+                vector = np.asarray(record.embedding, dtype=np.float32)
+                vector = (vector / (np.linalg.norm(vector) or 1.0)).tobytes()
+            rows.append((
+                record.id, self.tenant, record.scope, record.content, json.dumps(record.categories, ensure_ascii=False),
+                json.dumps(record.metadata, ensure_ascii=False, default=str), record.importance,
+                _epoch(record.created_at), _epoch(record.last_accessed), record.source, int(record.private),
+                vector, record.id, self.tenant,
+            ))
+        return rows
+
+    def _upsert(self, records):
+        """
+        Inserts or replaces records and applies the store's limits.
+        """
+        self.store.write(self.tenant, [(
+            "INSERT OR REPLACE INTO memories (id, tenant, scope, content, categories, metadata, importance, "
+            "created_at, last_accessed, source, private, embedding) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, "
+            "COALESCE(?, (SELECT embedding FROM memories WHERE id = ? AND tenant = ?), X''))",
+            self._rows(records),
+        )], evict=True)
+
+    def _vectors(self, dim):
+        """
+        The tenant's ids, scopes and normalized vectors of size `dim`, reloaded only after writes.
+        """
+        version = self.store.version()
+        with self._matrix_lock:
+            if self._matrix is None or self._matrix[:2] != (version, dim):
+                rows = self.store.read(
+                    "SELECT id, scope, embedding FROM memories WHERE tenant = ? AND LENGTH(embedding) = ?",
+                    (self.tenant, dim * 4),
+                )
+                vectors = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.float32).reshape(len(rows), dim)
+                self._matrix = (version, dim, [row[0] for row in rows], [row[1] for row in rows], vectors)
+            return self._matrix[2:]
+
+    def save(self, records):
+        """
+        Stores new memory records.
+        """
+        if records:
+            self._upsert(records)
+
+    def update(self, record):
+        """
+        Replaces a stored record.
+        """
+        self._upsert([record])
+
+    def search(self, query_embedding, scope_prefix=None, categories=None, metadata_filter=None, limit=10, min_score=0.0):
+        """
+        Returns up to min(limit, top_k) (record, cosine similarity) pairs, most similar first.
+        """
+        limit = min(limit, self.top_k)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if limit <= 0 or not query.size:
+            return []
+        ids, scopes, vectors = self._vectors(len(query))
+        if not ids:
+            return []
+
+        scores = vectors @ (query / (np.linalg.norm(query) or 1.0))
+        if (scope_prefix or "").strip("/"):
+            outside = np.fromiter((not _in_scope(scope, scope_prefix) for scope in scopes), bool, len(scopes))
+            scores[outside] = -np.inf
+        order = np.argsort(-scores, kind="stable")
+        order = order[scores[order] >= max(min_score, 0.0)]
+
+        # Load candidates in small batches until enough pass the category/metadata filters
+        results = []
+        for start in range(0, len(order), limit * 4):
+            batch = [ids[i] for i in order[start:start + limit * 4]]
+            placeholders = ", ".join("?" * len(batch))
+            found = {
+                row[0]: row for row in self.store.read(
+                    f"SELECT {RECORD_COLUMNS} FROM memories WHERE tenant = ? AND id IN ({placeholders})",
+                    [self.tenant, *batch],
+                )
+            }
+            for i in order[start:start + limit * 4]:
+                if ids[i] not in found:
+                    continue
+                record = self._record(found[ids[i]])
+                if _matches(record, categories, metadata_filter):
+                    results.append((record, float(scores[i])))
+                    if len(results) == limit:
+                        return results
+        return results
+
+    def delete(self, scope_prefix=None, categories=None, record_ids=None, older_than=None, metadata_filter=None):
+        """
+        Deletes the tenant's records matching every given criterion and returns how many.
+        """
+        where, params = self._where(scope_prefix)
+        if record_ids:
+            where += f" AND id IN ({', '.join('?' * len(record_ids))})"
+            params += list(record_ids)
+        if older_than is not None:
+            where += " AND created_at < ?"
+            params.append(_epoch(older_than))
+        if categories or metadata_filter:
+            rows = self.store.read(f"SELECT {RECORD_COLUMNS} FROM memories WHERE {where}", params)
+            doomed = [(row[0], self.tenant) for row in rows if _matches(self._record(row), categories, metadata_filter)]
+            return self.store.write(self.tenant, [("DELETE FROM memories WHERE id = ? AND tenant = ?", doomed)])
+        return self.store.write(self.tenant, [(f"DELETE FROM memories WHERE {where}", tuple(params))])
+
+    def get_record(self, record_id):
+        """
+        Returns the tenant's record with `record_id`, or None.
+        """
+        rows = self.store.read(
+            f"SELECT {RECORD_COLUMNS} FROM memories WHERE tenant = ? AND id = ?", (self.tenant, record_id)
+        )
+        return self._record(rows[0]) if rows else None
+
+    def list_records(self, scope_prefix=None, limit=200, offset=0):
+        """
+        Records in a scope, newest first.
+        """
+        where, params = self._where(scope_prefix)
+        rows = self.store.read(
+            f"SELECT {RECORD_COLUMNS} FROM memories WHERE {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            [*params, limit, offset],
+        )
+        return [self._record(row) for row in rows]
+
+    def get_scope_info(self, scope):
+        """
+        Record count, categories, date range and child scopes of a scope.
+        """
+        from crewai.memory.types import ScopeInfo  # CrewAI scope summary
+
+        path = scope.rstrip("/") or "/"
+        where, params = self._where(path)
+        rows = self.store.read(f"SELECT scope, categories, created_at FROM memories WHERE {where}", params)
+        return ScopeInfo(
+            path=path,
+            record_count=len(rows),
+            categories=sorted({category for _, categories, _ in rows for category in json.loads(categories)}),
+            oldest_record=_utc(min(row[2] for row in rows)) if rows else None,
+            newest_record=_utc(max(row[2] for row in rows)) if rows else None,
+            child_scopes=sorted({child for child in (_child_scope(row[0], path) for row in rows) if child}),
+        )
+
+    def list_scopes(self, parent="/"):
+        """
+        Immediate child scopes under `parent`.
+        """
+        where, params = self._where(parent)
+        rows = self.store.read(f"SELECT DISTINCT scope FROM memories WHERE {where}", params)
+        return sorted({child for child in (_child_scope(row[0], parent) for row in rows) if child})
+
+    def list_categories(self, scope_prefix=None):
+        """
+        {category: record count} within a scope.
+        """
+        where, params = self._where(scope_prefix)
+        rows = self.store.read(f"SELECT categories FROM memories WHERE {where}", params)
+        return dict(Counter(category for (categories,) in rows for category in json.loads(categories)))
+
+    def count(self, scope_prefix=None):
+        """
+        Number of the tenant's records in a scope (and its subscopes).
+        """
+        where, params = self._where(scope_prefix)
+        return self.store.read(f"SELECT COUNT(*) FROM memories WHERE {where}", params)[0][0]
+
+    def reset(self, scope_prefix=None):
+        """
+        Deletes all of the tenant's records in a scope.
+        """
+        where, params = self._where(scope_prefix)
+        self.store.write(self.tenant, [(f"DELETE FROM memories WHERE {where}", tuple(params))])
+
+    def touch_records(self, record_ids):
+        """
+        Marks recalled records as used now (they are evicted last).
+        """
+        if record_ids:
+            now = time.time()
+            self.store.write(self.tenant, [(
+                "UPDATE memories SET last_accessed = ? WHERE id = ? AND tenant = ?",
+                [(now, record_id, self.tenant) for record_id in record_ids],
+            )])
+
+    async def asave(self, records):
+        """
+        Async save().
+        """
+        await asyncio.to_thread(self.save, records)
+
+    async def asearch(self, query_embedding, scope_prefix=None, categories=None, metadata_filter=None, limit=10, min_score=0.0):
+        """
+        Async search().
+        """
+        return await asyncio.to_thread(
+            self.search, query_embedding, scope_prefix, categories, metadata_filter, limit, min_score
+        )
+
+    async def adelete(self, scope_prefix=None, categories=None, record_ids=None, older_than=None, metadata_filter=None):
+        """
+        Async delete().
+        """
+        return await asyncio.to_thread(self.delete, scope_prefix, categories, record_ids, older_than, metadata_filter)
+
+# Function: Memory Class
+@functools.lru_cache(maxsize=1)
+def memory_class():
+    """
+    CrewAI Memory whose lookups are one local embedding and one vector search capped at
+    RECALL_TOP_K ("deep" recall would add LLM query analysis and flow overhead to every task).
+    Built on first use, so CrewAI is only imported by runs that need it.
+    """
+    from crewai.memory.unified_memory import Memory  # CrewAI unified memory
+
+    class AgentMemory(Memory):
+        def recall(self, query, scope=None, categories=None, limit=10, depth="shallow", source=None,
+                   include_private=False):
+            """
+            Shallow recall of at most RECALL_TOP_K records, whatever `limit` and `depth` ask for.
+            """
+            return super().recall(
+                query, scope=scope, categories=categories, limit=min(limit, RECALL_TOP_K), depth="shallow",
+                source=source, include_private=include_private,
+            )
+
+    return AgentMemory
+
+_shared_store = None  # Process-wide memory store, shared by every tenant
+_shared_store_lock = threading.Lock()
+_memories = OrderedDict()  # tenant -> CrewAI Memory, least recently used first
+_memories_lock = threading.Lock()
+
+# Function: Shared Agent Memory Store
+def get_memory_store():
+    """
+    Returns the process-wide agent memory store.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = AgentMemoryStore()
+    return _shared_store
+
+# Function: Agent Memory
+def get_agent_memory(tenant=None):
+    """
+    Returns the CrewAI memory shared by all agents of `tenant` (default: the current run's):
+    local embeddings, the bounded shared store, lookups capped at RECALL_TOP_K without LLM calls.
+    Returns None (no memory) when no tenant is bound, so unnamed runs never share one.
+    """
+    from utils.registry import get_llm  # Extracts memories from finished tasks
+
+    tenant = tenant or current_tenant()
+    if tenant is None:
+        return None
+    llm = get_llm(role=MEMORY_ROLE)
+    with _memories_lock:
+        memory = _memories.get(tenant)
+        if memory is None:
+            memory = _memories[tenant] = memory_class()(
+                llm=llm,
+                storage=TenantMemoryStorage(get_memory_store(), tenant),
+                embedder=LocalEmbedder(),
+                root_scope=f"/tenant/{tenant}",
+            )
+        _memories.move_to_end(tenant)
+        while len(_memories) > CACHED_TENANTS:
+            _memories.popitem(last=False)
+    return memory
+
+# End of file: utils/agent_memory.py
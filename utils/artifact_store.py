@@ -0,0 +1,151 @@
+###############################################
+# Artifact Store
+# File: utils/artifact_store.py
+# Purpose: Versioned stage outputs keyed on their inputs, upstream artifacts and code/prompt versions
+###############################################
+
+# Import required libraries
+import hashlib  # Source file versions
+import json  # Serialize stage results
+import os  # Source file paths
+import sqlite3  # On-disk storage (pysqlite3 when the compatibility fix is applied)
+import threading  # Serialize access from concurrent sessions and stage threads
+import time  # Timestamps for age checks and LRU eviction
+
+from utils.paths import cache_path  # Location of local cache files
+from utils.sqlite_cache import make_key  # Stable content hashes
+
+# Repository root, against which stage source files are resolved
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Returned by get() when no usable artifact exists (a stored result may itself be None)
+MISSING = object()
+
+# Function: Source Version
+def source_version(*paths):
+    """
+    Hash of the given source files (relative to the repository root), so editing a
+    stage's code or prompts gives its artifacts a new version. Missing files hash as empty.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode("utf-8") + b"\0")
+        full_path = os.path.join(ROOT, path)
+        if os.path.exists(full_path):
+            with open(full_path, "rb") as handle:
+                digest.update(handle.read())
+    return digest.hexdigest()[:16]
+
+# Function: Artifact Key
+def artifact_key(stage, version, inputs, upstream_keys):
+    """
+    Key of a stage artifact: the stage, its code/prompt version, the inputs it reads
+    and the keys of the artifacts it was built from (so a change propagates downstream only).
+    """
+    return make_key(stage, version, inputs, upstream_keys)
+
+# Class: Artifact Store
+class ArtifactStore:
+    """
+    Stage results on disk in SQLite, make-style:
+    1. Each result is stored under its artifact key, with the stage name, a hash of the stage's
+       own inputs and its version, so stored artifacts can be listed per stage.
+    2. A lookup is a hit only while the artifact is younger than the stage's max age.
+    3. Least recently used artifacts are evicted beyond `max_bytes`.
+    """
+
+    def __init__(self, filename="artifacts.sqlite3", max_bytes=500 * 1024 * 1024):
+        """
+        Open (or create) the artifact database.
+        """
+        self.path = cache_path(filename)  # Database file inside the cache directory
+        self.max_bytes = max_bytes  # Upper bound on stored payload size
+        self._lock = threading.Lock()
+
+        # Autocommit connection shared by all threads (guarded by the lock)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "key TEXT PRIMARY KEY, stage TEXT NOT NULL, inputs_key TEXT NOT NULL, version TEXT NOT NULL, "
+            "result TEXT NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_stage ON artifacts (stage, created_at)")
+
+    def get(self, key, max_age=None, default=MISSING):
+        """
+        Returns the stored result for `key`, or `default` when it is missing or older than `max_age` seconds.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT result, created_at FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None or (max_age is not None and now - row[1] > max_age):
+                return default
+            self._conn.execute("UPDATE artifacts SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, stage, inputs, version, result):
+        """
+        Stores a stage result (JSON-serializable) and evicts old artifacts if over budget.
+        """
+        payload = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, stage, inputs_key, version, result, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, stage, make_key(inputs), version, payload, len(payload), now, now),
+            )
+            self._evict()
+
+    def stats(self):
+        """
+        Returns {stage: {"artifacts", "versions", "bytes"}} for the stored artifacts.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*), COUNT(DISTINCT version), SUM(size) FROM artifacts GROUP BY stage"
+            ).fetchall()
+        return {stage: {"artifacts": count, "versions": versions, "bytes": size} for stage, count, versions, size in rows}
+
+    def clear(self, stage=None):
+        """
+        Removes every artifact, or only those of `stage`.
+        """
+        with self._lock:
+            if stage is None:
+                self._conn.execute("DELETE FROM artifacts")
+            else:
+                self._conn.execute("DELETE FROM artifacts WHERE stage = ?", (stage,))
+
+    def _evict(self):
+        """
+        Drops least recently used artifacts until within budget. Caller must hold the lock.
+        """
+        size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        doomed = []
+        for key, entry_size in self._conn.execute("SELECT key, size FROM artifacts ORDER BY accessed_at ASC"):
+            if size <= self.max_bytes:
+                break
+            doomed.append((key,))
+            size -= entry_size
+        self._conn.executemany("DELETE FROM artifacts WHERE key = ?", doomed)
+
+_shared_store = None  # Process-wide store, shared by pages, sessions and batch rows
+_shared_store_lock = threading.Lock()
+
+# Function: Shared Artifact Store
+def get_artifact_store():
+    """
+    Returns the process-wide artifact store.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ArtifactStore()
+    return _shared_store
+
+# End of file: utils/artifact_store.py
@@ -0,0 +1,24 @@
+###############################################
+# Bootstrap
+# File: utils/bootstrap.py
+# Purpose: One-time process setup applied by the entry points before anything else is imported
+###############################################
+
+# Import required libraries
+import sys  # Module table for the SQLite swap
+
+# Function: Apply SQLite Fix
+def apply_sqlite_fix():
+    """
+    Replaces the stdlib sqlite3 with pysqlite3 (newer SQLite, needed by CrewAI memory
+    on Streamlit Cloud). Safe to call repeatedly; a no-op where pysqlite3 isn't installed.
+    """
+    if getattr(sys.modules.get("sqlite3"), "__name__", None) == "pysqlite3":
+        return
+    try:
+        import pysqlite3  # Ensure SQLite works in certain environments
+    except ImportError:
+        return
+    sys.modules["sqlite3"] = pysqlite3  # Replace sqlite3 with pysqlite3
+
+# End of file: utils/bootstrap.py
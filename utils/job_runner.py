@@ -0,0 +1,206 @@
+###############################################
+# Job Runner
+# File: utils/job_runner.py
+# Purpose: Bounded background worker pool for crew runs, shared by all Streamlit sessions
+###############################################
+
+# Import required libraries
+import os  # Worker count from the environment
+import threading  # Locks and cancellation flags
+import time  # Job timestamps and retention
+import traceback  # Error details for failed jobs
+import uuid  # Job IDs
+from concurrent.futures import ThreadPoolExecutor  # Bounded worker pool
+
+from utils.streaming import StreamChannel, bind  # Live token and step stream per job
+from utils.telemetry import span  # Root span of each job
+
+# Job states
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Class: Job Cancelled
+class JobCancelled(Exception):
+    """
+    Raised inside a job when cancellation was requested.
+    """
+
+# Class: Job
+class Job:
+    """
+    A unit of background work with status, progress, result and cooperative cancellation.
+    """
+
+    def __init__(self, name):
+        """
+        Create a queued job.
+        """
+        self.id = uuid.uuid4().hex  # Stored in Streamlit session state
+        self.name = name  # Human readable label
+        self.status = QUEUED
+        self.progress = 0.0  # 0.0 - 1.0
+        self.message = "Waiting for a free worker..."
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self.stream = StreamChannel()  # Tokens and agent/task steps streamed by the run
+        self._cancel = threading.Event()
+
+    @property
+    def done(self):
+        """
+        True once the job succeeded, failed or was cancelled.
+        """
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancel_requested(self):
+        """
+        True after cancel() was called.
+        """
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """
+        Requests cancellation: queued jobs never start, running jobs stop at the next check.
+        """
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self._finish(CANCELLED, message="Cancelled before it started.")
+
+    def check_cancelled(self):
+        """
+        Raises JobCancelled if cancellation was requested (call between steps).
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def update(self, progress=None, message=None):
+        """
+        Reports progress from inside the job.
+        """
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+
+    def _finish(self, status, result=None, error=None, message=None):
+        """
+        Records the final state.
+        """
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        if status == SUCCEEDED:
+            self.progress = 1.0
+        if message is not None:
+            self.message = message
+
+# Class: Job Runner
+class JobRunner:
+    """
+    Runs jobs on a bounded thread pool:
+    1. `submit` returns immediately with a Job; the caller keeps only its ID.
+       LLM tokens and step events of the run are streamed into `job.stream`.
+    2. Finished jobs are kept for `retention` seconds so results survive reruns.
+    3. Work beyond `max_workers` waits in the queue instead of blocking a script thread.
+    """
+
+    def __init__(self, max_workers=4, retention=3600):
+        """
+        Create the worker pool.
+        """
+        self.retention = retention  # Seconds to keep finished jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sem-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, **kwargs):
+        """
+        Schedules `fn(job, *args, **kwargs)` and returns the Job.
+        """
+        job = Job(name)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        """
+        Returns the Job for `job_id`, or None if unknown or expired.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """
+        Returns all known jobs, newest first.
+        """
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: -job.created_at)
+
+    def _run(self, job, fn, args, kwargs):
+        """
+        Worker wrapper: runs the job and records its outcome.
+        """
+        if job.cancel_requested:
+            job._finish(CANCELLED, message="Cancelled before it started.")
+            return
+        job.status = RUNNING
+        job.message = "Running..."
+        try:
+            with bind(job.stream), span("job", {"sem.job": job.name}):
+                result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            job._finish(CANCELLED, message="Cancelled.")
+        except Exception as e:
+            job._finish(FAILED, error=f"{e}\n\n{traceback.format_exc()}", message=str(e))
+        else:
+            job._finish(SUCCEEDED, result=result, message="Completed.")
+
+    def _prune(self):
+        """
+        Forgets finished jobs older than the retention period. Caller must hold the lock.
+        """
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+# Function: Crew Callbacks
+def crew_callbacks(job, total_tasks):
+    """
+    Returns (step_callback, task_callback) for a Crew that report progress to `job`
+    and stop the run at the next agent step once cancellation is requested.
+    """
+    completed = []
+
+    def step_callback(step):
+        job.check_cancelled()
+        job.update(message=f"Task {len(completed) + 1} of {total_tasks}: working...")
+
+    def task_callback(output):
+        completed.append(output)
+        job.update(progress=len(completed) / total_tasks, message=f"Completed {len(completed)} of {total_tasks} tasks.")
+        job.check_cancelled()
+
+    return step_callback, task_callback
+
+_shared_runner = None  # Process-wide runner, shared by every session
+_shared_runner_lock = threading.Lock()
+
+# Function: Shared Job Runner
+def get_job_runner():
+    """
+    Returns the process-wide job runner (pool size from SEM_PLANNER_JOB_WORKERS, default 4).
+    """
+    global _shared_runner
+    with _shared_runner_lock:
+        if _shared_runner is None:
+            _shared_runner = JobRunner(max_workers=int(os.environ.get("SEM_PLANNER_JOB_WORKERS", 4)))
+    return _shared_runner
+
+# End of file: utils/job_runner.py
@@ -0,0 +1,98 @@
+###############################################
+# Job UI
+# File: utils/job_ui.py
+# Purpose: Streamlit helpers to start background jobs and poll their status
+###############################################
+
+# Import required libraries
+import streamlit as st  # Streamlit for UI rendering
+
+from utils.job_runner import CANCELLED, FAILED, SUCCEEDED, get_job_runner  # Background jobs
+
+# Seconds between status refreshes while a job is active
+POLL_SECONDS = 2
+
+# Function: Start Job
+def start_job(session_key, name, fn, *args, pipeline_inputs=None, **kwargs):
+    """
+    Submits `fn(job, *args, **kwargs)` to the shared runner and remembers its ID
+    in session state under `session_key` (one active job per key).
+    `pipeline_inputs` (the SEM pipeline inputs of the run) are kept for other pages, see job_inputs().
+    """
+    previous = current_job(session_key)
+    if previous is not None and not previous.done:
+        st.info(f"{previous.name} is already running.")
+        return previous
+    job = get_job_runner().submit(name, fn, *args, **kwargs)
+    st.session_state[session_key] = job.id
+    st.session_state[f"{session_key}_inputs"] = pipeline_inputs or {}
+    return job
+
+# Function: Job Inputs
+def job_inputs(session_key):
+    """
+    Returns the pipeline inputs of the latest job started under `session_key` ({} if none).
+    """
+    return st.session_state.get(f"{session_key}_inputs", {})
+
+# Function: Current Job
+def current_job(session_key):
+    """
+    Returns the job stored under `session_key`, pinning finished jobs in the session
+    so their results outlive the runner's retention period.
+    """
+    pinned = st.session_state.setdefault("finished_jobs", {})
+    job_id = st.session_state.get(session_key)
+    if job_id is None:
+        return None
+    job = get_job_runner().get(job_id) or pinned.get(job_id)
+    if job is not None and job.done:
+        pinned[job_id] = job
+    return job
+
+# Function: Render Job
+def render_job(session_key, render_result):
+    """
+    Shows progress and streamed agent output for the job under `session_key`,
+    refreshing every POLL_SECONDS while it runs, then calls `render_result(result)`
+    once it succeeds.
+    """
+    job = current_job(session_key)
+    if job is None:
+        return
+
+    # The job object updates in place, so whether it was polling is captured at this full run
+    was_done = job.done
+
+    @st.fragment(run_every=None if was_done else POLL_SECONDS)
+    def job_status():
+        live = current_job(session_key)
+        if live is None:
+            return
+        if live.done and not was_done:
+            st.rerun()  # Leave polling mode and render the final state
+
+        if not live.done:
+            st.progress(live.progress, text=f"{live.name}: {live.message}")
+            if st.button("Cancel", key=f"cancel_{live.id}"):
+                live.cancel()
+            if live.stream.agent:
+                st.caption(f"Now running: {live.stream.agent} — {live.stream.task}")
+
+            # Live output: replays what has streamed so far, then follows new tokens until the next refresh
+            with st.container(border=True):
+                st.write_stream(live.stream.follow(POLL_SECONDS))
+            return
+
+        if live.status == SUCCEEDED:
+            render_result(live.result)
+        elif live.status == FAILED:
+            st.error(f"{live.name} failed: {live.message}")
+            with st.expander("Error details"):
+                st.code(live.error)
+        elif live.status == CANCELLED:
+            st.warning(f"{live.name} was cancelled.")
+
+    job_status()
+
+# End of file: utils/job_ui.py
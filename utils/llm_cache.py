@@ -0,0 +1,163 @@
+###############################################
+# LLM Response Cache
+# File: utils/llm_cache.py
+# Purpose: Content-addressed on-disk cache in front of the CrewAI LLMs used by every agent
+###############################################
+
+# Import required libraries
+import threading  # Guard lazy creation of the shared cache
+from crewai import LLM  # CrewAI LLM wrapper (LiteLLM / native providers)
+from crewai.llms.base_llm import BaseLLM  # Extension point for custom LLMs
+
+from utils.prompt_compaction import count_tokens  # Local token estimates
+from utils.rate_limiter import get_limiter  # Shared per-provider rate limit and retries
+from utils.sqlite_cache import SQLiteCache, make_key  # Persistent TTL/LRU cache
+from utils.streaming import current_channel  # Live output of the current run
+from utils.telemetry import capture_usage, span  # LLM call spans and provider usage
+
+# Default model settings shared by all agents
+DEFAULT_MODEL = "gemini/gemini-1.5-flash"  # Google Gemini 1.5 Flash
+DEFAULT_TEMPERATURE = 0.1  # Low randomness keeps cached answers representative
+
+# Seconds a finished call waits for its provider usage from the (asynchronous) event bus
+USAGE_WAIT_SECONDS = 2.0
+
+_shared_cache = None  # Process-wide cache, created on first use
+_shared_cache_lock = threading.Lock()
+
+# Function: Shared LLM Cache
+def get_llm_cache():
+    """
+    Returns the process-wide LLM response cache (one SQLite file for all sessions).
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SQLiteCache("llm_cache.sqlite3", table="llm_responses")
+    return _shared_cache
+
+# Class: Cached LLM
+class CachedLLM(BaseLLM):
+    """
+    Wraps a CrewAI LLM and answers repeated prompts from disk:
+    - Keyed on model, temperature, agent role, rendered messages and tool schemas.
+    - Only non-empty text responses are stored.
+    """
+
+    def __init__(self, llm, role=None, cache=None):
+        """
+        Wrap `llm`; `role` is used in the key when the caller doesn't pass the agent.
+        """
+        super().__init__(model=llm.model, temperature=llm.temperature)
+        self._llm = llm  # The real LLM that serves cache misses
+        self.cache_role = role  # Fallback agent role for the cache key
+        self.response_cache = cache or get_llm_cache()  # Shared SQLite cache
+
+    def cache_key(self, messages, tools=None, role=None):
+        """
+        Builds the content-addressed key for one LLM call.
+        """
+        return make_key(self.model, self.temperature, role or self.cache_role, messages, tools)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        """
+        Returns the cached response for identical calls, otherwise calls the wrapped LLM.
+        Misses share the provider's rate limit; every call is traced with its latency,
+        cache outcome and token counts.
+        """
+        agent = kwargs.get("from_agent")
+        role = getattr(agent, "role", None) or self.cache_role
+        key = self.cache_key(messages, tools, getattr(agent, "role", None))
+
+        with span("llm.call", {
+            "gen_ai.request.model": self.model,
+            "gen_ai.agent.name": role,
+        }, kind="CLIENT") as call_span:
+            # Serve repeated prompts from disk (streamed in one piece to a watching page)
+            cached = self.response_cache.get(key)
+            call_span.set_attribute("sem.cache_hit", cached is not None)
+            if cached is not None:
+                channel = current_channel()
+                if channel is not None:
+                    channel.write(cached)
+                return cached
+
+            # Cache miss: forward stop words set by the agent executor, then call the real LLM
+            # within the provider's shared rate limit (which also owns the retries)
+            self._llm.stop = self.stop
+            requests_before = self._llm.get_token_usage_summary().successful_requests
+            with capture_usage() as usage:
+                response = get_limiter(self._llm.provider).call(
+                    self._llm.call, messages, tools, callbacks, available_functions, **kwargs
+                )
+            if isinstance(response, str) and response.strip():
+                self.response_cache.set(key, response)
+
+            # Provider-reported usage, or a local estimate when the provider reports none
+            # (only a call the wrapped LLM tracked usage for emits it, so only then is it awaited)
+            reported = None
+            if self._llm.get_token_usage_summary().successful_requests > requests_before:
+                reported = provider_tokens(usage.wait(USAGE_WAIT_SECONDS))
+            if reported is not None:
+                call_span.set_attribute("gen_ai.usage.input_tokens", reported[0])
+                call_span.set_attribute("gen_ai.usage.output_tokens", reported[1])
+                call_span.set_attribute("sem.usage.estimated", False)
+            else:
+                call_span.set_attribute("gen_ai.usage.input_tokens", message_tokens(messages))
+                call_span.set_attribute("gen_ai.usage.output_tokens", count_tokens(response if isinstance(response, str) else ""))
+                call_span.set_attribute("sem.usage.estimated", True)
+            return response
+
+    def supports_function_calling(self):
+        """
+        Delegates capability checks to the wrapped LLM.
+        """
+        return self._llm.supports_function_calling()
+
+    def supports_stop_words(self):
+        """
+        Delegates capability checks to the wrapped LLM.
+        """
+        return self._llm.supports_stop_words()
+
+    def get_context_window_size(self):
+        """
+        Delegates the context window size to the wrapped LLM.
+        """
+        return self._llm.get_context_window_size()
+
+# Function: Message Tokens
+def message_tokens(messages):
+    """
+    Estimated prompt tokens of a string prompt or a list of chat messages.
+    """
+    if isinstance(messages, str):
+        return count_tokens(messages)
+    return sum(count_tokens(message.get("content") if isinstance(message.get("content"), str) else "") for message in messages)
+
+# Function: Provider Tokens
+def provider_tokens(usage):
+    """
+    (input, output) tokens from a provider usage dict (LiteLLM or native Gemini key names), or None.
+    """
+    usage = usage or {}
+    prompt = usage.get("prompt_tokens", usage.get("prompt_token_count"))
+    if prompt is None:
+        return None
+    return int(prompt), int(usage.get("completion_tokens") or usage.get("candidates_token_count") or 0)
+
+# Function: Build Cached LLM
+def build_cached_llm(api_key, role=None, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE):
+    """
+    Creates the Gemini LLM used by the agents, wrapped in the response cache.
+    Streaming is on so tokens reach the page while the call is still running.
+    """
+    llm = LLM(
+        model=model,  # Model version
+        api_key=api_key,  # API key for authentication
+        temperature=temperature,  # Control randomness (0.1 = more deterministic)
+        stream=True  # Emit tokens as they are generated
+    )
+    return CachedLLM(llm, role=role)
+
+# End of file: utils/llm_cache.py
@@ -0,0 +1,197 @@
+###############################################
+# Orchestrator
+# File: utils/orchestrator.py
+# Purpose: Runs pipeline stages as a dependency graph, starting each stage as soon as its inputs are ready
+###############################################
+
+# Import required libraries
+import contextvars  # Carry the streaming channel into stage threads
+import time  # Stage timings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # Parallel stage execution
+
+from utils.artifact_store import MISSING, artifact_key  # Stage artifact keys and lookups
+
+# Class: Stage
+class Stage:
+    """
+    One node of the pipeline graph:
+    - `fn(params, upstream)` receives the run parameters and {dependency: result}.
+    - `reads`, `version` and `max_age` describe its artifact: the params it uses,
+      its code/prompt version and how long a stored result stays valid (seconds, None: always).
+    """
+
+    def __init__(self, name, fn, depends_on=(), reads=(), version="", max_age=None):
+        """
+        Define a stage, the stages it waits for and what its stored result depends on.
+        """
+        self.name = name  # Unique stage name
+        self.fn = fn  # Callable producing the stage result
+        self.depends_on = tuple(depends_on)  # Names of upstream stages
+        self.reads = tuple(reads)  # Run parameters the result depends on
+        self.version = version  # Code/prompt version of the stage
+        self.max_age = max_age  # Seconds a stored result may be reused
+
+# Class: Pipeline Orchestrator
+class PipelineOrchestrator:
+    """
+    Executes stages as a DAG on a thread pool:
+    1. Stages without pending dependencies start immediately and run concurrently.
+    2. A stage starts the moment its last dependency finishes.
+    3. The first failure cancels stages that haven't started and is re-raised.
+    4. With an artifact store, stored results whose inputs, upstream artifacts and version
+       are unchanged are loaded instead of recomputed, and their upstream stages are skipped.
+    Wall-clock time approaches the longest path instead of the sum of all stages.
+    """
+
+    def __init__(self, stages, max_workers=4):
+        """
+        Validate the graph and configure parallelism.
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers  # Stages running at the same time
+        self.timings = {}  # stage -> (start offset, duration) in seconds of the last run
+        self.reused = []  # Stages whose stored results the last run reused
+        self._validate()
+
+    def _validate(self):
+        """
+        Rejects unknown dependencies and cycles.
+        """
+        for stage in self.stages.values():
+            missing = [name for name in stage.depends_on if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a dependency cycle through '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def artifact_keys(self, params, names):
+        """
+        Artifact key of each named stage (and its upstream stages), computed from the params
+        alone: {stage: key}. A stage's key changes only when its own inputs or version,
+        or the key of a stage it depends on, change.
+        """
+        keys = {}
+
+        def key(name):
+            if name not in keys:
+                stage = self.stages[name]
+                inputs = {field: params.get(field) for field in stage.reads}
+                keys[name] = artifact_key(name, stage.version, inputs, [key(dependency) for dependency in stage.depends_on])
+            return keys[name]
+
+        for name in names:
+            key(name)
+        return keys
+
+    def plan(self, params, only=None, completed=None, artifacts=None):
+        """
+        Decides what a run does:
+        - "results": reusable results ({stage: result}) from `completed` and the artifact store.
+        - "pending": stages to compute; upstream stages of reused results are left out.
+        - "keys": artifact keys of the selected stages (empty without a store).
+        """
+        targets = set(only) if only else set(self.stages)
+        results = {name: result for name, result in (completed or {}).items() if name in self.stages}
+        keys = self.artifact_keys(params, self.with_upstream(targets)) if artifacts is not None else {}
+
+        # Walk back from the targets; a reusable result stops the walk
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            if name not in results and name in keys:
+                stored = artifacts.get(keys[name], max_age=self.stages[name].max_age)
+                if stored is not MISSING:
+                    results[name] = stored
+            if name not in results:
+                stack.extend(self.stages[name].depends_on)
+
+        results = {name: result for name, result in results.items() if name in needed}
+        return {"results": results, "pending": needed - set(results), "keys": keys}
+
+    def run(self, params, on_stage_done=None, only=None, completed=None, artifacts=None, plan=None):
+        """
+        Runs the pipeline and returns {stage: result}.
+        `on_stage_done(name, result)` is called as each stage finishes;
+        `only` limits the run to the named stages and their upstream stages;
+        `completed` holds results from an earlier run (e.g. a checkpoint), which are not recomputed;
+        `artifacts` (an ArtifactStore) supplies stored results and receives new ones;
+        `plan` is the output of plan() for these arguments, when already computed.
+        """
+        plan = plan or self.plan(params, only, completed, artifacts)
+        results = dict(plan["results"])
+        pending = set(plan["pending"])
+        self.reused = sorted(results)
+        running = {}
+        started = time.perf_counter()
+        self.timings = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sem-stage") as executor:
+            while pending or running:
+                # Launch every stage whose dependencies are all finished
+                for name in sorted(pending):
+                    stage = self.stages[name]
+                    if all(dependency in results for dependency in stage.depends_on):
+                        upstream = {dependency: results[dependency] for dependency in stage.depends_on}
+                        context = contextvars.copy_context()
+                        future = executor.submit(context.run, self._timed, stage, params, upstream, started)
+                        running[future] = name
+                        pending.discard(name)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    if artifacts is not None:
+                        stage = self.stages[name]
+                        inputs = {field: params.get(field) for field in stage.reads}
+                        artifacts.put(plan["keys"][name], name, inputs, stage.version, results[name])
+                    if on_stage_done is not None:
+                        on_stage_done(name, results[name])
+        return results
+
+    def _timed(self, stage, params, upstream, started):
+        """
+        Runs one stage and records when it started and how long it took.
+        """
+        begin = time.perf_counter()
+        try:
+            return stage.fn(params, upstream)
+        finally:
+            self.timings[stage.name] = (begin - started, time.perf_counter() - begin)
+
+    def with_upstream(self, names):
+        """
+        Returns `names` plus every stage they transitively depend on.
+        """
+        selected = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.stages[name].depends_on)
+        return selected
+
+# End of file: utils/orchestrator.py
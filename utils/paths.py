@@ -0,0 +1,23 @@
+###############################################
+# Cache Paths
+# File: utils/paths.py
+# Purpose: Resolves the on-disk location used by local caches and stores
+###############################################
+
+# Import required libraries
+import os  # Environment variables and filesystem helpers
+
+# Root directory for every local cache (override with SEM_PLANNER_CACHE_DIR)
+CACHE_DIR = os.environ.get("SEM_PLANNER_CACHE_DIR", os.path.join(os.getcwd(), ".cache"))
+
+# Function: Resolve Cache Path
+def cache_path(*parts):
+    """
+    Returns an absolute path inside the cache directory:
+    - Creates the parent directories on first use.
+    """
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)  # Make sure the folder exists
+    return path
+
+# End of file: utils/paths.py
@@ -0,0 +1,254 @@
+###############################################
+# Prompt Compaction
+# File: utils/prompt_compaction.py
+# Purpose: Keeps task prompts within per-task token budgets by ranking, deduplicating
+#          and truncating the data interpolated into them, and reports what was cut on the stage span
+###############################################
+
+# Import required libraries
+import re  # Token estimation and line normalization
+
+from utils.telemetry import current_span  # Compaction reports go on the stage span
+
+# Token budget for the data appended to each task's description (instructions come on top)
+TASK_BUDGETS = {
+    "website_analysis": 2500,
+    "keyword_similarity": 1500,
+    "keyword_visualization": 800,
+    "keyword_discovery": 2500,
+    "keyword_categorization": 3000,
+    "keyword_trend": 1500,
+    "ad_copy": 5000,
+    "full_plan": 8000,
+}
+
+# Budget for tasks without an entry above
+DEFAULT_BUDGET = 2000
+
+# Latin words, digit runs, Thai runs, then any other single character
+TOKEN_PATTERN = re.compile(r"([A-Za-z]+)|(\d+)|([\u0E00-\u0E7F]+)|(\S)")
+
+# Characters per token for each pattern group above (rounded up, at least one token per match)
+CHARS_PER_TOKEN = (4, 3, 2, 1)
+
+# Tokens reserved for the "omitted" note when a section is truncated
+NOTE_TOKENS = 20
+
+# Lines shorter than this (headings, separators, table rules) are never treated as duplicates
+MIN_DEDUP_CHARS = 40
+
+# Function: Count Tokens
+def count_tokens(text):
+    """
+    Estimates the number of LLM tokens in `text` locally, without a tokenizer download.
+    Slightly pessimistic for English (about 4 characters per token) and Thai (about 2),
+    so budgets hold for the real tokenizer too.
+    """
+    total = 0
+    for match in TOKEN_PATTERN.finditer(text or ""):
+        total += -(-len(match.group()) // CHARS_PER_TOKEN[match.lastindex - 1])
+    return total
+
+# Function: Normalize Line
+def normalize_line(line):
+    """
+    Comparison key for deduplication: case, whitespace and list markers ignored.
+    """
+    return " ".join(line.casefold().lstrip("-*#>0123456789. ").split())
+
+# Class: Prompt Budget
+class PromptBudget:
+    """
+    Token allowance for the data sections of one task prompt:
+    1. Each section takes what it needs from the remaining budget (or a `share` of the total).
+    2. Lists are deduplicated and ranked by weight (search volume, TF-IDF score) before truncation,
+       so what is cut is always the least important.
+    3. Text is deduplicated line by line across all sections, then truncated at a line boundary.
+    4. `finish()` reports how many tokens the prompt data had and kept on the current (stage) span,
+       which the metrics page aggregates per stage.
+    """
+
+    def __init__(self, task, limit=None):
+        """
+        Use the configured budget for `task` unless `limit` is given.
+        """
+        self.task = task
+        self.limit = limit or TASK_BUDGETS.get(task, DEFAULT_BUDGET)
+        self.used = 0
+        self.sections = []
+        self._seen_lines = set()
+
+    def remaining(self):
+        """
+        Tokens still available.
+        """
+        return max(self.limit - self.used, 0)
+
+    def allowance(self, share=None):
+        """
+        Tokens the next section may use: the remaining budget, capped at `share` of the total.
+        """
+        if share is None:
+            return self.remaining()
+        return min(self.remaining(), int(self.limit * share))
+
+    def items(self, section, items, weights=None, share=None, separator=", "):
+        """
+        Joins the highest-weighted unique items that fit into the allowance.
+        `weights` is {item: weight} or a list parallel to `items`; without it the given order is the ranking.
+        """
+        items = list(items)
+        if isinstance(weights, dict):
+            weights = [weights.get(item, 0) for item in items]
+        ranked = range(len(items))
+        if weights is not None:
+            ranked = sorted(ranked, key=lambda index: -(weights[index] or 0))  # Stable: ties keep input order
+
+        unique, seen = [], set()
+        for index in ranked:
+            key = normalize_line(str(items[index]))
+            if key and key not in seen:
+                seen.add(key)
+                unique.append(str(items[index]))
+
+        allowance = self.allowance(share)
+        separator_tokens = count_tokens(separator)
+        if sum(count_tokens(item) + separator_tokens for item in unique) > allowance:
+            allowance -= NOTE_TOKENS
+        kept, tokens = [], 0
+        for item in unique:
+            cost = count_tokens(item) + (separator_tokens if kept else 0)
+            if tokens + cost > allowance:
+                break
+            kept.append(item)
+            tokens += cost
+
+        text = separator.join(kept)
+        if len(kept) < len(unique):
+            text += f"{separator}... ({len(unique) - len(kept)} lower-ranked omitted)"
+        return self._record(section, len(items), len(kept), sum(count_tokens(str(item)) for item in items), text)
+
+    def text(self, section, text, share=None):
+        """
+        Deduplicates `text` against everything already in the prompt and truncates it to the allowance.
+        """
+        lines = (text or "").strip().splitlines()
+        return self._truncate(section, lines, self._dedupe(lines), count_tokens(text), self.allowance(share))
+
+    def texts(self, sections, share=None):
+        """
+        Compacts several {heading: text} sections that compete for one allowance:
+        after deduplication, every section is guaranteed its first line plus the truncation note,
+        small sections are kept whole and the rest share what is left equally.
+        When even those minimums don't fit, the last sections are dropped (recorded as fully cut).
+        """
+        lines = {heading: text.strip().splitlines() for heading, text in sections.items() if text and text.strip()}
+        unique = {heading: self._dedupe(section_lines) for heading, section_lines in lines.items()}
+        cost = {heading: sum(count_tokens(line) + 1 for line in section_lines) for heading, section_lines in unique.items()}
+        floor = {
+            heading: min(cost[heading], NOTE_TOKENS + count_tokens(section_lines[0]) + 1) if section_lines else 0
+            for heading, section_lines in unique.items()
+        }
+
+        allowance = self.allowance(share)
+        kept = list(unique)
+        while sum(floor[heading] for heading in kept) > allowance:
+            dropped = kept.pop()  # Sections are given in order of importance
+            self._record(dropped, len(lines[dropped]), 0, count_tokens(sections[dropped]), "")
+
+        spare = allowance - sum(floor[heading] for heading in kept)
+        quotas = {}
+        for heading in sorted(kept, key=cost.get):
+            extra = min(cost[heading] - floor[heading], spare // (len(kept) - len(quotas)))
+            quotas[heading] = floor[heading] + extra
+            spare -= extra
+
+        return {
+            heading: self._truncate(heading, lines[heading], unique[heading], count_tokens(sections[heading]), quotas[heading])
+            for heading in kept
+        }
+
+    def _dedupe(self, lines):
+        """
+        Drops lines already seen in this prompt (short lines are always kept).
+        """
+        unique = []
+        for line in lines:
+            key = normalize_line(line)
+            if len(key) >= MIN_DEDUP_CHARS:
+                if key in self._seen_lines:
+                    continue
+                self._seen_lines.add(key)
+            unique.append(line)
+        return unique
+
+    def _truncate(self, section, lines, unique, tokens_in, allowance):
+        """
+        Keeps the leading `unique` lines that fit into `allowance` tokens, with a note on what was cut.
+        """
+        if sum(count_tokens(line) + 1 for line in unique) > allowance:
+            allowance -= NOTE_TOKENS
+        kept, tokens = [], 0
+        for line in unique:
+            cost = count_tokens(line) + 1  # Line break
+            if tokens + cost > allowance:
+                break
+            kept.append(line)
+            tokens += cost
+
+        result = "\n".join(kept)
+        if len(kept) < len(unique):
+            omitted = sum(count_tokens(line) for line in unique[len(kept):])
+            result += f"\n[... truncated: {len(unique) - len(kept)} lines, about {omitted} tokens omitted]"
+        return self._record(section, len(lines), len(kept), tokens_in, result)
+
+    def finish(self):
+        """
+        Returns the compaction report of this prompt and adds it to the current span:
+        token totals are summed over the stage's prompts, trimmed prompts are listed by summary.
+        """
+        report = {
+            "task": self.task,
+            "budget": self.limit,
+            "tokens_in": sum(section["tokens_in"] for section in self.sections),
+            "tokens_kept": self.used,
+            "sections": self.sections,
+        }
+        active = current_span()
+        if active is not None:
+            active.add("sem.prompt.tokens_in", report["tokens_in"])
+            active.add("sem.prompt.tokens_kept", report["tokens_kept"])
+            if report["tokens_kept"] < report["tokens_in"]:
+                active.set_attribute("sem.prompt.trimmed", active.attributes.get("sem.prompt.trimmed", []) + [format_report(report)])
+        return report
+
+    def _record(self, section, items_in, items_kept, tokens_in, text):
+        """
+        Charges `text` to the budget and notes what was cut from the section.
+        """
+        tokens_kept = count_tokens(text)
+        self.used += tokens_kept
+        self.sections.append({
+            "section": section,
+            "items_in": items_in,
+            "items_kept": items_kept,
+            "tokens_in": tokens_in,
+            "tokens_kept": tokens_kept,
+        })
+        return text
+
+# Function: Format Report
+def format_report(report):
+    """
+    One-line summary of a compaction report (span attribute, logs).
+    """
+    cut = [
+        f"{section['section']} {section['items_kept']}/{section['items_in']}"
+        for section in report["sections"] if section["items_kept"] < section["items_in"]
+    ]
+    return (
+        f"{report['task']}: {report['tokens_kept']}/{report['tokens_in']} tokens kept "
+        f"(budget {report['budget']})" + (f"; trimmed {', '.join(cut)}" if cut else "")
+    )
+
+# End of file: utils/prompt_compaction.py
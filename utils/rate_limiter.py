@@ -0,0 +1,450 @@
+###############################################
+# Rate Limiter
+# File: utils/rate_limiter.py
+# Purpose: Process-wide adaptive rate limits and retry scheduling for Gemini, Serper,
+#          BigQuery and crawled sites, with interactive runs ahead of batch runs
+###############################################
+
+# Import required libraries
+import asyncio  # Async acquire for the crawler
+import contextvars  # Lane of the run executing in the current context
+import heapq  # Waiting callers ordered by lane, then arrival
+import itertools  # Arrival sequence numbers
+import os  # Limit overrides from the environment
+import random  # Backoff jitter
+import threading  # Shared state across sessions and stage threads
+import time  # Token refill and latency
+from contextlib import contextmanager  # lane() helper
+
+from utils.telemetry import current_span  # Wait time and retries on the calling span
+
+# Per-provider limits, set just under the documented quotas:
+# rate = requests per second, burst = bucket size, concurrency = maximum calls in flight,
+# retries = attempts after the first one for throttled or transient failures.
+# Crawl limits apply per crawled host ("crawl:<host>").
+PROVIDER_LIMITS = {
+    "gemini": {"rate": 1.5, "burst": 4, "concurrency": 8, "retries": 4},
+    "serper": {"rate": 4.0, "burst": 8, "concurrency": 8, "retries": 3},
+    "bigquery": {"rate": 1.0, "burst": 4, "concurrency": 4, "retries": 3},
+    "crawl": {"rate": 5.0, "burst": 10, "concurrency": 10, "retries": 1},
+}
+
+# Limits for providers without an entry above
+DEFAULT_LIMITS = {"rate": 5.0, "burst": 10, "concurrency": 8, "retries": 3}
+
+# Overrides, e.g. SEM_PLANNER_RATE_LIMITS="gemini=0.25:4,serper=10" (requests per second[:concurrency])
+LIMITS_ENV = "SEM_PLANNER_RATE_LIMITS"
+
+# Priority lanes: lower rank is served first
+LANES = {"interactive": 0, "batch": 1}
+
+# AIMD tuning
+DECREASE_FACTOR = 0.5  # Rate and concurrency multiplier on a throttle
+MIN_RATE_FACTOR = 0.05  # Never slow below 5% of the configured rate
+RATE_RECOVERY = 0.05  # Rate fraction regained per successful call
+LATENCY_TOLERANCE = 3.0  # Latency EWMA above this multiple of the best seen counts as congestion
+LATENCY_BACKOFF = 0.9  # Concurrency multiplier on congestion
+LATENCY_ALPHA = 0.2  # EWMA weight of the newest latency sample
+BASELINE_DRIFT = 1.01  # Best-seen latency creeps up so it follows real changes
+
+# Jittered exponential backoff between attempts, in seconds
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# Longest a waiting caller sleeps before checking its turn again (seconds)
+POLL_INTERVAL = 0.05
+
+# Status codes meaning "slow down" rather than "failed"
+THROTTLE_STATUS = (429, 503)
+TRANSIENT_STATUS = (500, 502, 504)
+
+# Message fragments providers use for quota errors
+THROTTLE_MARKERS = ("rate limit", "too many requests", "resource exhausted", "resource_exhausted")
+
+# Lane of the run executing in the current context (set by lane())
+_current_lane = contextvars.ContextVar("sem_rate_lane", default="interactive")
+
+# Class: Throttled Error
+class ThrottledError(Exception):
+    """
+    Raised by a limited call when the provider answered "slow down" without raising itself
+    (e.g. a crawled page returning 429).
+    """
+
+    def __init__(self, status_code, retry_after=None):
+        """
+        Keep the status code and the provider's Retry-After delay.
+        """
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+# Class: Quota Exhausted
+class QuotaExhausted(Exception):
+    """
+    A provider kept throttling after every retry. Raised instead of the provider's own error
+    so outer retry layers (e.g. CrewAI's LLM retry) don't start another round of attempts.
+    """
+
+    def __init__(self, provider, attempts, last_error):
+        """
+        Keep the provider, the number of attempts and the last provider error.
+        """
+        super().__init__(f"{provider}: quota still exceeded after {attempts} attempts")
+        self.provider = provider
+        self.attempts = attempts
+        self.last_error = last_error
+
+# Function: Current Lane
+def current_lane():
+    """
+    Returns the lane ("interactive" or "batch") of the code running in the current context.
+    """
+    return _current_lane.get()
+
+# Function: Lane
+@contextmanager
+def lane(name):
+    """
+    Runs the enclosed code (and the stage threads it starts) in the `name` lane.
+    """
+    if name not in LANES:
+        raise ValueError(f"Unknown lane: {name}")
+    token = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+# Function: Status Code
+def status_code(error):
+    """
+    HTTP status of a provider error (requests, aiohttp, google-api-core and LiteLLM shapes), or None.
+    """
+    response = getattr(error, "response", None)
+    for value in (getattr(error, "status_code", None), getattr(error, "status", None),
+                  getattr(error, "code", None), getattr(response, "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+# Function: Classify Error
+def classify_error(error):
+    """
+    "throttled" for quota/overload errors, "transient" for timeouts, dropped connections
+    and 5xx errors worth retrying, None for everything else.
+    """
+    status = status_code(error)
+    if isinstance(error, ThrottledError) or status in THROTTLE_STATUS:
+        return "throttled"
+    if any(marker in str(error).lower() for marker in THROTTLE_MARKERS):
+        return "throttled"
+    name = type(error).__name__
+    if status in TRANSIENT_STATUS or isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in name or "Connect" in name:
+        return "transient"
+    return None
+
+# Function: Retry After
+def retry_after(error):
+    """
+    The provider's requested delay in seconds (Retry-After header or attribute), or None.
+    """
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+        value = headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except (TypeError, ValueError):
+        return None  # HTTP-date form: fall back to the computed backoff
+
+# Function: Backoff Delay
+def backoff_delay(attempt, requested=None):
+    """
+    Full-jitter exponential backoff before retry `attempt` (0-based); a provider's
+    Retry-After is honoured with a little jitter so waiting callers don't return together.
+    """
+    if requested is not None:
+        return requested + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+# Class: Adaptive Limiter
+class AdaptiveLimiter:
+    """
+    Shared limit for one provider:
+    1. A token bucket caps the request rate; `burst` requests may start back to back.
+    2. Concurrency and rate adapt AIMD-style: halved on a throttle (once per latency window),
+       and regained additively on successes while latency stays near the best seen.
+    3. A throttle pauses every caller until the provider's Retry-After has passed.
+    4. Waiting callers are served by lane, then in arrival order.
+    """
+
+    def __init__(self, name, rate, burst=None, concurrency=8, retries=3):
+        """
+        `rate` requests per second, at most `concurrency` in flight, `retries` extra attempts per call.
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.max_concurrency = concurrency
+        self.retries = retries
+        self.concurrency = float(concurrency)  # Adaptive limit, between 1 and max_concurrency
+        self.rate_factor = 1.0  # Adaptive share of `rate`
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.inflight = 0
+        self.latency = None  # EWMA of call latency in seconds
+        self.best_latency = None
+        self.counters = dict.fromkeys(("calls", "throttled", "errors", "retries", "wait_seconds"), 0)
+        self._waiting = []  # Heap of (lane rank, arrival) tickets
+        self._arrivals = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Blocks until this caller may start a request; returns the seconds waited.
+        """
+        started = time.monotonic()
+        with self._condition:
+            ticket = self._enqueue()
+            try:
+                while True:
+                    wait = self._grant(ticket, time.monotonic())
+                    if wait == 0:
+                        break
+                    self._condition.wait(wait)
+            except BaseException:
+                self._dequeue(ticket)
+                raise
+        return self._waited(started)
+
+    async def acquire_async(self):
+        """
+        Awaits this caller's turn without blocking the event loop; returns the seconds waited.
+        """
+        started = time.monotonic()
+        with self._condition:
+            ticket = self._enqueue()
+        try:
+            while True:
+                with self._condition:
+                    wait = self._grant(ticket, time.monotonic())
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        except BaseException:
+            with self._condition:
+                self._dequeue(ticket)
+            raise
+        return self._waited(started)
+
+    def release(self, latency, outcome="ok", requested_delay=None):
+        """
+        Ends a request started with `acquire` and adapts the limits to its `outcome`
+        ("ok", "throttled" or "error").
+        """
+        with self._condition:
+            self.inflight -= 1
+            self.counters["calls"] += 1
+            if outcome == "throttled":
+                self.counters["throttled"] += 1
+                self._decrease(time.monotonic(), requested_delay)
+            elif outcome == "ok":
+                self._increase(latency)
+            else:
+                self.counters["errors"] += 1
+            self._condition.notify_all()
+
+    def call(self, function, *args, **kwargs):
+        """
+        Runs `function(*args, **kwargs)` within the limit, retrying throttled and transient
+        failures with jittered backoff.
+        """
+        for attempt in range(self.retries + 1):
+            self.acquire()
+            started = time.monotonic()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as error:
+                kind = classify_error(error)
+                self.release(time.monotonic() - started, "throttled" if kind == "throttled" else "error", retry_after(error))
+                if kind is None or (kind == "transient" and attempt == self.retries):
+                    raise
+                last_error = error
+            else:
+                self.release(time.monotonic() - started)
+                return result
+            if attempt < self.retries:
+                self._count_retry()
+                time.sleep(backoff_delay(attempt, retry_after(last_error)))
+        raise QuotaExhausted(self.name, self.retries + 1, last_error)  # Outside the except block: no chained cause
+
+    async def acall(self, function, *args, **kwargs):
+        """
+        Async `call` for coroutine functions.
+        """
+        for attempt in range(self.retries + 1):
+            await self.acquire_async()
+            started = time.monotonic()
+            try:
+                result = await function(*args, **kwargs)
+            except Exception as error:
+                kind = classify_error(error)
+                self.release(time.monotonic() - started, "throttled" if kind == "throttled" else "error", retry_after(error))
+                if kind is None or (kind == "transient" and attempt == self.retries):
+                    raise
+                last_error = error
+            else:
+                self.release(time.monotonic() - started)
+                return result
+            if attempt < self.retries:
+                self._count_retry()
+                await asyncio.sleep(backoff_delay(attempt, retry_after(last_error)))
+        raise QuotaExhausted(self.name, self.retries + 1, last_error)
+
+    def stats(self):
+        """
+        Current limits, load and counters, for monitoring.
+        """
+        with self._condition:
+            waiting = {name: sum(1 for rank, _ in self._waiting if rank == LANES[name]) for name in LANES}
+            return {
+                "rate": round(self.rate * self.rate_factor, 3),
+                "configured_rate": self.rate,
+                "concurrency": round(self.concurrency, 2),
+                "inflight": self.inflight,
+                "waiting": waiting,
+                "latency": round(self.latency, 3) if self.latency is not None else None,
+                **{key: round(value, 3) for key, value in self.counters.items()},
+            }
+
+    def _enqueue(self):
+        """
+        Adds a ticket for the current lane to the waiting heap. Caller must hold the lock.
+        """
+        ticket = (LANES[current_lane()], next(self._arrivals))
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        """
+        Removes an abandoned ticket and lets the next caller check its turn. Caller must hold the lock.
+        """
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+        self._condition.notify_all()
+
+    def _grant(self, ticket, now):
+        """
+        Starts `ticket`'s request and returns 0 when it is first in line, a slot is free and a
+        token is available; otherwise returns the seconds to wait before checking again.
+        Caller must hold the lock.
+        """
+        if self._waiting[0] != ticket or self.inflight >= max(int(self.concurrency), 1):
+            return POLL_INTERVAL
+        if now < self.paused_until:
+            return min(self.paused_until - now, POLL_INTERVAL * 10)
+        rate = self.rate * self.rate_factor
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1:
+            return min((1 - self.tokens) / rate, POLL_INTERVAL * 10)
+        self.tokens -= 1
+        self.inflight += 1
+        heapq.heappop(self._waiting)
+        self._condition.notify_all()
+        return 0
+
+    def _decrease(self, now, requested_delay):
+        """
+        Multiplicative decrease after a throttle, at most once per latency window
+        (a burst of 429s from one overload halves the limits once). Caller must hold the lock.
+        """
+        if requested_delay is not None:
+            self.paused_until = max(self.paused_until, now + requested_delay)
+        if now - self.decreased_at < (self.latency or 1.0):
+            return
+        self.decreased_at = now
+        self.rate_factor = max(MIN_RATE_FACTOR, self.rate_factor * DECREASE_FACTOR)
+        self.concurrency = max(1.0, self.concurrency * DECREASE_FACTOR)
+        self.tokens = min(self.tokens, 0.0)
+
+    def _increase(self, latency):
+        """
+        Additive increase after a success, unless latency shows the provider is congested.
+        Caller must hold the lock.
+        """
+        self.latency = latency if self.latency is None else (1 - LATENCY_ALPHA) * self.latency + LATENCY_ALPHA * latency
+        self.best_latency = self.latency if self.best_latency is None else min(self.best_latency * BASELINE_DRIFT, self.latency)
+        self.rate_factor = min(1.0, self.rate_factor + RATE_RECOVERY)
+        if self.latency > self.best_latency * LATENCY_TOLERANCE:
+            self.concurrency = max(1.0, self.concurrency * LATENCY_BACKOFF)
+        else:
+            self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+
+    def _waited(self, started):
+        """
+        Records the time a caller waited, here and on its span.
+        """
+        waited = time.monotonic() - started
+        with self._condition:
+            self.counters["wait_seconds"] += waited
+        current = current_span()
+        if current is not None:
+            current.add("sem.ratelimit.wait_ms", round(waited * 1000, 1))
+        return waited
+
+    def _count_retry(self):
+        """
+        Records one retry, here and on the caller's span.
+        """
+        with self._condition:
+            self.counters["retries"] += 1
+        current = current_span()
+        if current is not None:
+            current.add("sem.ratelimit.retries")
+
+# Function: Parse Limits
+def parse_limits(text):
+    """
+    Parses overrides like "gemini=0.25:4,serper=10" into {provider: {"rate", "concurrency"}}.
+    """
+    limits = {}
+    for part in (text or "").split(","):
+        if "=" not in part:
+            continue
+        provider, value = part.split("=", 1)
+        rate, _, concurrency = value.partition(":")
+        limits[provider.strip()] = {"rate": float(rate)}
+        if concurrency:
+            limits[provider.strip()]["concurrency"] = int(concurrency)
+    return limits
+
+_limiters = {}  # Process-wide limiters, created on first use
+_limiters_lock = threading.Lock()
+
+# Function: Get Limiter
+def get_limiter(name):
+    """
+    Returns the process-wide limiter for `name` ("gemini", "serper", "bigquery", "crawl:<host>", ...).
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            provider = name.split(":", 1)[0]
+            settings = {**PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS), **parse_limits(os.environ.get(LIMITS_ENV)).get(provider, {})}
+            _limiters[name] = AdaptiveLimiter(name, **settings)
+        return _limiters[name]
+
+# Function: Limiter Stats
+def limiter_stats():
+    """
+    Returns {name: stats} for every limiter created so far.
+    """
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+# End of file: utils/rate_limiter.py
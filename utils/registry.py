@@ -0,0 +1,227 @@
+###############################################
+# Resource Registry
+# File: utils/registry.py
+# Purpose: Process-wide pool of LLM clients and tools, shared by all sessions and runs
+###############################################
+
+# Import required libraries
+import os  # Credential file checks
+import threading  # Guard lazy creation
+import time  # Health check intervals
+
+import streamlit as st  # Streamlit secrets
+
+from utils.sqlite_cache import make_key  # Fingerprint of the credentials a resource was built with
+
+# Seconds between health checks of a pooled resource
+HEALTH_INTERVAL = 300
+
+# Class: Registry Entry
+class RegistryEntry:
+    """
+    One pooled resource with the recipe to (re)build it.
+    """
+
+    def __init__(self, factory, secrets=(), health_check=None):
+        """
+        `factory(**secret_values)` builds the resource; `health_check(resource)` returns False when it must be rebuilt.
+        """
+        self.factory = factory
+        self.secrets = tuple(secrets)  # Names of the st.secrets entries the resource depends on
+        self.health_check = health_check
+        self.resource = None
+        self.fingerprint = None  # Credentials the current resource was built with
+        self.checked_at = 0.0
+        self.builds = 0
+        self.hits = 0
+
+# Class: Resource Registry
+class ResourceRegistry:
+    """
+    Lazily builds and reuses expensive clients:
+    1. The first `get` builds the resource; later calls from any session reuse it.
+    2. It is rebuilt when one of its secrets changes or its health check fails.
+    3. Agents are still created per run; only the LLMs and tools behind them are shared.
+    """
+
+    def __init__(self, secrets_source=None, health_interval=HEALTH_INTERVAL):
+        """
+        `secrets_source()` returns the secrets mapping (st.secrets by default).
+        """
+        self.secrets_source = secrets_source or (lambda: st.secrets)
+        self.health_interval = health_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory, secrets=(), health_check=None):
+        """
+        Declares a resource; re-registering an existing name keeps the built instance.
+        """
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = RegistryEntry(factory, secrets, health_check)
+
+    def get(self, name):
+        """
+        Returns the pooled resource `name`, building or rebuilding it when needed.
+        """
+        with self._lock:
+            entry = self._entries[name]
+            source = self.secrets_source()
+            values = {secret: source[secret] for secret in entry.secrets}
+            fingerprint = make_key(values)
+
+            if entry.resource is not None and entry.fingerprint == fingerprint and self._healthy(entry):
+                entry.hits += 1
+                return entry.resource
+
+            entry.resource = entry.factory(**values)
+            entry.fingerprint = fingerprint
+            entry.checked_at = time.monotonic()
+            entry.builds += 1
+            return entry.resource
+
+    def invalidate(self, name=None):
+        """
+        Drops one resource (or all of them) so the next `get` rebuilds it.
+        """
+        with self._lock:
+            for key in [name] if name else list(self._entries):
+                if key in self._entries:
+                    self._entries[key].resource = None
+
+    def stats(self):
+        """
+        Returns {name: {"built", "builds", "hits"}} for monitoring.
+        """
+        with self._lock:
+            return {
+                name: {"built": entry.resource is not None, "builds": entry.builds, "hits": entry.hits}
+                for name, entry in self._entries.items()
+            }
+
+    def _healthy(self, entry):
+        """
+        Runs the entry's health check at most every `health_interval` seconds. Caller must hold the lock.
+        """
+        if entry.health_check is None or time.monotonic() - entry.checked_at < self.health_interval:
+            return True
+        entry.checked_at = time.monotonic()
+        try:
+            return bool(entry.health_check(entry.resource))
+        except Exception:
+            return False
+
+_shared_registry = None  # Process-wide registry, shared by every session
+_shared_registry_lock = threading.Lock()
+
+# Function: Shared Registry
+def get_registry():
+    """
+    Returns the process-wide resource registry.
+    """
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = ResourceRegistry()
+    return _shared_registry
+
+# Function: Get Secret
+def get_secret(name, default=None):
+    """
+    Returns an optional secret, or `default` when it isn't configured.
+    """
+    try:
+        return get_registry().secrets_source()[name]
+    except (KeyError, FileNotFoundError):
+        return default
+
+# Function: Pooled LLM
+def get_llm(role=None):
+    """
+    Cached Gemini LLM for `role`, reusing the provider client across runs.
+    """
+    from utils.llm_cache import build_cached_llm  # Imported here to keep page imports light
+
+    name = f"llm:{role or 'default'}"
+    registry = get_registry()
+    registry.register(
+        name,
+        lambda GEMINI_API_KEY: build_cached_llm(GEMINI_API_KEY, role=role),
+        secrets=("GEMINI_API_KEY",)
+    )
+    return registry.get(name)
+
+# Function: Pooled Search Tool
+def get_search_tool(n_results=5):
+    """
+    Cached Serper search tool returning `n_results` results, sharing one HTTP connection pool.
+    """
+    from tools.cached_search_tool import CachedSerperDevTool
+
+    name = f"serper:{n_results}"
+    registry = get_registry()
+    registry.register(
+        name,
+        lambda SERPER_API_KEY: CachedSerperDevTool(api_key=SERPER_API_KEY, n_results=n_results),
+        secrets=("SERPER_API_KEY",)
+    )
+    return registry.get(name)
+
+# Function: Pooled Crawl Tool
+def get_crawl_tool():
+    """
+    Site crawler tool (no credentials).
+    """
+    from tools.site_crawler_tool import SiteCrawlerTool
+
+    registry = get_registry()
+    registry.register("site_crawler", lambda: SiteCrawlerTool())
+    return registry.get("site_crawler")
+
+# Function: Pooled BigQuery Tool
+def get_bigquery_tool():
+    """
+    BigQuery tool; rebuilt when the project, the credentials path or the credentials file changes.
+    """
+    from crewai_tools import QueryBigQueryTool  # Tool for connecting and querying BigQuery
+
+    def build(BIGQUERY_PROJECT_ID, BIGQUERY_CREDENTIALS_PATH):
+        tool = QueryBigQueryTool(
+            project_id=BIGQUERY_PROJECT_ID,  # Project ID from secrets
+            credentials_path=BIGQUERY_CREDENTIALS_PATH  # Credentials file path
+        )
+        credentials_mtime[0] = os.path.getmtime(BIGQUERY_CREDENTIALS_PATH)
+        return tool
+
+    def healthy(tool):
+        # Rotated or removed credentials file -> rebuild on next use
+        path = get_registry().secrets_source()["BIGQUERY_CREDENTIALS_PATH"]
+        return os.path.isfile(path) and os.path.getmtime(path) == credentials_mtime[0]
+
+    credentials_mtime = [None]
+    registry = get_registry()
+    registry.register("bigquery", build, ("BIGQUERY_PROJECT_ID", "BIGQUERY_CREDENTIALS_PATH"), healthy)
+    return registry.get("bigquery")
+
+# Function: Pooled BigQuery Client
+def get_bigquery_client():
+    """
+    google-cloud-bigquery client with its HTTP connection pool, or None when BigQuery isn't configured.
+    """
+    if not (get_secret("BIGQUERY_PROJECT_ID") and get_secret("BIGQUERY_CREDENTIALS_PATH")):
+        return None
+
+    def build(BIGQUERY_PROJECT_ID, BIGQUERY_CREDENTIALS_PATH):
+        from google.cloud import bigquery  # BigQuery client library
+
+        return bigquery.Client.from_service_account_json(BIGQUERY_CREDENTIALS_PATH, project=BIGQUERY_PROJECT_ID)
+
+    registry = get_registry()
+    registry.register(
+        "bigquery_client", build, ("BIGQUERY_PROJECT_ID", "BIGQUERY_CREDENTIALS_PATH"),
+        lambda client: os.path.isfile(get_secret("BIGQUERY_CREDENTIALS_PATH", ""))
+    )
+    return registry.get("bigquery_client")
+
+# End of file: utils/registry.py
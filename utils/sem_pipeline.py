@@ -0,0 +1,446 @@
+###############################################
+# SEM Pipeline
+# File: utils/sem_pipeline.py
+# Purpose: Crew runs for each SEM stage and the full plan wired as a dependency graph
+###############################################
+
+# Import required libraries
+# Agents, tasks, CrewAI and the analysis tools are imported inside each stage so a page
+# only loads the stack of the stage it runs, and only once a run starts.
+
+from utils.agent_memory import memory_tenant  # Agent memory namespace of each client
+from utils.artifact_store import get_artifact_store, source_version  # Stored stage results
+from utils.job_runner import crew_callbacks  # Progress and cancellation hooks
+from utils.orchestrator import PipelineOrchestrator, Stage  # DAG execution
+from utils.sqlite_cache import make_key  # Stable keys for stored website analyses
+from utils.telemetry import register_event_handlers, span  # Run, stage and crew spans
+
+# Competitor-only keywords from the website stage added to the discovery seeds
+MAX_GAP_SEEDS = 10
+
+# Bump to invalidate every stored stage artifact (e.g. after changing this module's stage wiring)
+ARTIFACT_VERSION = 1
+
+# Pipeline inputs each stage's result depends on (upstream results are covered by their artifact keys)
+STAGE_READS = {
+    "business": ("business_name", "product_service", "target_audience"),
+    "website": ("our_url", "competitor_urls"),
+    "keyword_data": ("keywords",),
+    "keyword_discovery": ("keywords",),
+    "keyword_trend": ("keywords",),
+    "keyword_categorization": ("keywords",),
+    "ad_copy": ("keywords", "ad_variants"),
+}
+
+# Source files of each stage's code and prompts; editing one re-runs that stage and its downstream stages
+LLM_SOURCES = ("utils/prompt_compaction.py",)
+STAGE_SOURCES = {
+    "business": ("agents/agent_01_business_analyst.py", "tasks/task_01_business_analyst.py") + LLM_SOURCES,
+    "website": (
+        "agents/agent_02_website_analyst.py", "tasks/task_02_website_analyst.py", "tools/seo_extractor.py",
+        "tools/site_crawler_tool.py", "tools/snapshot_store.py", "tools/tfidf_engine.py", "tools/thai_tokenizer.py",
+    ) + LLM_SOURCES,
+    "keyword_data": ("tools/keyword_store.py", "tools/trend_engine.py", "tools/keyword_normalizer.py"),
+    "keyword_discovery": ("agents/agent_03_keyword_planner.py", "tasks/task_03_keyword_planner.py") + LLM_SOURCES,
+    "keyword_trend": ("agents/agent_03_keyword_planner.py", "tasks/task_03_keyword_planner.py") + LLM_SOURCES,
+    "keyword_categorization": (
+        "agents/agent_03_keyword_planner.py", "tasks/task_03_keyword_planner.py", "tools/keyword_clustering.py",
+    ) + LLM_SOURCES,
+    "ad_copy": ("agents/agent_04_adcopywriter.py", "tasks/task_04_adcopy_writer.py", "tools/ad_copy.py") + LLM_SOURCES,
+    "full_plan": ("agents/agent_04_adcopywriter.py", "tasks/task_04_adcopy_writer.py") + LLM_SOURCES,
+}
+
+# Seconds a stored result stays valid for stages reading live data (others: until their inputs change)
+STAGE_MAX_AGE = {"website": 24 * 3600, "keyword_data": 24 * 3600}
+
+# Class: Stage Job
+class StageJob:
+    """
+    View of a job for one stage running in parallel with others:
+    - Messages are prefixed with the stage name; overall progress is left to the pipeline.
+    - Cancellation still applies to the whole job.
+    """
+
+    def __init__(self, job, stage):
+        """
+        Wrap `job` for the stage named `stage`.
+        """
+        self.job = job
+        self.stage = stage
+
+    def check_cancelled(self):
+        """
+        Raises JobCancelled if the whole job was cancelled.
+        """
+        self.job.check_cancelled()
+
+    def update(self, progress=None, message=None):
+        """
+        Reports the stage's latest message on the job.
+        """
+        if message is not None:
+            self.job.update(message=f"{self.stage}: {message}")
+
+# Function: Stage Version
+def stage_version(name):
+    """
+    Version of a stage's code and prompts: ARTIFACT_VERSION plus a hash of its source files.
+    """
+    return f"{ARTIFACT_VERSION}:{source_version(*STAGE_SOURCES.get(name, ()))}"
+
+# Function: Split Keywords
+def split_keywords(query_input):
+    """
+    Turns comma-separated user input into a keyword list.
+    """
+    return [keyword.strip() for keyword in query_input.split(",") if keyword.strip()]
+
+# Function: Run Crew
+def run_crew(job, agents, tasks):
+    """
+    Runs `tasks` with progress/cancellation hooks and returns the CrewOutput.
+    """
+    from crewai import Crew  # CrewAI framework for handling agents and tasks
+
+    register_event_handlers()  # Agent step and tool call spans
+    step_callback, task_callback = crew_callbacks(job, total_tasks=len(tasks))
+    crew = Crew(
+        agents=agents,
+        tasks=tasks,
+        verbose=True,
+        step_callback=step_callback,
+        task_callback=task_callback
+    )
+    with span("crew.kickoff", {
+        "sem.crew.agents": [agent.role for agent in agents],
+        "sem.crew.tasks": len(tasks),
+    }) as crew_span:
+        output = crew.kickoff()
+        usage = output.token_usage
+        crew_span.set_attribute("gen_ai.usage.input_tokens", getattr(usage, "prompt_tokens", None) or None)
+        crew_span.set_attribute("gen_ai.usage.output_tokens", getattr(usage, "completion_tokens", None) or None)
+        return output
+
+# Function: Business Analysis Job
+def business_analysis_job(job, business_name, product_service, target_audience):
+    """
+    Builds the Business Analyst crew and runs it.
+    Returns plain data so results can be rendered after any rerun.
+    """
+    from agents.agent_01_business_analyst import BusinessAnalystAgents
+    from tasks.task_01_business_analyst import create_business_analyst_tasks
+
+    # Step 1: Create agents for research and writing tasks
+    senior_research_business_analyst, senior_writer_business_analyst = BusinessAnalystAgents().create_agents()
+
+    # Step 2: Create tasks using the agents
+    research_task, writing_task = create_business_analyst_tasks(
+        senior_research_business_analyst,
+        senior_writer_business_analyst,
+        business_name,
+        product_service,
+        target_audience
+    )
+
+    # Step 3: Execute tasks
+    results = run_crew(
+        job, [senior_research_business_analyst, senior_writer_business_analyst], [research_task, writing_task]
+    )
+
+    return {
+        "research_description": research_task.description,
+        "writing_description": writing_task.description,
+        "outputs": [output.raw for output in results.tasks_output],
+    }
+
+# Function: Website Analysis Job
+def website_analysis_job(job, our_url, competitor_urls):
+    """
+    Crawls and extracts all sites, then runs the Web Analyst crew.
+    Re-crawls use conditional GETs against the snapshot store; when no page was added,
+    removed or materially changed since the last analysis by the same stage version,
+    that analysis is returned without calling the LLM, otherwise the prompt includes a
+    summary of what changed.
+    Returns plain data so results can be rendered after any rerun.
+    """
+    from agents.agent_02_website_analyst import WebsiteAnalystAgents
+    from tasks.task_02_website_analyst import WebsiteAnalystTasks
+    from tools.embedding_service import get_embedding_service  # Cached keyword embeddings
+    from tools.seo_extractor import (  # Local SEO extraction
+        compare_sites, extract_sites, format_summary, keyword_texts, semantic_keyword_gaps
+    )
+    from tools.snapshot_store import (  # Crawl snapshots
+        analysis_basis, format_changes, get_snapshot_store, summarize_changes
+    )
+
+    competitor_url = competitor_urls[0]
+    all_urls = [our_url, *competitor_urls]
+    snapshots = get_snapshot_store()
+    analysis_key = make_key(our_url, competitor_urls, stage_version("website"))
+
+    # Step 1: Crawl all sites concurrently (conditional GETs) and extract SEO metadata locally
+    job.update(message="Crawling websites and extracting metadata...")
+    sites = extract_sites(all_urls, snapshots=snapshots)
+    fingerprints = {url: snapshots.fingerprints(url) for url in all_urls}
+    job.check_cancelled()
+
+    # Changes are measured against the pages the previous analysis was built from;
+    # while none is material, that analysis still holds
+    previous = snapshots.last_analysis(analysis_key)
+    changes = summarize_changes(sites, fingerprints, previous["basis"] if previous else None)
+    if previous is not None and not changes["material"]:
+        return {**previous["result"], "changes": changes["sites"], "reused_analysis": True}
+
+    comparison = compare_sites(sites[our_url], sites[competitor_url])
+    comparison["semantic_gaps"] = semantic_keyword_gaps(comparison, get_embedding_service())
+    seo_summary = format_summary(comparison)
+    if previous is not None:
+        seo_summary += "\n\n" + format_changes(changes)
+    job.check_cancelled()
+
+    # Step 2: Create agents and tasks
+    agent = WebsiteAnalystAgents().web_analyst_agent()
+    tasks = WebsiteAnalystTasks()
+    analysis_task = tasks.website_analysis_task(agent, our_url, competitor_url, seo_summary)
+
+    # Keyword similarity against every competitor in one TF-IDF pass
+    site_texts = {url: [text for page in pages for text in keyword_texts(page)] for url, pages in sites.items()}
+    similarity_task = tasks.keyword_similarity_task(
+        agent, site_texts[our_url], {url: site_texts[url] for url in competitor_urls}
+    )
+
+    # Step 3: Execute tasks
+    results = run_crew(job, [agent], [analysis_task, similarity_task])
+
+    result = {
+        "seo_summary": seo_summary,
+        "keyword_gaps": comparison["semantic_gaps"],
+        "outputs": [output.raw for output in results.tasks_output],
+    }
+    snapshots.save_analysis(analysis_key, result, analysis_basis(sites, fingerprints))
+    return {**result, "changes": changes["sites"], "reused_analysis": False}
+
+# Function: Keyword Data Job
+def keyword_data_job(job, keywords, top_n=200):
+    """
+    Loads the keyword slice for `keywords` once (local Parquet cache, BigQuery on a miss)
+    and returns what the keyword tasks need, or None when no keyword source is configured.
+    Near-duplicate keywords are collapsed; "variants" maps canonical keywords to their spellings.
+    """
+    from tools.keyword_store import collapse_metrics, format_keyword_table, get_keyword_store, keyword_metrics
+    from tools.keyword_normalizer import collapse_keywords  # Near-duplicate keyword collapsing
+    from tools.trend_engine import analyze_frame, format_trend_summary  # Batched trend statistics
+
+    store = get_keyword_store()
+    if store is None:
+        return None
+    job.update(message="Loading keyword data...")
+    frame = store.slice(keywords)
+    if frame.empty:
+        return None
+    metrics = keyword_metrics(frame)
+    trends, account_seasonal, months = analyze_frame(frame)  # Every keyword in the slice, one pass
+
+    # Near-duplicate variants collapse into their highest-volume spelling; their metrics are
+    # re-aggregated (volumes summed) before ranking, so a split keyword isn't under-ranked
+    collapsed = collapse_keywords(metrics["keyword"], dict(zip(metrics["keyword"], metrics["avg_volume"])))
+    metrics = collapse_metrics(metrics, collapsed["mapping"]).head(top_n)
+    keywords = metrics["keyword"].tolist()
+    return {
+        "keywords": keywords,
+        "volumes": dict(zip(keywords, metrics["avg_volume"].astype(float))),
+        "variants": {keyword: collapsed["variants"][keyword] for keyword in keywords if len(collapsed["variants"][keyword]) > 1},
+        "metrics_table": format_keyword_table(metrics),
+        "trend_summary": format_trend_summary(trends, account_seasonal, months),
+    }
+
+# Function: Keyword Task Job
+def keyword_task_job(job, build_task):
+    """
+    Runs a single Keyword Planner task; `build_task(tasks, agent)` creates it.
+    """
+    from agents.agent_03_keyword_planner import KeywordPlannerAgents
+    from tasks.task_03_keyword_planner import KeywordPlannerTasks
+
+    agent = KeywordPlannerAgents().keyword_planner_agent()
+    return run_crew(job, [agent], [build_task(KeywordPlannerTasks(), agent)]).raw
+
+# Function: Ad Copy Job
+def ad_copy_job(job, business_analysis=None, website_analysis=None, keyword_plan=None, keywords=None, variants=None):
+    """
+    Runs the Ad Copywriter on whatever upstream outputs are available, then checks every line
+    locally and regenerates only the failing ones in small follow-up calls.
+    Returns {"variants", "markdown", "issues", "repair_calls"}.
+    """
+    from agents.agent_04_adcopywriter import AdcopyWriterAgents
+    from tasks.task_04_adcopy_writer import AdCopyWriterTasks
+    from tools.ad_copy import DEFAULT_VARIANTS, format_ads, parse_ad_copy, repair_ads  # Schema and validator
+
+    variants = variants or DEFAULT_VARIANTS
+    keywords = keywords or []
+    agent = AdcopyWriterAgents().adcopy_writer_agent()
+    task = AdCopyWriterTasks().ad_copywriter_task(
+        agent, business_analysis, website_analysis, keyword_plan, keywords=keywords, variants=variants
+    )
+    raw = run_crew(job, [agent], [task]).raw
+
+    job.update(message="Checking ad lengths, keywords and duplicates...")
+    ad_set, issues, repair_calls = repair_ads(agent.llm, parse_ad_copy(raw, variants), keywords)
+    return {
+        "variants": ad_set.model_dump()["variants"],
+        "markdown": format_ads(ad_set),
+        "issues": issues,
+        "repair_calls": repair_calls,
+    }
+
+# Function: Full Planner Job
+def full_planner_job(job, business_analysis=None, website_analysis=None, keyword_plan=None, ad_copy=None):
+    """
+    Compiles the final SEM planner report from all stage outputs.
+    """
+    from agents.agent_04_adcopywriter import AdcopyWriterAgents
+    from tasks.task_04_adcopy_writer import AdCopyWriterTasks
+
+    agent = AdcopyWriterAgents().adcopy_writer_agent()
+    task = AdCopyWriterTasks().full_planner_task(agent, business_analysis, website_analysis, keyword_plan, ad_copy)
+    return run_crew(job, [agent], [task]).raw
+
+# Function: Stage Reports
+def business_report(result):
+    """
+    Final report text of a business analysis result.
+    """
+    return result["outputs"][-1] if result else None
+
+def website_report(result):
+    """
+    Combined analysis text of a website analysis result.
+    """
+    return "\n\n".join(result["outputs"]) if result else None
+
+def keyword_report(categorization, trend):
+    """
+    Combined keyword plan text from the categorization and trend stages.
+    """
+    return "\n\n".join(text for text in (categorization, trend) if text) or None
+
+def ad_copy_report(result):
+    """
+    Markdown rendering of an ad copy result.
+    """
+    return result["markdown"] if result else None
+
+# Function: Build SEM Pipeline
+def build_sem_pipeline(job, inputs):
+    """
+    Wires the stages that `inputs` allow into a dependency graph:
+    - business, website and keyword_data have no dependencies and run concurrently.
+    - keyword_data fetches the topic's keyword slice once; every keyword task is served from it.
+    - keyword_trend starts as soon as the data is loaded;
+      keyword_discovery also waits for the website's keyword gaps (if a website is given);
+      keyword_categorization waits for discovery.
+    - ad_copy waits for every analysis stage; full_plan runs last.
+    - Seeds, discovery queries and the keywords to categorize are collapsed to canonical
+      keywords first (spacing, tone-mark, transliteration and word-order variants).
+    Expected inputs: keywords (for the keyword stages), plus optionally
+    business_name/product_service/target_audience, our_url/competitor_urls and ad_variants.
+    """
+    from tools.keyword_normalizer import collapse_keywords  # Near-duplicate keyword collapsing
+
+    seeds = collapse_keywords(split_keywords(inputs.get("keywords") or ""))["keywords"]
+    has_business = all(inputs.get(key) for key in ("business_name", "product_service", "target_audience"))
+    has_website = bool(inputs.get("our_url") and inputs.get("competitor_urls"))
+    stages = []
+
+    def stage(name, fn, depends_on=()):
+        def run(params, upstream):
+            with span("stage", {"sem.stage": name, "sem.stage.depends_on": list(depends_on)}):
+                return fn(StageJob(job, name), upstream)
+        stages.append(Stage(
+            name, run, depends_on, reads=STAGE_READS.get(name, ()), version=stage_version(name), max_age=STAGE_MAX_AGE.get(name)
+        ))
+
+    if has_business:
+        stage("business", lambda stage_job, upstream: business_analysis_job(
+            stage_job, inputs["business_name"], inputs["product_service"], inputs["target_audience"]
+        ))
+    if has_website:
+        stage("website", lambda stage_job, upstream: website_analysis_job(
+            stage_job, inputs["our_url"], inputs["competitor_urls"]
+        ))
+
+    stage("keyword_data", lambda stage_job, upstream: keyword_data_job(stage_job, seeds))
+
+    def discovery(stage_job, upstream):
+        gaps = upstream["website"]["keyword_gaps"][:MAX_GAP_SEEDS] if "website" in upstream else []
+        query = ", ".join(collapse_keywords(seeds + gaps)["keywords"])
+        data = upstream["keyword_data"] or {}
+        return keyword_task_job(stage_job, lambda tasks, agent: tasks.keyword_discovery_task(
+            agent, query, keyword_data=data.get("metrics_table")
+        ))
+
+    def trend(stage_job, upstream):
+        data = upstream["keyword_data"] or {}
+        return keyword_task_job(stage_job, lambda tasks, agent: tasks.keyword_trend_analysis_task(
+            agent, inputs["keywords"], trend_data=data.get("trend_summary")
+        ))
+
+    def categorization(stage_job, upstream):
+        data = upstream["keyword_data"] or {}
+        collapsed = collapse_keywords(seeds + data.get("keywords", []), data.get("volumes"))
+        return keyword_task_job(stage_job, lambda tasks, agent: tasks.keyword_categorization_task(
+            agent, collapsed["keywords"], volumes=collapsed.get("volumes"), discovery_report=upstream["keyword_discovery"]
+        ))
+
+    stage("keyword_discovery", discovery, ["keyword_data"] + ["website"] * has_website)
+    stage("keyword_trend", trend, ["keyword_data"])
+    stage("keyword_categorization", categorization, ["keyword_data", "keyword_discovery"])
+
+    def upstream_reports(upstream):
+        return (
+            business_report(upstream.get("business")),
+            website_report(upstream.get("website")),
+            keyword_report(upstream.get("keyword_categorization"), upstream.get("keyword_trend")),
+        )
+
+    analysis_stages = ["business"] * has_business + ["website"] * has_website
+    analysis_stages += ["keyword_categorization", "keyword_trend"]
+    stage("ad_copy", lambda stage_job, upstream: ad_copy_job(
+        stage_job, *upstream_reports(upstream), keywords=seeds, variants=inputs.get("ad_variants")
+    ), analysis_stages)
+    stage("full_plan", lambda stage_job, upstream: full_planner_job(
+        stage_job, *upstream_reports(upstream), ad_copy_report(upstream["ad_copy"])
+    ), analysis_stages + ["ad_copy"])
+
+    return PipelineOrchestrator(stages, max_workers=len(stages))
+
+# Function: SEM Plan Job
+def sem_plan_job(job, inputs, only=None, completed=None, on_stage_done=None, reuse=True):
+    """
+    Runs the SEM pipeline (or only the stages in `only` and what they depend on)
+    and returns {stage: result} plus per-stage timings and the reused stages.
+    Stages found in `completed` or, with `reuse`, in the artifact store (same inputs, upstream
+    artifacts and code/prompt version) are not recomputed, and neither are the stages only they need.
+    `on_stage_done(name, result)` sees each new result.
+    Agents share the memory of the client (business name, else website) and no other; runs without either use no memory.
+    """
+    pipeline = build_sem_pipeline(job, inputs)
+    artifacts = get_artifact_store() if reuse else None
+    plan = pipeline.plan(inputs, only, completed, artifacts)
+    finished = sorted(plan["results"])
+    total = len(plan["results"]) + len(plan["pending"])
+
+    def stage_done(name, result):
+        finished.append(name)
+        job.update(progress=len(finished) / total, message=f"Finished {name} ({len(finished)} of {total} stages).")
+        if on_stage_done is not None:
+            on_stage_done(name, result)
+
+    with span("sem_plan", {"sem.stages": sorted(plan["pending"]), "sem.reused_stages": sorted(plan["results"])}):
+        with memory_tenant(inputs.get("business_name") or inputs.get("our_url")):
+            results = pipeline.run(inputs, on_stage_done=stage_done, artifacts=artifacts, plan=plan)
+    results["timings"] = pipeline.timings
+    results["reused"] = pipeline.reused
+    return results
+
+# End of file: utils/sem_pipeline.py
@@ -0,0 +1,202 @@
+###############################################
+# SQLite Cache
+# File: utils/sqlite_cache.py
+# Purpose: Persistent key-value cache with TTL, LRU eviction and hit/miss counters
+###############################################
+
+# Import required libraries
+import hashlib  # Content-addressed cache keys
+import json  # Serialize keys and cached values
+import sqlite3  # On-disk storage (pysqlite3 when the compatibility fix is applied)
+import threading  # Serialize access from concurrent Streamlit sessions
+import time  # Timestamps for TTL and LRU bookkeeping
+
+from utils.paths import cache_path  # Location of local cache files
+
+# Keys per query in batched lookups (below SQLite's bound-parameter limit)
+SQLITE_BATCH = 500
+
+# Function: Build Cache Key
+def make_key(*parts):
+    """
+    Builds a stable SHA-256 key from JSON-serializable parts:
+    - Dictionaries are serialized with sorted keys so ordering never changes the key.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Class: SQLite Cache
+class SQLiteCache:
+    """
+    Stores JSON values on disk in SQLite:
+    1. Entries older than `ttl` seconds are treated as misses and removed.
+    2. Least recently used entries are evicted beyond `max_entries` or `max_bytes`.
+    3. Hit and miss counters are kept for the lifetime of the process.
+    """
+
+    def __init__(self, filename, table="cache", ttl=7 * 24 * 3600, max_entries=5000, max_bytes=200 * 1024 * 1024):
+        """
+        Open (or create) the cache database and its table.
+        """
+        self.path = cache_path(filename)  # Database file inside the cache directory
+        self.table = table  # Table name, so several caches can share one file
+        self.ttl = ttl  # Time-to-live in seconds (None disables expiry)
+        self.max_entries = max_entries  # Upper bound on stored entries
+        self.max_bytes = max_bytes  # Upper bound on stored payload size
+        self.hits = 0  # Lookups answered from the cache
+        self.misses = 0  # Lookups that fell through to the caller
+        self._lock = threading.Lock()
+
+        # Autocommit connection shared by all threads (guarded by the lock)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_lru ON {self.table} (accessed_at)")
+
+    def get(self, key, default=None, ttl=None):
+        """
+        Returns the cached value for `key`, or `default` on a miss or expired entry.
+        `ttl` overrides the cache-wide time-to-live for this lookup.
+        """
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            # Miss: nothing stored or the entry outlived its TTL
+            if row is None or (ttl is not None and now - row[1] > ttl):
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return default
+
+            # Hit: refresh the LRU timestamp
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """
+        Stores a JSON-serializable value and evicts old entries if the cache is over budget.
+        """
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict()
+
+    def get_many(self, keys, ttl=None):
+        """
+        Batched get: returns {key: value} for the keys found and still fresh,
+        in one query per SQLITE_BATCH keys.
+        """
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        keys = list(dict.fromkeys(keys))
+        found, expired = {}, []
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_BATCH):
+                batch = keys[start:start + SQLITE_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if ttl is not None and now - created_at > ttl:
+                        expired.append((key,))
+                    else:
+                        found[key] = value
+            with self._conn:  # One transaction for the whole batch
+                self._conn.execute("BEGIN")
+                self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", expired)
+                self._conn.executemany(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", [(now, key) for key in found])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def set_many(self, items):
+        """
+        Batched set of {key: value}, with a single eviction pass afterwards.
+        """
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            payload = json.dumps(value, ensure_ascii=False)
+            rows.append((key, payload, len(payload), now, now))
+        with self._lock:
+            with self._conn:  # One transaction for the whole batch
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            self._evict()
+
+    def delete(self, key):
+        """
+        Removes a single entry.
+        """
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters.
+        """
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        Returns hit/miss counters and current size of the cache.
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def _evict(self):
+        """
+        Drops expired entries, then least recently used ones until within budget.
+        Caller must hold the lock.
+        """
+        if self.ttl is not None:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,))
+
+        entries, size = self._conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+
+        # Walk entries from least to most recently used and drop until within budget
+        doomed = []
+        rows = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC")
+        for key, entry_size in rows:
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            doomed.append((key,))
+            entries -= 1
+            size -= entry_size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+
+# End of file: utils/sqlite_cache.py
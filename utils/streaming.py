@@ -0,0 +1,163 @@
+###############################################
+# Streaming
+# File: utils/streaming.py
+# Purpose: Routes LLM tokens and agent/task/tool step events of a run to the page showing it
+###############################################
+
+# Import required libraries
+import contextvars  # Per-run channel, propagated into CrewAI event handlers
+import threading  # Condition variable for live followers
+import time  # Follow deadlines
+from contextlib import contextmanager  # bind() helper
+
+# Channel of the run executing in the current context (set by bind())
+_current_channel = contextvars.ContextVar("sem_stream_channel", default=None)
+_handlers_registered = False
+_handlers_lock = threading.Lock()
+
+# Class: Stream Channel
+class StreamChannel:
+    """
+    Append-only log of streamed text for one run:
+    - Any number of followers can read it from the start (reruns don't lose tokens).
+    - `agent` and `task` tell the page what is running right now.
+    """
+
+    def __init__(self):
+        """
+        Create an empty, open channel.
+        """
+        self.agent = None  # Role of the agent currently running
+        self.task = None  # Short description of the task currently running
+        self.closed = False
+        self._chunks = []
+        self._condition = threading.Condition()
+
+    @property
+    def text(self):
+        """
+        Everything streamed so far.
+        """
+        with self._condition:
+            return "".join(self._chunks)
+
+    def write(self, text):
+        """
+        Appends streamed text and wakes up followers.
+        """
+        if not text:
+            return
+        with self._condition:
+            self._chunks.append(text)
+            self._condition.notify_all()
+
+    def start_stage(self, agent, task):
+        """
+        Records the agent/task now running and writes a heading into the stream.
+        """
+        self.agent, self.task = agent, task
+        self.write(f"\n\n#### 🤖 {agent}: {task}\n\n")
+
+    def close(self):
+        """
+        Marks the run as finished.
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def follow(self, timeout):
+        """
+        Generator for st.write_stream: yields everything so far, then new text
+        as it arrives, until the channel closes or `timeout` seconds pass.
+        """
+        deadline = time.monotonic() + timeout
+        position = 0
+        while True:
+            with self._condition:
+                while position >= len(self._chunks) and not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+                chunks = self._chunks[position:]
+                position += len(chunks)
+                finished = self.closed
+            if chunks:
+                yield "".join(chunks)
+            if finished:
+                return
+
+# Function: Current Channel
+def current_channel():
+    """
+    Returns the channel bound to the current run, or None outside a streamed run.
+    """
+    return _current_channel.get()
+
+# Function: Bind Channel
+@contextmanager
+def bind(channel):
+    """
+    Routes stream events emitted inside the block to `channel` and closes it afterwards.
+    """
+    register_event_handlers()
+    token = _current_channel.set(channel)
+    try:
+        yield channel
+    finally:
+        _current_channel.reset(token)
+        channel.close()
+
+# Function: Task Label
+def task_label(task, limit=80):
+    """
+    Short label for a task: its name, or the first line of its description.
+    """
+    if task is None:
+        return "Working"
+    label = getattr(task, "name", None) or next(
+        (line.strip() for line in (task.description or "").splitlines() if line.strip()), "Task"
+    )
+    return label if len(label) <= limit else label[:limit - 1] + "…"
+
+# Function: Register Event Handlers
+def register_event_handlers():
+    """
+    Subscribes once to the CrewAI event bus. Handlers look up the channel through
+    the context variable, which CrewAI carries into its handler threads.
+    CrewAI is imported here, on the first run, so pages render without loading it.
+    """
+    global _handlers_registered
+    with _handlers_lock:
+        if _handlers_registered:
+            return
+
+        from crewai.events import (  # CrewAI event bus and event types
+            AgentExecutionStartedEvent,
+            LLMStreamChunkEvent,
+            ToolUsageStartedEvent,
+            crewai_event_bus,
+        )
+
+        @crewai_event_bus.on(AgentExecutionStartedEvent)
+        def on_agent_started(source, event):
+            channel = current_channel()
+            if channel is not None:
+                channel.start_stage(event.agent.role, task_label(event.task))
+
+        @crewai_event_bus.on(ToolUsageStartedEvent)
+        def on_tool_started(source, event):
+            channel = current_channel()
+            if channel is not None:
+                channel.write(f"\n\n> 🔧 Using tool: {event.tool_name}\n\n")
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def on_stream_chunk(source, event):
+            channel = current_channel()
+            if channel is not None:
+                channel.write(event.chunk)
+
+        _handlers_registered = True
+
+# End of file: utils/streaming.py
@@ -0,0 +1,426 @@
+###############################################
+# Telemetry
+# File: utils/telemetry.py
+# Purpose: Structured spans for runs, stages, crews, agent steps, LLM calls and tool calls,
+#          stored locally in an OpenTelemetry-compatible shape
+###############################################
+
+# Import required libraries
+import contextvars  # Current span, propagated into stage threads and CrewAI event handlers
+import json  # Attribute and OTLP JSON serialization
+import os  # Sink configuration
+import secrets  # Trace and span IDs
+import sqlite3  # Span store (pysqlite3 when the compatibility fix is applied)
+import threading  # Serialize sink writes from parallel stages
+import time  # Span timestamps
+from contextlib import contextmanager  # span() helper
+
+from utils.paths import cache_path  # Location of the span store
+
+# Resource attributes attached to every exported span
+SERVICE_NAME = "sem-planner"
+
+# Span store inside the cache directory; spans older than the retention are pruned
+TRACE_DB = "traces.sqlite3"
+RETENTION_DAYS = 30
+
+# Attributes children inherit from their parent span (used to group spans per run and stage)
+INHERITED_ATTRIBUTES = ("sem.job", "sem.stage")
+
+# OTLP enum names
+SPAN_KINDS = {"INTERNAL": "SPAN_KIND_INTERNAL", "CLIENT": "SPAN_KIND_CLIENT"}
+STATUS_CODES = {"OK": "STATUS_CODE_OK", "ERROR": "STATUS_CODE_ERROR"}
+
+# Span of the code executing in the current context
+_current_span = contextvars.ContextVar("sem_current_span", default=None)
+
+# Provider usage collector of the LLM call running in the current context
+_current_usage = contextvars.ContextVar("sem_current_usage", default=None)
+_handlers_registered = False
+_handlers_lock = threading.Lock()
+
+# Class: Span
+class Span:
+    """
+    One timed operation, modelled on the OpenTelemetry span:
+    - Trace and span IDs are hex strings; the parent links spans of one run into a tree.
+    - `end()` exports the span once; later attribute changes are ignored.
+    """
+
+    def __init__(self, name, kind="INTERNAL", parent=None, attributes=None, start_ns=None):
+        """
+        Start a span, as a child of `parent` when given.
+        """
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = {key: parent.attributes[key] for key in INHERITED_ATTRIBUTES if parent and key in parent.attributes}
+        self.attributes.update({key: value for key, value in (attributes or {}).items() if value is not None})
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.status = "OK"
+        self.status_message = None
+
+    def set_attribute(self, key, value):
+        """
+        Sets one attribute (None values are skipped).
+        """
+        if value is not None:
+            self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        """
+        Increments a counter attribute, e.g. retries or bytes.
+        """
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def end(self, status="OK", message=None, end_ns=None):
+        """
+        Ends the span and hands it to the tracer's sinks.
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        self.status, self.status_message = status, message
+        get_tracer().export(self)
+
+    @property
+    def duration_ms(self):
+        """
+        Duration in milliseconds (None while the span is open).
+        """
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self):
+        """
+        The span in OTLP/JSON form.
+        """
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, "SPAN_KIND_INTERNAL"),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": STATUS_CODES[self.status]},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+# Function: OTLP Value
+def otlp_value(value):
+    """
+    Wraps an attribute value in its OTLP/JSON type.
+    """
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+# Class: SQLite Span Sink
+class SQLiteSpanSink:
+    """
+    Stores finished spans in SQLite for the metrics page; attributes are kept as JSON.
+    """
+
+    def __init__(self, filename=TRACE_DB, retention_days=RETENTION_DAYS):
+        """
+        Open (or create) the span table and prune spans past the retention period.
+        """
+        self.path = cache_path(filename)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # The metrics page reads while runs write
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spans ("
+            "span_id TEXT PRIMARY KEY, trace_id TEXT NOT NULL, parent_span_id TEXT, name TEXT NOT NULL, "
+            "kind TEXT NOT NULL, stage TEXT, start_ns INTEGER NOT NULL, end_ns INTEGER NOT NULL, "
+            "duration_ms REAL NOT NULL, status TEXT NOT NULL, attributes TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS spans_start ON spans (start_ns)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS spans_trace ON spans (trace_id)")
+        self._conn.execute("DELETE FROM spans WHERE start_ns < ?", (time.time_ns() - retention_days * 86400 * 10**9,))
+
+    def export(self, span):
+        """
+        Inserts one finished span.
+        """
+        row = (
+            span.span_id, span.trace_id, span.parent_span_id, span.name, span.kind,
+            span.attributes.get("sem.stage") or span.attributes.get("sem.job"),
+            span.start_ns, span.end_ns, span.duration_ms, span.status,
+            json.dumps(span.attributes, ensure_ascii=False, default=str),
+        )
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def query(self, since_ns=0, names=None):
+        """
+        Returns finished spans started after `since_ns` (optionally only `names`) as dicts.
+        """
+        sql = "SELECT trace_id, span_id, parent_span_id, name, kind, stage, start_ns, end_ns, duration_ms, status, attributes FROM spans WHERE start_ns >= ?"
+        params = [since_ns]
+        if names:
+            sql += f" AND name IN ({', '.join('?' * len(names))})"
+            params += list(names)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY start_ns", params).fetchall()
+        columns = ("trace_id", "span_id", "parent_span_id", "name", "kind", "stage", "start_ns", "end_ns", "duration_ms", "status")
+        return [dict(zip(columns, row[:-1]), attributes=json.loads(row[-1])) for row in rows]
+
+# Class: JSONL Span Sink
+class JsonlSpanSink:
+    """
+    Appends each span as one OTLP/JSON line (`resourceSpans` envelope), the format read
+    by the OpenTelemetry Collector's file receivers.
+    """
+
+    def __init__(self, path):
+        """
+        Append to `path`.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        """
+        Writes one span.
+        """
+        record = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "sem_planner"}, "spans": [span.to_otlp()]}],
+        }]}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+# Class: Tracer
+class Tracer:
+    """
+    Fans finished spans out to the configured sinks. A failing sink never fails the run.
+    """
+
+    def __init__(self, sinks):
+        """
+        Use `sinks` (objects with `export(span)`).
+        """
+        self.sinks = list(sinks)
+        self.dropped = 0  # Spans a sink failed to write
+
+    def export(self, span):
+        """
+        Sends a finished span to every sink.
+        """
+        for sink in self.sinks:
+            try:
+                sink.export(span)
+            except Exception:
+                self.dropped += 1
+
+    def query(self, since_ns=0, names=None):
+        """
+        Reads spans back from the first sink that supports queries.
+        """
+        for sink in self.sinks:
+            if hasattr(sink, "query"):
+                return sink.query(since_ns, names)
+        return []
+
+_shared_tracer = None  # Process-wide tracer, created on first use
+_shared_tracer_lock = threading.Lock()
+
+# Function: Shared Tracer
+def get_tracer():
+    """
+    Returns the process-wide tracer:
+    - Spans go to SQLite in the cache directory (disable with SEM_PLANNER_TRACING=0).
+    - SEM_PLANNER_TRACE_JSONL=<path> also appends them as OTLP/JSON lines.
+    """
+    global _shared_tracer
+    with _shared_tracer_lock:
+        if _shared_tracer is None:
+            sinks = []
+            if os.environ.get("SEM_PLANNER_TRACING", "1") != "0":
+                sinks.append(SQLiteSpanSink())
+                if os.environ.get("SEM_PLANNER_TRACE_JSONL"):
+                    sinks.append(JsonlSpanSink(os.environ["SEM_PLANNER_TRACE_JSONL"]))
+            _shared_tracer = Tracer(sinks)
+    return _shared_tracer
+
+# Function: Current Span
+def current_span():
+    """
+    Returns the span of the code running in the current context, or None.
+    """
+    return _current_span.get()
+
+# Function: Span
+@contextmanager
+def span(name, attributes=None, kind="INTERNAL"):
+    """
+    Runs the block as a child span of the current one; an exception ends it with ERROR status.
+    """
+    current = Span(name, kind, current_span(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end("ERROR", f"{type(e).__name__}: {e}")
+        raise
+    else:
+        current.end()
+    finally:
+        _current_span.reset(token)
+
+# Function: Record Span
+def record_span(name, start_ns, end_ns, kind="INTERNAL", attributes=None, status="OK", message=None, parent=None):
+    """
+    Exports an already finished operation (e.g. rebuilt from start/finish events) as a span.
+    """
+    finished = Span(name, kind, parent or current_span(), attributes, start_ns)
+    finished.end(status, message, end_ns)
+    return finished
+
+# Function: Event Time
+def event_time_ns(timestamp):
+    """
+    Converts a CrewAI event timestamp (datetime) to Unix nanoseconds.
+    """
+    return int(timestamp.timestamp() * 1e9) if timestamp else time.time_ns()
+
+# Class: Call Usage
+class CallUsage:
+    """
+    Provider-reported token usage of one LLM call.
+    The completion event is handled on the event bus's threads, possibly after the call has
+    returned, so the caller waits for it here before closing its span.
+    """
+
+    def __init__(self):
+        """
+        Start empty; `report()` fills it in from the completion event.
+        """
+        self.usage = None
+        self._reported = threading.Event()
+
+    def report(self, usage):
+        """
+        Records the usage of the first completion event of the call.
+        """
+        if not self._reported.is_set():
+            self.usage = usage or {}
+            self._reported.set()
+
+    def wait(self, timeout):
+        """
+        Returns the reported usage dict, or None if it didn't arrive within `timeout` seconds
+        (or no event handlers are registered).
+        """
+        if not _handlers_registered:
+            return None
+        self._reported.wait(timeout)
+        return self.usage
+
+# Function: Capture Usage
+@contextmanager
+def capture_usage():
+    """
+    Collects the provider usage of the LLM call made inside the block.
+    Event handlers run with a copy of the emitting context, so they find this collector.
+    """
+    collector = CallUsage()
+    token = _current_usage.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_usage.reset(token)
+
+# Function: Register Event Handlers
+def register_event_handlers():
+    """
+    Subscribes once to the CrewAI event bus and turns agent executions and tool calls
+    into spans under the span that was current when the event was emitted.
+    CrewAI delivers events asynchronously, so spans are rebuilt from start/finish timestamps.
+    """
+    global _handlers_registered
+    with _handlers_lock:
+        if _handlers_registered:
+            return
+
+        from crewai.events import (  # CrewAI event bus and event types
+            AgentExecutionCompletedEvent,
+            AgentExecutionErrorEvent,
+            AgentExecutionStartedEvent,
+            LLMCallCompletedEvent,
+            LLMCallFailedEvent,
+            ToolUsageErrorEvent,
+            ToolUsageFinishedEvent,
+            crewai_event_bus,
+        )
+        agent_starts = {}  # Started event ID -> (start time, parent span)
+        agent_starts_lock = threading.Lock()
+
+        @crewai_event_bus.on(AgentExecutionStartedEvent)
+        def on_agent_started(source, event):
+            with agent_starts_lock:
+                agent_starts[event.event_id] = (event_time_ns(event.timestamp), current_span())
+
+        def finish_agent(event, status, message=None):
+            with agent_starts_lock:
+                start_ns, parent = agent_starts.pop(event.started_event_id, (None, None))
+            if start_ns is not None:
+                record_span("agent.execute", start_ns, event_time_ns(event.timestamp), attributes={
+                    "gen_ai.agent.name": event.agent_role or getattr(event.agent, "role", None),
+                    "sem.task": event.task_name,
+                }, status=status, message=message, parent=parent)
+
+        @crewai_event_bus.on(AgentExecutionCompletedEvent)
+        def on_agent_completed(source, event):
+            finish_agent(event, "OK")
+
+        @crewai_event_bus.on(AgentExecutionErrorEvent)
+        def on_agent_error(source, event):
+            finish_agent(event, "ERROR", str(event.error))
+
+        @crewai_event_bus.on(ToolUsageFinishedEvent)
+        def on_tool_finished(source, event):
+            record_span("tool.call", event_time_ns(event.started_at), event_time_ns(event.finished_at), attributes={
+                "gen_ai.tool.name": event.tool_name,
+                "gen_ai.agent.name": event.agent_role,
+                "sem.tool.from_cache": bool(event.from_cache),
+                "sem.tool.run_attempts": event.run_attempts,
+            })
+
+        @crewai_event_bus.on(ToolUsageErrorEvent)
+        def on_tool_error(source, event):
+            now = event_time_ns(event.timestamp)
+            record_span("tool.call", now, now, attributes={
+                "gen_ai.tool.name": event.tool_name, "gen_ai.agent.name": event.agent_role,
+            }, status="ERROR", message=str(event.error))
+
+        @crewai_event_bus.on(LLMCallCompletedEvent)
+        def on_llm_completed(source, event):
+            # Handed to the waiting CachedLLM.call, which records it on its still open span
+            collector = _current_usage.get()
+            if collector is not None:
+                collector.report(event.usage)
+
+        @crewai_event_bus.on(LLMCallFailedEvent)
+        def on_llm_failed(source, event):
+            current = current_span()
+            if current is not None and current.name == "llm.call":
+                current.add("sem.llm.failed_attempts")  # Provider errors retried inside this call
+
+        _handlers_registered = True
+
+# End of file: utils/telemetry.py